@@ -0,0 +1,171 @@
+"""Transcribe local media files from the command line.
+
+    python -m backend.cli /srv/archive --target-lang fr --workers 4 --json
+
+Directories are searched recursively. Each SRT is written in place, to
+subtitle_<lang>/<name>.srt next to its media, with the same model cache,
+transcription cache and worker pool as the API. The exit status is 0 when
+every file succeeded, 1 when some failed and 2 on usage errors.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+from typing import Callable
+
+from backend.main import (
+    BATCH_WORKERS,
+    WHISPER_BATCHED,
+    WHISPER_MODELS,
+    find_media_files,
+    load_model,
+    manager,
+    resolve_batch_size,
+    send_log,
+    shutdown_process_pool,
+    subtitle_path,
+    transcribe_file,
+    transcribe_files_parallel,
+    write_srt,
+)
+from backend.watch import is_media, needs_transcription
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def collect_media(paths: list[str]) -> tuple[list[str], list[str]]:
+    """Media files named on the command line, directories expanded, in order.
+
+    Returns (files, problems): one message per path that is missing or not
+    a supported media file.
+    """
+    files = []
+    problems = []
+    for arg in paths:
+        path = os.path.abspath(arg)
+        if os.path.isdir(path):
+            files.extend(find_media_files(path))
+        elif not os.path.exists(path):
+            problems.append(f"No such file or directory: {arg}")
+        elif not os.path.isfile(path) or not is_media(path):
+            problems.append(f"Not a supported media file: {arg}")
+        else:
+            files.append(path)
+    return list(dict.fromkeys(files)), problems
+
+
+def make_printer(as_json: bool) -> Callable[[dict], None]:
+    """Print events as JSON lines, or log lines and file results as plain text."""
+    def _print(message: dict):
+        if as_json:
+            print(json.dumps(message, ensure_ascii=False), flush=True)
+        elif message["type"] == "log":
+            print(message["message"], flush=True)
+        elif message["type"] == "file":
+            detail = message.get("output") or message.get("error", "")
+            print(f"[{message['index']}/{message['total']}] {message['status']}: "
+                  f"{message['path']} {detail}".rstrip(), flush=True)
+        elif message["type"] == "summary":
+            print(f"Done: {message['done']} ok, {message['failed']} failed, "
+                  f"{message['skipped']} skipped", flush=True)
+    return _print
+
+
+async def run_batch(files: list[str], model_name: str, audio_lang: str, target_lang: str,
+                    emit: Callable[[dict], None], workers: int = 1, batch_size: int = 0,
+                    skip_existing: bool = False) -> dict:
+    """Transcribe files in place and report each one through emit; returns the counts."""
+    counts = {"done": 0, "failed": 0, "skipped": 0}
+    total = len(files)
+    index = 0
+
+    async def record(path: str, srt: str | None, error: Exception | None, status: str = ""):
+        nonlocal index
+        index += 1
+        event = {"type": "file", "index": index, "total": total, "path": path}
+        if status == "skipped":
+            event["output"] = subtitle_path(path, target_lang)
+        elif error is None:
+            status = "done"
+            event["output"] = subtitle_path(path, target_lang)
+            await asyncio.to_thread(write_srt, event["output"], srt)
+        else:
+            status = "failed"
+            event["error"] = str(error)
+        counts[status] += 1
+        emit(dict(event, status=status))
+
+    todo = []
+    for path in files:
+        if skip_existing and not needs_transcription(path, target_lang):
+            await record(path, None, None, "skipped")
+        else:
+            todo.append(path)
+
+    if workers > 1 and len(todo) > 1:
+        async for path, srt, error in transcribe_files_parallel(
+            [(path, path) for path in todo], model_name, audio_lang, target_lang,
+            workers, batch_size,
+        ):
+            await record(path, srt, error)
+    elif todo:
+        model = await load_model(model_name)
+        for path in todo:
+            await send_log(f"Processing: {os.path.basename(path)}")
+            try:
+                srt = await transcribe_file(
+                    model, path, audio_lang, target_lang, batch_size=batch_size,
+                    model_name=model_name,
+                )
+            except Exception as e:
+                await record(path, None, e)
+            else:
+                await record(path, srt, None)
+    emit(dict(type="summary", **counts))
+    return counts
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="media files or folders")
+    parser.add_argument("--model", default="medium", choices=WHISPER_MODELS)
+    parser.add_argument("--audio-lang", default="en")
+    parser.add_argument("--target-lang", default="fr")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS,
+                        help="processes transcribing files in parallel")
+    parser.add_argument("--batched", action="store_true", default=WHISPER_BATCHED)
+    parser.add_argument("--batch-size", type=int, default=0)
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="skip media whose SRT is newer than the file")
+    parser.add_argument("--json", action="store_true",
+                        help="print log, progress and per-file events as JSON lines")
+    args = parser.parse_args(argv)
+
+    files, problems = collect_media(args.paths)
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    if problems:
+        return EXIT_USAGE
+    if not files:
+        print("No media files found", file=sys.stderr)
+        return EXIT_USAGE
+
+    emit = make_printer(args.json)
+    manager.sinks.append(emit)
+    try:
+        counts = asyncio.run(run_batch(
+            files, args.model, args.audio_lang, args.target_lang, emit, args.workers,
+            resolve_batch_size(args.batched, args.batch_size), args.skip_existing,
+        ))
+    finally:
+        manager.sinks.remove(emit)
+        shutdown_process_pool()
+    return EXIT_FAILED if counts["failed"] else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
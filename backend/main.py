@@ -1,4 +1,5 @@
 import os
+import re
 import json as _json
 import shutil
 import tempfile
@@ -6,9 +7,21 @@ import asyncio
 import traceback
 import time
 import uuid
+import sqlite3
+import zipfile
+import hashlib
+import bisect
+import threading
 import subprocess
+import contextvars
+import multiprocessing
 import psutil
-from typing import List
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Callable, List, AsyncIterator
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import ProcessPoolExecutor
 
 from pathlib import Path
 from dotenv import load_dotenv
@@ -17,13 +30,32 @@ load_dotenv()
 
 from fastapi import FastAPI, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
-import requests as http_requests
-from faster_whisper import WhisperModel
+import httpx
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+from faster_whisper.vad import VadOptions, get_speech_timestamps
 
-app = FastAPI(title="Whisper Translator API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_ollama_client()
+    job_store.requeue_orphans()
+    session_store.reap()
+    workers = [asyncio.create_task(_job_worker()) for _ in range(max(0, JOB_WORKERS))]
+    preload = asyncio.create_task(model_manager.preload(PRELOAD_MODELS))
+    reaper = asyncio.create_task(_session_reaper())
+    yield
+    preload.cancel()
+    reaper.cancel()
+    for worker in workers:
+        worker.cancel()
+    shutdown_process_pool()
+    await close_ollama_client()
+
+
+app = FastAPI(title="Whisper Translator API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +64,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def tag_request_events(request, call_next):
+    """Tag a request's log/progress events with its X-Job-Id header, if any."""
+    job_id = request.headers.get("x-job-id")
+    if not job_id:
+        return await call_next(request)
+    token = current_job_id.set(job_id)
+    try:
+        return await call_next(request)
+    finally:
+        current_job_id.reset(token)
+
 # ──────────────────── Constants ──────────────────────
 
 LANG_CODES = {
@@ -48,46 +93,455 @@ SUPPORTED_EXTENSIONS = (".mp4", ".mp3", ".wav", ".m4a", ".flac", ".ogg", ".webm"
 WHISPER_MODELS = ["tiny", "base", "small", "medium", "large", "large-v2"]
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
 OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "mistral")
+OLLAMA_BASE_URL = OLLAMA_URL.split("/api/", 1)[0]
+OLLAMA_TIMEOUT = float(os.environ.get("OLLAMA_TIMEOUT", "120"))
+OLLAMA_MAX_CONNECTIONS = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "10"))
+OLLAMA_MAX_RETRIES = int(os.environ.get("OLLAMA_MAX_RETRIES", "3"))
+OLLAMA_RETRY_BACKOFF = float(os.environ.get("OLLAMA_RETRY_BACKOFF", "0.5"))
+OLLAMA_CONCURRENCY = int(os.environ.get("OLLAMA_CONCURRENCY", "4"))
+OLLAMA_BATCH_SIZE = int(os.environ.get("OLLAMA_BATCH_SIZE", "10"))
+OLLAMA_BATCH_TOKENS = int(os.environ.get("OLLAMA_BATCH_TOKENS", "1500"))
+TEXT_CHUNK_TOKENS = int(os.environ.get("TEXT_CHUNK_TOKENS", "1000"))
+# Ends a streamed translation that hit an error; the message follows it.
+STREAM_ERROR_MARKER = "\x00"
 HF_TOKEN = os.environ.get("HF_TOKEN", "")
+CACHE_DIR = os.environ.get("CACHE_DIR", str(Path(__file__).resolve().parent / ".cache"))
+TRANSLATION_CACHE_ENTRIES = int(os.environ.get("TRANSLATION_CACHE_ENTRIES", "100000"))
+TRANSCRIPTION_CACHE_MB = int(os.environ.get("TRANSCRIPTION_CACHE_MB", "512"))
+DIARIZATION_TTL = int(os.environ.get("DIARIZATION_TTL", "3600"))
+DIARIZATION_DISK_MB = int(os.environ.get("DIARIZATION_DISK_MB", "4096"))
+DIARIZATION_REAP_INTERVAL = int(os.environ.get("DIARIZATION_REAP_INTERVAL", "60"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "1"))
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "120"))
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", "1"))
+LONG_FILE_SECONDS = float(os.environ.get("LONG_FILE_SECONDS", "1200"))
+LONG_CHUNK_SECONDS = float(os.environ.get("LONG_CHUNK_SECONDS", "300"))
+WHISPER_BATCHED = os.environ.get("WHISPER_BATCHED", "0").lower() in ("1", "true", "yes")
+WHISPER_BATCH_SIZE = int(os.environ.get("WHISPER_BATCH_SIZE", "0"))  # 0 = auto
+WHISPER_MAX_BATCH_SIZE = 16
+LIVE_WINDOW_SECONDS = float(os.environ.get("LIVE_WINDOW_SECONDS", "15"))
+LIVE_STEP_SECONDS = float(os.environ.get("LIVE_STEP_SECONDS", "1"))
+LIVE_SILENCE_MS = int(os.environ.get("LIVE_SILENCE_MS", "600"))
+PROGRESS_INTERVAL = float(os.environ.get("PROGRESS_INTERVAL", "0.25"))
+MODEL_MEMORY_BUDGET_MB = int(os.environ.get("MODEL_MEMORY_BUDGET_MB", "0"))  # 0 = auto
+PRELOAD_MODELS = [m.strip() for m in os.environ.get("PRELOAD_MODELS", "").split(",") if m.strip()]
+# Approximate resident size of each model in float16 (MB)
+MODEL_MEMORY_MB = {
+    "tiny": 80, "base": 150, "small": 500, "medium": 1550,
+    "large": 3100, "large-v2": 3100, "large-v3": 3100,
+}
 
 # ──────────────────── WebSocket Manager ──────────────
 
+WS_QUEUE_SIZE = int(os.environ.get("WS_QUEUE_SIZE", "500"))
+WS_SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "10"))
+
+class ClientChannel:
+    """Outgoing messages for one WebSocket client, sent by its own task.
+
+    Logs and partials wait in a bounded queue (the oldest are dropped when it
+    is full); progress is coalesced to the latest value per job, so a slow
+    client never holds up the others or grows memory without bound.
+    """
+
+    def __init__(self, ws: WebSocket, topics: set[str] | None = None,
+                 max_pending: int = WS_QUEUE_SIZE):
+        self.ws = ws
+        # Job/session IDs to receive; None receives everything
+        self.topics = topics
+        self.pending: deque[dict] = deque(maxlen=max_pending)
+        self.progress: dict[str | None, dict] = {}
+        self.dropped = 0
+        self._wakeup = asyncio.Event()
+
+    def wants(self, job_id: str | None) -> bool:
+        return self.topics is None or job_id in self.topics
+
+    def subscribe(self, job_id: str):
+        self.topics = (self.topics or set()) | {job_id}
+
+    def unsubscribe(self, job_id: str):
+        if self.topics is not None:
+            self.topics.discard(job_id)
+
+    def push(self, message: dict):
+        if message.get("type") == "progress":
+            self.progress[message.get("job_id")] = message
+        else:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(message)
+        self._wakeup.set()
+
+    def _next(self) -> dict | None:
+        if self.dropped:
+            notice = {
+                "type": "log",
+                "message": f"({self.dropped} log line(s) skipped, client too slow)",
+                "color": "yellow",
+            }
+            self.dropped = 0
+            return notice
+        if self.pending:
+            return self.pending.popleft()
+        if self.progress:
+            return self.progress.pop(next(iter(self.progress)))
+        return None
+
+    async def run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while (message := self._next()) is not None:
+                await asyncio.wait_for(self.ws.send_json(message), WS_SEND_TIMEOUT)
+
+
 class ConnectionManager:
     def __init__(self):
-        self.connections: List[WebSocket] = []
+        self.channels: dict[WebSocket, ClientChannel] = {}
+        self._senders: dict[WebSocket, asyncio.Task] = {}
+        # In-process listeners, e.g. the console of a headless run
+        self.sinks: list[Callable[[dict], None]] = []
 
-    async def connect(self, ws: WebSocket):
+    async def connect(self, ws: WebSocket, job_id: str | None = None):
         await ws.accept()
-        self.connections.append(ws)
+        channel = ClientChannel(ws, {job_id} if job_id is not None else None)
+        self.channels[ws] = channel
+        self._senders[ws] = asyncio.create_task(self._send_loop(channel))
+
+    async def _send_loop(self, channel: ClientChannel):
+        try:
+            await channel.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Closed or stuck (send timed out): drop the client
+            self.disconnect(channel.ws)
 
     def disconnect(self, ws: WebSocket):
-        self.connections.remove(ws)
+        self.channels.pop(ws, None)
+        sender = self._senders.pop(ws, None)
+        if sender is not None and sender is not asyncio.current_task():
+            sender.cancel()
+
+    def handle_message(self, ws: WebSocket, text: str):
+        """Apply a {"type": "subscribe" | "unsubscribe", "job_id": ...} request."""
+        channel = self.channels.get(ws)
+        try:
+            request = _json.loads(text)
+        except ValueError:
+            return
+        if channel is None or not isinstance(request, dict) or not request.get("job_id"):
+            return
+        if request.get("type") == "subscribe":
+            channel.subscribe(str(request["job_id"]))
+        elif request.get("type") == "unsubscribe":
+            channel.unsubscribe(str(request["job_id"]))
 
     async def broadcast(self, message: dict):
-        for ws in self.connections[:]:
-            try:
-                await ws.send_json(message)
-            except Exception:
-                self.connections.remove(ws)
+        for sink in self.sinks:
+            sink(message)
+        job_id = message.get("job_id")
+        for channel in list(self.channels.values()):
+            if channel.wants(job_id):
+                channel.push(message)
 
 manager = ConnectionManager()
 
+# Job the current task is working for; tags every log/progress message
+current_job_id: contextvars.ContextVar[str | None] = contextvars.ContextVar(
+    "current_job_id", default=None
+)
+
+async def _emit(message: dict):
+    job_id = current_job_id.get()
+    if job_id is not None:
+        message["job_id"] = job_id
+    await manager.broadcast(message)
+
 async def send_log(msg: str, color: str = None):
-    await manager.broadcast({"type": "log", "message": msg, "color": color})
+    await _emit({"type": "log", "message": msg, "color": color})
+
+async def send_partial(text: str, **extra):
+    """Forward a partial translation (token chunk or finished cue)."""
+    await _emit({"type": "partial", "text": text, **extra})
 
 async def send_progress(current: int, total: int):
     pct = int((current / total) * 100) if total > 0 else 0
-    await manager.broadcast({
+    await _emit({
         "type": "progress",
         "current": current,
         "total": total,
         "percent": pct,
     })
 
-# ──────────────────── Utilities ──────────────────────
+# ──────────────────── Translation memory ─────────────
+
+class TranslationMemory:
+    """On-disk cache of Ollama translations keyed by (text, source, target, model).
+
+    Entries are evicted least-recently-used once max_entries is exceeded;
+    max_entries <= 0 disables the cache.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = TRANSLATION_CACHE_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, translation TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_translations_last_used "
+                "ON translations (last_used)"
+            )
+        return self._conn
+
+    @staticmethod
+    def make_key(text: str, source_lang: str, target_lang: str, model: str) -> str:
+        raw = "\x1f".join((text.strip(), source_lang, target_lang, model))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, text: str, source_lang: str, target_lang: str,
+            model: str = OLLAMA_MODEL) -> str | None:
+        return self.get_many([text], source_lang, target_lang, model)[0]
+
+    def get_many(self, texts: list[str], source_lang: str, target_lang: str,
+                 model: str = OLLAMA_MODEL) -> list[str | None]:
+        """Look up several texts with one query and one commit for their last_used.
+
+        Blocking: call it from coroutines through asyncio.to_thread.
+        """
+        if not self.enabled:
+            return [None] * len(texts)
+        keys = [self.make_key(text, source_lang, target_lang, model) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            for start in range(0, len(unique), 500):  # SQLite's parameter limit
+                part = unique[start:start + 500]
+                found.update(conn.execute(
+                    "SELECT key, translation FROM translations "
+                    f"WHERE key IN ({', '.join('?' * len(part))})", part,
+                ).fetchall())
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE translations SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+                conn.commit()
+            results = [found.get(key) for key in keys]
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put(self, text: str, source_lang: str, target_lang: str, translation: str,
+            model: str = OLLAMA_MODEL):
+        self.put_many([(text, translation)], source_lang, target_lang, model)
+
+    def put_many(self, pairs: list[tuple[str, str]], source_lang: str, target_lang: str,
+                 model: str = OLLAMA_MODEL):
+        """Store (text, translation) pairs in one transaction. Blocking, like get_many."""
+        if not self.enabled or not pairs:
+            return
+        now = time.time()
+        rows = [
+            (self.make_key(text, source_lang, target_lang, model), translation, now)
+            for text, translation in pairs
+        ]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, translation, last_used) "
+                "VALUES (?, ?, ?)", rows,
+            )
+            count = conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM translations WHERE key IN ("
+                    "SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM translations")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = (
+                self._connect().execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+                if self.enabled else 0
+            )
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+translation_memory = TranslationMemory(os.path.join(CACHE_DIR, "translations.db"))
+
+# ──────────────────── Transcription cache ────────────
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def content_hash(audio: str | np.ndarray) -> str:
+    """SHA-256 of a media file, or of a decoded PCM buffer."""
+    if isinstance(audio, np.ndarray):
+        return hashlib.sha256(memoryview(np.ascontiguousarray(audio))).hexdigest()
+    return hash_file(audio)
+
+
+class TranscriptionCache:
+    """On-disk cache of raw Whisper segments keyed by audio content and decode options.
+
+    Segments (not SRT) are stored so every output format can be rebuilt from
+    one pass. Entries are evicted least-recently-used once their total size
+    exceeds max_mb; max_mb <= 0 disables the cache.
+    """
+
+    def __init__(self, db_path: str, max_mb: int = TRANSCRIPTION_CACHE_MB):
+        self.db_path = db_path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS transcriptions ("
+                "key TEXT PRIMARY KEY, segments TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_transcriptions_last_used "
+                "ON transcriptions (last_used)"
+            )
+        return self._conn
+
+    @staticmethod
+    def make_key(content_hash: str, model_name: str, options: dict) -> str:
+        raw = "\x1f".join((content_hash, model_name, _json.dumps(options, sort_keys=True)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> list[dict] | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT segments FROM transcriptions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE transcriptions SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            conn.commit()
+            self.hits += 1
+            return _json.loads(row[0])
+
+    def put(self, key: str, segments: list[dict]):
+        if not self.enabled:
+            return
+        payload = _json.dumps(segments, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO transcriptions (key, segments, size, last_used) "
+                "VALUES (?, ?, ?, ?)", (key, payload, size, time.time())
+            )
+            excess = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM transcriptions"
+            ).fetchone()[0] - self.max_bytes
+            if excess > 0:
+                stale = []
+                for old_key, old_size in conn.execute(
+                    "SELECT key, size FROM transcriptions ORDER BY last_used"
+                ):
+                    if excess <= 0:
+                        break
+                    stale.append((old_key,))
+                    excess -= old_size
+                conn.executemany("DELETE FROM transcriptions WHERE key = ?", stale)
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM transcriptions")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = (
+                self._connect().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcriptions"
+                ).fetchone()
+                if self.enabled else (0, 0)
+            )
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "size_mb": round(size / (1024 * 1024), 2),
+            "max_mb": self.max_bytes // (1024 * 1024),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
 
-_model_cache: dict[str, WhisperModel] = {}
+transcription_cache = TranscriptionCache(os.path.join(CACHE_DIR, "transcriptions.db"))
 
+# ──────────────────── Utilities ──────────────────────
 
 def _detect_device():
     """Auto-detect CUDA GPU, fallback to CPU."""
@@ -103,13 +557,145 @@ def _detect_device():
 DEVICE, COMPUTE_TYPE = _detect_device()
 
 
+def estimate_model_mb(model_name: str, compute_type: str = COMPUTE_TYPE) -> int:
+    base = MODEL_MEMORY_MB.get(model_name, MODEL_MEMORY_MB["medium"])
+    if compute_type.startswith("int8"):
+        return base // 2
+    if compute_type == "float32":
+        return base * 2
+    return base
+
+
+def default_memory_budget_mb() -> int:
+    """Three quarters of total VRAM (CUDA) or RAM."""
+    total = psutil.virtual_memory().total
+    if DEVICE == "cuda":
+        try:
+            import torch
+            total = torch.cuda.get_device_properties(0).total_memory
+        except Exception:
+            pass
+    return int(total / (1024**2) * 0.75)
+
+
+class ModelManager:
+    """Whisper models kept resident under a memory budget, evicted LRU.
+
+    Concurrent requests for a model that is not loaded yet share a single
+    load. Models still referenced by a running transcription stay alive
+    until it finishes, even once evicted.
+    """
+
+    def __init__(self, budget_mb: int = 0):
+        self.budget_mb = budget_mb or default_memory_budget_mb()
+        self.models: OrderedDict[str, WhisperModel] = OrderedDict()
+        self.sizes: dict[str, int] = {}
+        self.last_used: dict[str, float] = {}
+        self._loading: dict[str, asyncio.Future] = {}
+
+    @property
+    def used_mb(self) -> int:
+        return sum(self.sizes.values())
+
+    def _touch(self, model_name: str):
+        self.models.move_to_end(model_name)
+        self.last_used[model_name] = time.time()
+
+    def _make_room(self, needed_mb: int):
+        while self.models and self.used_mb + needed_mb > self.budget_mb:
+            self.evict(next(iter(self.models)))
+
+    def evict(self, model_name: str) -> bool:
+        if model_name not in self.models:
+            return False
+        del self.models[model_name]
+        self.sizes.pop(model_name, None)
+        self.last_used.pop(model_name, None)
+        return True
+
+    async def get(self, model_name: str) -> WhisperModel:
+        if model_name in self.models:
+            self._touch(model_name)
+            return self.models[model_name]
+        if model_name in self._loading:
+            return await asyncio.shield(self._loading[model_name])
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[model_name] = future
+        try:
+            size = estimate_model_mb(model_name)
+            self._make_room(size)
+            await send_log(f"Loading {model_name} on {DEVICE} ({COMPUTE_TYPE})...")
+            model = await asyncio.to_thread(
+                WhisperModel, model_name, device=DEVICE, compute_type=COMPUTE_TYPE
+            )
+            self.models[model_name] = model
+            self.sizes[model_name] = size
+            self._touch(model_name)
+            future.set_result(model)
+            return model
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody may be awaiting it; avoid "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._loading[model_name]
+
+    async def preload(self, model_names: list[str]):
+        for model_name in model_names:
+            try:
+                await self.get(model_name)
+            except Exception as e:
+                await send_log(f"Preload of {model_name} failed: {e}", color="red")
+
+    def stats(self) -> dict:
+        return {
+            "device": DEVICE,
+            "compute_type": COMPUTE_TYPE,
+            "budget_mb": self.budget_mb,
+            "used_mb": self.used_mb,
+            "models": [
+                {
+                    "name": name,
+                    "memory_mb": self.sizes[name],
+                    "last_used": self.last_used[name],
+                }
+                for name in reversed(self.models)
+            ],
+            "loading": list(self._loading),
+        }
+
+
+model_manager = ModelManager(MODEL_MEMORY_BUDGET_MB)
+
+
 async def load_model(model_name: str) -> WhisperModel:
-    if model_name not in _model_cache:
-        await send_log(f"Loading {model_name} on {DEVICE} ({COMPUTE_TYPE})...")
-        _model_cache[model_name] = await asyncio.to_thread(
-            WhisperModel, model_name, device=DEVICE, compute_type=COMPUTE_TYPE
-        )
-    return _model_cache[model_name]
+    return await model_manager.get(model_name)
+
+
+def auto_batch_size() -> int:
+    """Decoder batch size that fits in free memory (~1 GB per batched chunk)."""
+    free_gb = psutil.virtual_memory().available / (1024**3)
+    if DEVICE == "cuda":
+        try:
+            import torch
+            free_gb = torch.cuda.mem_get_info()[0] / (1024**3)
+        except Exception:
+            pass
+    return max(1, min(WHISPER_MAX_BATCH_SIZE, int(free_gb)))
+
+
+def resolve_batch_size(batched: bool, batch_size: int = 0) -> int:
+    """Batch size for a request: 0 (sequential) unless batched, auto when <= 0."""
+    if not batched:
+        return 0
+    if batch_size <= 0:
+        batch_size = WHISPER_BATCH_SIZE or auto_batch_size()
+    return min(batch_size, WHISPER_MAX_BATCH_SIZE)
 
 
 def format_timestamp(seconds: float) -> str:
@@ -123,46 +709,496 @@ def format_timestamp(seconds: float) -> str:
     return f"{h:02}:{m:02}:{s:02},{ms:03}"
 
 
-async def call_ollama(text: str, source_lang: str = "en", target_lang: str = "fr") -> str:
+def _target_name(target_lang: str) -> str:
     target_names = {v: k for k, v in LANG_CODES.items()}
-    target_name = target_names.get(target_lang, target_lang)
+    return target_names.get(target_lang, target_lang)
+
+
+_ollama_client: httpx.AsyncClient | None = None
+
+
+def get_ollama_client() -> httpx.AsyncClient:
+    """Shared keep-alive HTTP client for Ollama (created on first use)."""
+    global _ollama_client
+    if _ollama_client is None or _ollama_client.is_closed:
+        _ollama_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+            ),
+        )
+    return _ollama_client
+
+
+async def close_ollama_client():
+    global _ollama_client
+    if _ollama_client is not None:
+        await _ollama_client.aclose()
+        _ollama_client = None
 
+
+async def ollama_request(method: str, url: str, retries: int = OLLAMA_MAX_RETRIES,
+                         stream: bool = False, **kwargs) -> httpx.Response:
+    """Send a request on the shared client.
+
+    5xx responses and connection errors are retried with exponential
+    backoff; the last response is returned (or the last error raised).
+    With stream=True the body is left unread and the caller must close it.
+    """
+    client = get_ollama_client()
+    for attempt in range(retries + 1):
+        try:
+            resp = await client.send(client.build_request(method, url, **kwargs),
+                                     stream=stream)
+            if resp.status_code < 500 or attempt == retries:
+                return resp
+            await resp.aclose()
+        except (httpx.ConnectError, httpx.RemoteProtocolError):
+            if attempt == retries:
+                raise
+        await asyncio.sleep(OLLAMA_RETRY_BACKOFF * 2 ** attempt)
+
+
+async def _ollama_generate(prompt: str) -> str | None:
+    """Send a prompt to Ollama. Returns None if the request failed."""
     payload = {
         "model": OLLAMA_MODEL,
-        "prompt": (
-            f"Traduis en {target_name} ce texte de sous-titre "
-            f"sans modifier le style ni le decoupage :\n\n\"{text}\""
-        ),
+        "prompt": prompt,
         "stream": False,
     }
-    def _do():
-        try:
-            resp = http_requests.post(OLLAMA_URL, json=payload, timeout=120)
-            resp.raise_for_status()
-            return resp.json().get("response", text).strip()
-        except http_requests.RequestException:
-            return text
-    return await asyncio.to_thread(_do)
+    try:
+        resp = await ollama_request("POST", OLLAMA_URL, json=payload)
+        resp.raise_for_status()
+        response = resp.json().get("response")
+        return response.strip() if response is not None else None
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def _ollama_stream(prompt: str) -> AsyncIterator[str]:
+    """Yield response fragments from Ollama's token stream as they arrive."""
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": True,
+    }
+    resp = await ollama_request("POST", OLLAMA_URL, stream=True, json=payload)
+    try:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.strip():
+                continue
+            data = _json.loads(line)
+            if data.get("response"):
+                yield data["response"]
+            if data.get("done"):
+                break
+    finally:
+        await resp.aclose()
+
+
+def _translation_prompt(text: str, target_lang: str, context: str = "") -> str:
+    prompt = (
+        f"Traduis en {_target_name(target_lang)} ce texte de sous-titre "
+        f"sans modifier le style ni le decoupage :\n\n\"{text}\""
+    )
+    if context:
+        prompt = (
+            f"Contexte precedent, a ne pas traduire :\n\"{context}\"\n\n{prompt}"
+        )
+    return prompt
+
+
+async def _translate_uncached(text: str, source_lang: str, target_lang: str,
+                              context: str = "") -> str:
+    translated = await _ollama_generate(_translation_prompt(text, target_lang, context))
+    if translated is None:
+        return text
+    await asyncio.to_thread(translation_memory.put, text, source_lang, target_lang, translated)
+    return translated
+
+
+async def call_ollama(text: str, source_lang: str = "en", target_lang: str = "fr",
+                      context: str = "") -> str:
+    cached = await asyncio.to_thread(translation_memory.get, text, source_lang, target_lang)
+    if cached is not None:
+        return cached
+    return await _translate_uncached(text, source_lang, target_lang, context)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), no tokenizer needed."""
+    return max(1, len(text) // 4)
+
+
+def make_cue_batches(texts: list[str], max_cues: int = OLLAMA_BATCH_SIZE,
+                     max_tokens: int = OLLAMA_BATCH_TOKENS) -> list[list[int]]:
+    """Group consecutive cue indices into batches under a cue and token budget."""
+    batches = []
+    current = []
+    current_tokens = 0
+    for idx, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_cues or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(idx)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)\s*[.):]\s*(.*)$")
+
+
+def parse_numbered_reply(reply: str, expected: int) -> list[str] | None:
+    """Parse a "1. ... / 2. ..." reply. Returns None if the cue count is wrong."""
+    items = []
+    for line in reply.splitlines():
+        if not line.strip():
+            continue
+        match = _NUMBERED_LINE.match(line)
+        if match and int(match.group(1)) == len(items) + 1:
+            items.append(match.group(2).strip())
+        elif items:
+            # Continuation of the previous numbered line
+            items[-1] = f"{items[-1]} {line.strip()}"
+        else:
+            return None
+    if len(items) != expected or not all(items):
+        return None
+    return items
+
+
+async def call_ollama_batch(texts: list[str], source_lang: str = "en",
+                            target_lang: str = "fr") -> list[str]:
+    """Translate several cues with one numbered prompt.
+
+    Cues already in the translation memory are not sent. Falls back to one
+    call per cue when the reply cannot be split back into one line per cue.
+    """
+    if len(texts) == 1:
+        return [await call_ollama(texts[0], source_lang, target_lang)]
+
+    results = await asyncio.to_thread(
+        translation_memory.get_many, texts, source_lang, target_lang,
+    )
+    missing = [i for i, cached in enumerate(results) if cached is None]
+    if len(missing) <= 1:
+        for i in missing:
+            results[i] = await _translate_uncached(texts[i], source_lang, target_lang)
+        return results
+
+    pending = [texts[i] for i in missing]
+    numbered = "\n".join(f"{i}. {text}" for i, text in enumerate(pending, start=1))
+    prompt = (
+        f"Traduis en {_target_name(target_lang)} ces {len(pending)} lignes de "
+        f"sous-titre numerotees sans modifier le style ni le decoupage. "
+        f"Reponds uniquement avec les {len(pending)} lignes traduites, "
+        f"chacune precedee de son numero :\n\n{numbered}"
+    )
+    reply = await _ollama_generate(prompt)
+    translations = parse_numbered_reply(reply or "", len(pending))
+    if translations is None:
+        await send_log(
+            f"  Batch reply did not match {len(pending)} cues, translating one by one",
+            color="yellow",
+        )
+        translations = [
+            await _translate_uncached(text, source_lang, target_lang) for text in pending
+        ]
+    else:
+        await asyncio.to_thread(
+            translation_memory.put_many, list(zip(pending, translations)),
+            source_lang, target_lang,
+        )
+    for i, translated in zip(missing, translations):
+        results[i] = translated
+    return results
+
+
+def parse_srt_blocks(content: str) -> list[tuple[str, str, str]]:
+    """Split SRT content into (number, timestamp, text) blocks."""
+    blocks = []
+    bloc = []
+    for line in content.splitlines() + [""]:
+        if line.strip() == "":
+            if len(bloc) >= 3:
+                blocks.append((bloc[0], bloc[1], " ".join(bloc[2:])))
+            bloc = []
+        else:
+            bloc.append(line)
+    return blocks
+
+
+def render_srt_blocks(blocks: list[tuple[str, str, str]], texts: list[str]) -> str:
+    """Rebuild an SRT from parsed blocks with their text replaced by texts."""
+    return "\n".join(
+        f"{numero}\n{timestamp}\n{text}\n"
+        for (numero, timestamp, _), text in zip(blocks, texts)
+    )
+
+
+async def iter_srt_translations(blocks: list[tuple[str, str, str]],
+                                source_lang: str = "en", target_lang: str = "fr",
+                                concurrency: int = OLLAMA_CONCURRENCY,
+                                batch_size: int = 1) -> AsyncIterator[tuple[int, str]]:
+    """Translate SRT blocks with at most `concurrency` Ollama calls in flight.
+
+    Yields (block index, translation) as soon as each batch completes, so
+    indices arrive out of order. With batch_size > 1, consecutive cues share
+    one numbered prompt (see make_cue_batches). Progress is reported per
+    completed cue.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    texts = [texte for _, _, texte in blocks]
+    batches = make_cue_batches(texts, max_cues=max(1, batch_size))
+    total = len(blocks)
+    done = 0
+
+    async def _translate_batch(indices: list[int]) -> tuple[list[int], list[str]]:
+        nonlocal done
+        async with semaphore:
+            translated = await call_ollama_batch(
+                [texts[i] for i in indices], source_lang, target_lang
+            )
+        done += len(indices)
+        await send_progress(done, total)
+        first, last = blocks[indices[0]][0], blocks[indices[-1]][0]
+        label = f"Block {first}" if first == last else f"Blocks {first}-{last}"
+        await send_log(f"  {label} translated")
+        return indices, translated
+
+    tasks = [asyncio.create_task(_translate_batch(b)) for b in batches]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            indices, translated = await next_done
+            for idx, text in zip(indices, translated):
+                yield idx, text
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def translate_srt_blocks(blocks: list[tuple[str, str, str]],
+                               source_lang: str = "en", target_lang: str = "fr",
+                               concurrency: int = OLLAMA_CONCURRENCY,
+                               batch_size: int = 1) -> list[str]:
+    """Like iter_srt_translations, but returns translations in cue order."""
+    results = [None] * len(blocks)
+    async for idx, translated in iter_srt_translations(
+        blocks, source_lang, target_lang, concurrency, batch_size
+    ):
+        results[idx] = translated
+    return results
+
+
+_PARAGRAPH_BREAK = re.compile(r"(\n\s*\n)")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?\u3002\uff01\uff1f])(\s+)")
+
+
+def _split_keep_separators(text: str, pattern: re.Pattern) -> list[tuple[str, str]]:
+    """Split text into (piece, separator_after) pairs."""
+    parts = pattern.split(text)
+    return [
+        (parts[i], parts[i + 1] if i + 1 < len(parts) else "")
+        for i in range(0, len(parts), 2)
+    ]
+
+
+def _split_words(sentence: str, max_tokens: int) -> list[tuple[str, str]]:
+    """Cut an oversized sentence into (piece, separator) pairs of at most max_tokens.
+
+    Words are added while estimate_tokens allows; a word longer than the
+    budget on its own (e.g. unspaced CJK text) is cut every max_tokens * 4
+    characters.
+    """
+    width = max_tokens * 4
+    pieces = []
+    group = []
+    for word in sentence.split(" "):
+        while estimate_tokens(word) > max_tokens:
+            if group:
+                pieces.append((" ".join(group), " "))
+                group = []
+            pieces.append((word[:width], ""))
+            word = word[width:]
+        if group and estimate_tokens(" ".join(group + [word])) > max_tokens:
+            pieces.append((" ".join(group), " "))
+            group = []
+        group.append(word)
+    pieces.append((" ".join(group), ""))
+    return pieces
+
+
+def split_text_chunks(text: str, max_tokens: int = TEXT_CHUNK_TOKENS) -> list[tuple[str, str]]:
+    """Split a document into chunks of at most ~max_tokens.
+
+    Paragraphs are kept whole when they fit, otherwise split on sentences,
+    and only oversized sentences are split on words. Returns
+    (chunk, separator) pairs: "".join(chunk + sep) rebuilds the layout.
+    Leading blank lines come back as an empty first chunk.
+    """
+    units = []
+    for para, para_sep in _split_keep_separators(text, _PARAGRAPH_BREAK):
+        if estimate_tokens(para) <= max_tokens:
+            units.append((para, para_sep))
+            continue
+        sentences = _split_keep_separators(para, _SENTENCE_BREAK)
+        for i, (sentence, sentence_sep) in enumerate(sentences):
+            sep = sentence_sep if i < len(sentences) - 1 else para_sep
+            if estimate_tokens(sentence) <= max_tokens:
+                units.append((sentence, sep))
+                continue
+            pieces = _split_words(sentence, max_tokens)
+            pieces[-1] = (pieces[-1][0], sep)
+            units.extend(pieces)
+
+    chunks = []
+    current, current_sep = "", ""
+    for piece, sep in units:
+        if not piece.strip():
+            current_sep += piece + sep
+            continue
+        if not current and current_sep:
+            chunks.append(("", current_sep))  # blank lines before the first text
+        if current and estimate_tokens(current + current_sep + piece) > max_tokens:
+            chunks.append((current, current_sep))
+            current = ""
+        current = f"{current}{current_sep}{piece}" if current else piece
+        current_sep = sep
+    if current or current_sep:
+        chunks.append((current, current_sep))
+    return chunks
+
+
+def _chunk_context(chunk: str, overlap: int) -> str:
+    """Last `overlap` sentences of a chunk, passed as context for the next one."""
+    if overlap <= 0:
+        return ""
+    sentences = [p for p, _ in _split_keep_separators(chunk, _SENTENCE_BREAK) if p.strip()]
+    return " ".join(sentences[-overlap:])
+
+
+async def translate_text_chunks(content: str, source_lang: str = "en",
+                                target_lang: str = "fr",
+                                concurrency: int = OLLAMA_CONCURRENCY,
+                                max_tokens: int = TEXT_CHUNK_TOKENS,
+                                overlap: int = 0) -> str:
+    """Translate a document chunk by chunk (see split_text_chunks).
+
+    Chunks are translated concurrently and reassembled in order. With
+    overlap > 0, the last sentences of the previous chunk are sent as
+    untranslated context.
+    """
+    chunks = split_text_chunks(content, max_tokens)
+    if len(chunks) <= 1:
+        return await call_ollama(content, source_lang, target_lang)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    total = len(chunks)
+    done = 0
+
+    async def _translate_chunk(idx: int) -> str:
+        nonlocal done
+        if not chunks[idx][0].strip():
+            return chunks[idx][0]
+        context = _chunk_context(chunks[idx - 1][0], overlap) if idx > 0 else ""
+        async with semaphore:
+            translated = await call_ollama(chunks[idx][0], source_lang, target_lang,
+                                           context=context)
+        done += 1
+        await send_progress(done, total)
+        await send_log(f"  Chunk {idx + 1}/{total} translated")
+        return translated
+
+    await send_log(f"  {total} chunks, {max(1, concurrency)} in parallel")
+    translations = await asyncio.gather(*(_translate_chunk(i) for i in range(total)))
+    return "".join(
+        translated + sep for translated, (_, sep) in zip(translations, chunks)
+    )
+
 
+class JobCancelled(Exception):
+    """Raised inside a transcription when its job has been cancelled."""
 
-def _transcribe_file_sync(model: WhisperModel, file_path: str, audio_code: str,
-                          target_code: str, progress_queue=None) -> str:
+
+def _decode_options(audio_code: str, target_code: str,
+                    word_timestamps: bool = False) -> dict:
     task = "translate" if audio_code != target_code else "transcribe"
-    segments, info = model.transcribe(
-        file_path,
+    options = dict(
         task=task,
         language=audio_code,
         beam_size=1,
         vad_filter=True,
         vad_parameters=dict(min_silence_duration_ms=500),
     )
-    duration = info.duration if info and hasattr(info, "duration") else 0
+    if word_timestamps:
+        options["word_timestamps"] = True
+    return options
+
+
+def _whisper_transcribe(model: WhisperModel, audio: str | np.ndarray,
+                        audio_code: str, target_code: str, batch_size: int = 0,
+                        word_timestamps: bool = False):
+    """Run Whisper on a file or 16 kHz PCM buffer; batch_size > 0 decodes VAD chunks in batches."""
+    options = _decode_options(audio_code, target_code, word_timestamps)
+    if batch_size > 0:
+        return BatchedInferencePipeline(model).transcribe(
+            audio, batch_size=batch_size, **options,
+        )
+    return model.transcribe(audio, **options)
+
+
+def segments_to_srt(segments: list[dict]) -> str:
     srt_lines = []
     for idx, seg in enumerate(segments, start=1):
-        start = format_timestamp(seg.start)
-        end = format_timestamp(seg.end)
+        start = format_timestamp(seg["start"])
+        end = format_timestamp(seg["end"])
+        srt_lines.append(f"{idx}\n{start} --> {end}\n{seg['text']}\n")
+    return "\n".join(srt_lines)
+
+
+def _transcribe_segments_sync(model: WhisperModel, audio: str | np.ndarray,
+                               audio_code: str, target_code: str,
+                               progress_queue=None,
+                               cancel_event: threading.Event | None = None,
+                               batch_size: int = 0,
+                               model_name: str | None = None,
+                               word_timestamps: bool = False) -> list[dict]:
+    """Run Whisper and return raw segment dicts (start, end, text[, words]).
+
+    When model_name is given, results are looked up in and stored to the
+    transcription cache, keyed by the audio content and the decode options.
+    """
+    cache_key = None
+    if model_name and transcription_cache.enabled:
+        options = dict(
+            _decode_options(audio_code, target_code, word_timestamps), batched=batch_size > 0,
+        )
+        cache_key = TranscriptionCache.make_key(content_hash(audio), model_name, options)
+        cached = transcription_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    segments, info = _whisper_transcribe(
+        model, audio, audio_code, target_code, batch_size, word_timestamps,
+    )
+    duration = info.duration if info and hasattr(info, "duration") else 0
+    results = []
+    for seg in segments:
+        if cancel_event is not None and cancel_event.is_set():
+            raise JobCancelled()
         text = seg.text.strip()
-        srt_lines.append(f"{idx}\n{start} --> {end}\n{text}\n")
+        result = {"start": seg.start, "end": seg.end, "text": text}
+        if word_timestamps and seg.words:
+            result["words"] = [
+                {"start": w.start, "end": w.end, "word": w.word} for w in seg.words
+            ]
+        results.append(result)
         if progress_queue is not None and duration > 0:
             progress_queue.put_nowait({
                 "current": round(seg.end, 1),
@@ -170,39 +1206,83 @@ def _transcribe_file_sync(model: WhisperModel, file_path: str, audio_code: str,
                 "percent": min(int((seg.end / duration) * 100), 99),
                 "segment_text": text,
             })
-    return "\n".join(srt_lines)
-
-
-async def transcribe_file(model: WhisperModel, file_path: str, audio_code: str,
-                           target_code: str) -> str:
-    import queue
-    progress_queue = queue.Queue()
-
-    async def _poll_progress():
-        while True:
-            try:
-                msg = progress_queue.get_nowait()
-                await send_progress(msg["current"], msg["total"])
+    if cache_key is not None:
+        transcription_cache.put(cache_key, results)
+    return results
+
+
+def _transcribe_file_sync(model: WhisperModel, audio: str | np.ndarray,
+                          audio_code: str, target_code: str, progress_queue=None,
+                          cancel_event: threading.Event | None = None,
+                          batch_size: int = 0, model_name: str | None = None) -> str:
+    return segments_to_srt(_transcribe_segments_sync(
+        model, audio, audio_code, target_code, progress_queue,
+        cancel_event, batch_size, model_name,
+    ))
+
+
+class ProgressForwarder:
+    """Push per-segment progress from a worker thread into the event loop.
+
+    put_nowait() is safe to call from any thread: it hands the message to
+    the loop with call_soon_threadsafe, so nothing polls while the worker is
+    quiet. Segment lines are all forwarded; the progress bar update is
+    coalesced to at most one per interval. Leaving the context flushes
+    everything the worker has put.
+    """
+
+    def __init__(self, interval: float = PROGRESS_INTERVAL):
+        self.interval = interval
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue[dict | None] = asyncio.Queue()
+        self._closing = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def put_nowait(self, msg: dict):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, msg)
+
+    async def _run(self):
+        done = False
+        while not done:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            done = batch[-1] is None
+            messages = [msg for msg in batch if msg is not None]
+            for msg in messages:
                 await send_log(
                     f"  [{format_timestamp(msg['current'])}] {msg['segment_text']}",
                 )
-            except queue.Empty:
-                pass
-            await asyncio.sleep(0.3)
-
-    poll_task = asyncio.create_task(_poll_progress())
-    try:
-        result = await asyncio.to_thread(
-            _transcribe_file_sync, model, file_path, audio_code, target_code,
-            progress_queue,
+            if messages:
+                await send_progress(messages[-1]["current"], messages[-1]["total"])
+            if not done:
+                # Coalescing pause, cut short when the worker has finished
+                try:
+                    await asyncio.wait_for(self._closing.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def __aenter__(self) -> "ProgressForwarder":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # Runs after the worker returned: its call_soon_threadsafe callbacks
+        # were queued before the result, so the sentinel comes last.
+        self._closing.set()
+        self._queue.put_nowait(None)
+        await self._task
+
+
+async def transcribe_file(model: WhisperModel, audio: str | np.ndarray,
+                           audio_code: str, target_code: str,
+                           cancel_event: threading.Event | None = None,
+                           batch_size: int = 0, model_name: str | None = None) -> str:
+    async with ProgressForwarder() as progress:
+        return await asyncio.to_thread(
+            _transcribe_file_sync, model, audio, audio_code, target_code,
+            progress, cancel_event, batch_size, model_name,
         )
-    finally:
-        poll_task.cancel()
-        # Flush remaining messages
-        while not progress_queue.empty():
-            msg = progress_queue.get_nowait()
-            await send_progress(msg["current"], msg["total"])
-    return result
 
 
 def save_upload(upload: UploadFile, dest_dir: str) -> str:
@@ -213,22 +1293,742 @@ def save_upload(upload: UploadFile, dest_dir: str) -> str:
     return path
 
 
+def find_media_files(root_dir: str) -> list[str]:
+    """Supported media files under root_dir, as the desktop batch walks them."""
+    return sorted(
+        os.path.join(dirpath, fname)
+        for dirpath, _, filenames in os.walk(root_dir)
+        for fname in filenames
+        if fname.lower().endswith(SUPPORTED_EXTENSIONS)
+    )
+
+
+def subtitle_path(media_path: str, target_lang: str) -> str:
+    """<dir>/subtitle_<lang>/<name>.srt, the desktop batch output layout."""
+    parent, filename = os.path.split(media_path)
+    return os.path.join(
+        parent, f"subtitle_{target_lang}", os.path.splitext(filename)[0] + ".srt",
+    )
+
+
+def write_srt(path: str, content: str):
+    """Write an SRT next to its media; renamed into place so it is never partial."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part_path = path + ".part"
+    with open(part_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(part_path, path)
+
+
+# ──────────────────── Audio ingest ───────────────────
+
+SAMPLE_RATE = 16000
+UPLOAD_CHUNK_BYTES = 1 << 20
+# MP4-family containers may keep their index at the end of the file, which
+# ffmpeg cannot reach from a pipe; these are spooled to disk once instead.
+SEEKABLE_INPUT_EXTENSIONS = (".mp4", ".m4a", ".mov")
+
+
+def pcm_to_float(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _ffmpeg_decode_cmd(source: str) -> list[str]:
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-i", source,
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+
+
+async def _run_ffmpeg_decode(source: str, upload: UploadFile | None = None) -> np.ndarray:
+    proc = await asyncio.create_subprocess_exec(
+        *_ffmpeg_decode_cmd(source),
+        stdin=subprocess.PIPE if upload is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+    async def _feed():
+        try:
+            while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                proc.stdin.write(chunk)
+                await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # ffmpeg exited early; its stderr says why
+        finally:
+            proc.stdin.close()
+
+    feeder = asyncio.create_task(_feed()) if upload is not None else None
+    try:
+        pcm, err = await asyncio.gather(proc.stdout.read(), proc.stderr.read())
+        if feeder is not None:
+            await feeder
+        returncode = await proc.wait()
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+        raise
+    if returncode != 0 or not pcm:
+        detail = err.decode("utf-8", "replace").strip().splitlines()
+        raise RuntimeError(f"ffmpeg could not decode audio: {detail[-1] if detail else returncode}")
+    return pcm_to_float(pcm)
+
+
+async def decode_audio(path: str) -> np.ndarray:
+    """Decode a media file to 16 kHz mono float32 PCM."""
+    return await _run_ffmpeg_decode(path)
+
+
+async def decode_upload(upload: UploadFile) -> np.ndarray:
+    """Decode an upload to 16 kHz mono float32 PCM without a temp copy.
+
+    The upload is streamed into ffmpeg's stdin; only containers that need a
+    seekable input are written to a single spool file first. The returned
+    buffer can be fed to Whisper and pyannote directly.
+    """
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    if suffix in SEEKABLE_INPUT_EXTENSIONS:
+        spool_dir = tempfile.mkdtemp()
+        try:
+            return await decode_audio(save_upload(upload, spool_dir))
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+    await upload.seek(0)
+    return await _run_ffmpeg_decode("pipe:0", upload)
+
+
+# ──────────────────── Live transcription ─────────────
+
+class LiveTranscriber:
+    """Incremental Whisper decoding over a sliding window of streamed PCM.
+
+    Audio is appended with feed(); each step() re-decodes the uncommitted
+    window. Text that VAD shows is followed by a pause is committed as final
+    segments and dropped from the window; the rest is reported as a partial.
+    A window that grows past window seconds without a pause is cut at the
+    start of its last segment.
+    """
+
+    def __init__(self, model: WhisperModel, audio_code: str, target_code: str,
+                 window: float = LIVE_WINDOW_SECONDS, silence_ms: int = LIVE_SILENCE_MS):
+        self.model = model
+        self.audio_code = audio_code
+        self.target_code = target_code
+        self.window_samples = int(window * SAMPLE_RATE)
+        self.silence_samples = int(silence_ms * SAMPLE_RATE / 1000)
+        self.vad_options = VadOptions(min_silence_duration_ms=silence_ms, speech_pad_ms=100)
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.offset = 0.0  # stream time of buffer[0], in seconds
+        self.pending = 0  # samples fed since the last step
+        self.prompt = ""
+        self._lock = threading.Lock()
+
+    @property
+    def pending_seconds(self) -> float:
+        return self.pending / SAMPLE_RATE
+
+    def feed(self, samples: np.ndarray):
+        with self._lock:
+            self.buffer = np.concatenate([self.buffer, samples])
+            self.pending += len(samples)
+
+    def _advance(self, samples: int):
+        with self._lock:
+            self.buffer = self.buffer[samples:]
+            self.offset += samples / SAMPLE_RATE
+
+    def _decode(self, audio: np.ndarray) -> list[dict]:
+        options = _decode_options(self.audio_code, self.target_code)
+        if self.prompt:
+            options["initial_prompt"] = self.prompt
+        segments, _ = self.model.transcribe(audio, **options)
+        return [
+            {"start": seg.start, "end": seg.end, "text": seg.text.strip()}
+            for seg in segments if seg.text.strip()
+        ]
+
+    def _commit(self, segments: list[dict]) -> list[dict]:
+        events = [
+            {"type": "final", "start": round(self.offset + seg["start"], 2),
+             "end": round(self.offset + seg["end"], 2), "text": seg["text"]}
+            for seg in segments
+        ]
+        if segments:
+            # Keep the tail of the committed text as context for the next window
+            self.prompt = " ".join(seg["text"] for seg in segments)[-200:]
+        return events
+
+    def step(self, final: bool = False) -> list[dict]:
+        """Decode the current window; return final and partial segment events."""
+        with self._lock:
+            audio = self.buffer
+            self.pending = 0
+        n = len(audio)
+        if n == 0:
+            return []
+
+        speech = get_speech_timestamps(audio, self.vad_options)
+        if not speech:
+            # Nothing to say yet: keep only a short lead-in for the next word
+            self._advance(n if final else max(0, n - self.silence_samples))
+            return []
+
+        if final or n - speech[-1]["end"] >= self.silence_samples:
+            cut = n if final else speech[-1]["end"]
+            events = self._commit(self._decode(audio[:cut]))
+            self._advance(cut)
+            return events
+
+        segments = self._decode(audio)
+        events = []
+        if n > self.window_samples and segments:
+            # No pause in sight: commit all but the segment still being spoken
+            done, segments = (segments[:-1], segments[-1:]) if len(segments) > 1 else (segments, [])
+            cut = min(n, int(segments[0]["start"] * SAMPLE_RATE)) if segments else n
+            events = self._commit(done)
+            self._advance(cut)
+            segments = [
+                dict(seg, start=seg["start"] - cut / SAMPLE_RATE, end=seg["end"] - cut / SAMPLE_RATE)
+                for seg in segments
+            ]
+        if segments:
+            events.append({
+                "type": "partial",
+                "start": round(self.offset + segments[0]["start"], 2),
+                "end": round(self.offset + segments[-1]["end"], 2),
+                "text": " ".join(seg["text"] for seg in segments),
+            })
+        return events
+
+
+def _whole_samples(data: bytes) -> tuple[bytes, bytes]:
+    """Split s16le bytes into whole samples and the odd trailing byte, if any."""
+    whole = len(data) - len(data) % 2
+    return data[:whole], data[whole:]
+
+
+async def _pipe_live_decoder(proc, feed):
+    """Feed PCM from a streaming ffmpeg decoder as it comes out."""
+    remainder = b""
+    while chunk := await proc.stdout.read(UPLOAD_CHUNK_BYTES):
+        samples, remainder = _whole_samples(remainder + chunk)
+        if samples:
+            feed(pcm_to_float(samples))
+
+
+# ──────────────────── Batch worker pool ──────────────
+
+# Model held by each pool worker process (set by _pool_init)
+_pool_model: WhisperModel | None = None
+_pool_model_name: str | None = None
+# One pool per (model, workers), with the number of callers using it
+_process_pools: OrderedDict[tuple[str, int], ProcessPoolExecutor] = OrderedDict()
+_process_pool_users: dict[tuple[str, int], int] = {}
+IDLE_PROCESS_POOLS = 1  # unused pools kept warm for the next batch
+
+
+def split_cpu_threads(workers: int) -> int:
+    """CTranslate2 threads per worker so that workers x threads ~= physical cores."""
+    cores = psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    return max(1, cores // max(1, workers))
+
+
+def _pool_init(model_name: str, cpu_threads: int):
+    global _pool_model, _pool_model_name
+    _pool_model_name = model_name
+    _pool_model = WhisperModel(
+        model_name, device=DEVICE, compute_type=COMPUTE_TYPE,
+        cpu_threads=cpu_threads, num_workers=1,
+    )
+
+
+def _pool_transcribe(file_path: str, audio_code: str, target_code: str,
+                     batch_size: int = 0) -> str:
+    return _transcribe_file_sync(
+        _pool_model, file_path, audio_code, target_code, batch_size=batch_size,
+        model_name=_pool_model_name,
+    )
+
+
+def _pool_transcribe_segments(audio: np.ndarray, audio_code: str, target_code: str,
+                              batch_size: int = 0) -> list[dict]:
+    return _transcribe_segments_sync(
+        _pool_model, audio, audio_code, target_code, batch_size=batch_size,
+        model_name=_pool_model_name,
+    )
+
+
+@contextmanager
+def process_pool(model_name: str, workers: int):
+    """Pool of `workers` processes, each with its own copy of the model.
+
+    Pools are shared by concurrent callers with the same model and worker
+    count. A pool is only shut down once nobody uses it and more than
+    IDLE_PROCESS_POOLS are idle, so one batch never cancels another's work.
+    """
+    key = (model_name, workers)
+    pool = _process_pools.get(key)
+    if pool is None:
+        pool = _process_pools[key] = ProcessPoolExecutor(
+            max_workers=workers,
+            # spawn: forking a process with live threads/CUDA state is unsafe
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_pool_init,
+            initargs=(model_name, split_cpu_threads(workers)),
+        )
+    _process_pools.move_to_end(key)
+    _process_pool_users[key] = _process_pool_users.get(key, 0) + 1
+    try:
+        yield pool
+    finally:
+        _process_pool_users[key] -= 1
+        _trim_process_pools()
+
+
+def _trim_process_pools(keep_idle: int = IDLE_PROCESS_POOLS):
+    idle = [key for key in _process_pools if not _process_pool_users.get(key)]
+    for key in idle[:max(0, len(idle) - keep_idle)]:  # least recently used first
+        _process_pools.pop(key).shutdown(wait=False)
+        _process_pool_users.pop(key, None)
+
+
+def shutdown_process_pool():
+    """Stop every pool, abandoning queued work (application shutdown)."""
+    while _process_pools:
+        _, pool = _process_pools.popitem()
+        pool.shutdown(wait=False, cancel_futures=True)
+    _process_pool_users.clear()
+
+
+def probe_duration(path: str) -> float:
+    """Media duration in seconds (ffprobe), estimated from file size if probing fails."""
+    try:
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", path],
+            capture_output=True, text=True, timeout=30, check=True,
+        )
+        return float(out.stdout.strip())
+    except (OSError, subprocess.SubprocessError, ValueError):
+        # ~128 kbit/s
+        return os.path.getsize(path) / 16_000
+
+
+async def transcribe_files_parallel(
+    files: list[tuple[str, str]], model_name: str, audio_code: str,
+    target_code: str, workers: int, batch_size: int = 0,
+) -> AsyncIterator[tuple[str, str | None, Exception | None]]:
+    """Transcribe (name, path) pairs across a process pool, longest first.
+
+    Yields (name, srt, error) as each file finishes.
+    """
+    durations = await asyncio.gather(
+        *(asyncio.to_thread(probe_duration, path) for _, path in files)
+    )
+    order = sorted(range(len(files)), key=lambda i: durations[i], reverse=True)
+    with process_pool(model_name, workers) as pool:
+        loop = asyncio.get_running_loop()
+        pending = {
+            loop.run_in_executor(
+                pool, _pool_transcribe, files[i][1], audio_code, target_code, batch_size,
+            ): i
+            for i in order
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    name = files[pending.pop(fut)][0]
+                    try:
+                        yield name, fut.result(), None
+                    except (Exception, asyncio.CancelledError) as e:
+                        yield name, None, e
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+
+# ──────────────────── Long-file chunking ─────────────
+
+# Overlap given to chunks cut in the middle of speech, so that the word on
+# the cut is decoded whole by one side; the duplicate is removed on stitching.
+HARD_CUT_OVERLAP = 1.0
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def split_at_silences(audio: np.ndarray,
+                      chunk_seconds: float = LONG_CHUNK_SECONDS) -> list[tuple[int, int]]:
+    """Split PCM into (start, end) sample ranges of chunk_seconds to twice that.
+
+    Each chunk ends in the middle of the first VAD pause past chunk_seconds.
+    Without a pause it is cut at twice chunk_seconds, and the next chunk
+    starts HARD_CUT_OVERLAP seconds earlier.
+    """
+    n = len(audio)
+    target = int(chunk_seconds * SAMPLE_RATE)
+    limit = 2 * target
+    speech = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=500))
+    cuts = [(a["end"] + b["start"]) // 2 for a, b in zip(speech, speech[1:])]
+    chunks = []
+    start = 0
+    while n - start > limit:
+        i = bisect.bisect_left(cuts, start + target)
+        if i < len(cuts) and cuts[i] <= start + limit:
+            chunks.append((start, cuts[i]))
+            start = cuts[i]
+        else:
+            chunks.append((start, start + limit))
+            start += limit - int(HARD_CUT_OVERLAP * SAMPLE_RATE)
+    chunks.append((start, n))
+    return chunks
+
+
+def _same_text(a: str, b: str) -> bool:
+    a = _NON_WORD.sub(" ", a.lower()).strip()
+    b = _NON_WORD.sub(" ", b.lower()).strip()
+    return bool(a) and bool(b) and (a in b or b in a)
+
+
+def stitch_segments(chunks: list[tuple[float, list[dict]]]) -> list[dict]:
+    """Merge per-chunk segments, given as (offset seconds, segments), into one timeline.
+
+    A segment overlapping the previous one is dropped when it repeats its
+    text or lies inside it, and otherwise starts where the previous ends.
+    """
+    merged = []
+    for offset, segments in chunks:
+        for seg in segments:
+            seg = dict(seg, start=seg["start"] + offset, end=seg["end"] + offset)
+            if "words" in seg:
+                seg["words"] = [
+                    dict(w, start=w["start"] + offset, end=w["end"] + offset)
+                    for w in seg["words"]
+                ]
+            if merged and seg["start"] < merged[-1]["end"]:
+                prev = merged[-1]
+                if seg["end"] <= prev["end"] or _same_text(seg["text"], prev["text"]):
+                    continue
+                seg["start"] = prev["end"]
+            merged.append(seg)
+    return merged
+
+
+async def transcribe_long(audio: np.ndarray, model_name: str, audio_code: str,
+                          target_code: str, workers: int, batch_size: int = 0,
+                          cancel_event: threading.Event | None = None) -> list[dict]:
+    """Transcribe a long recording as silence-aligned chunks across the process pool.
+
+    Progress is reported as the share of audio in finished chunks.
+    """
+    chunks = await asyncio.to_thread(split_at_silences, audio)
+    total = len(audio) / SAMPLE_RATE
+    await send_log(f"Long-file mode: {len(chunks)} chunks over {workers} workers")
+    with process_pool(model_name, workers) as pool:
+        loop = asyncio.get_running_loop()
+        pending = {
+            loop.run_in_executor(
+                pool, _pool_transcribe_segments, audio[start:end], audio_code, target_code,
+                batch_size,
+            ): index
+            for index, (start, end) in enumerate(chunks)
+        }
+        results: list[list[dict] | None] = [None] * len(chunks)
+        done_seconds = 0.0
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    index = pending.pop(fut)
+                    results[index] = fut.result()
+                    start, end = chunks[index]
+                    done_seconds += (end - start) / SAMPLE_RATE
+                    await send_log(
+                        f"  Chunk {index + 1}/{len(chunks)} done "
+                        f"[{format_timestamp(start / SAMPLE_RATE)} - {format_timestamp(end / SAMPLE_RATE)}]"
+                    )
+                    await send_progress(round(min(done_seconds, total), 1), round(total, 1))
+                if cancel_event is not None and cancel_event.is_set():
+                    raise JobCancelled()
+        finally:
+            for fut in pending:
+                fut.cancel()
+    return stitch_segments([
+        (start / SAMPLE_RATE, segments) for (start, _), segments in zip(chunks, results)
+    ])
+
+
 # ──────────────────── Diarization ─────────────────────
 
-_diarization_cache: dict[str, dict] = {}
 _diarization_pipeline = None
-DIARIZATION_TTL = 3600  # 1 hour
+DIARIZATION_DIR = os.path.join(CACHE_DIR, "diarization")
+
+
+class SessionStore(ABC):
+    """Storage for diarization sessions between /api/diarize and /api/transcribe-diarized.
+
+    A session holds the decoded audio, pyannote's speakers and turns, and
+    optionally a finished Whisper pass. Subclasses must be reachable from
+    every worker process.
+    """
+
+    @abstractmethod
+    def create(self, session_id: str, audio: np.ndarray, speakers: list[str],
+               segments: list, filename: str):
+        ...
+
+    @abstractmethod
+    def get(self, session_id: str) -> dict | None:
+        ...
+
+    @abstractmethod
+    def set_whisper(self, session_id: str, key: list, segments: list[dict]):
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def reap(self) -> int:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """Session count and disk usage, served by GET /api/diarization-sessions."""
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in SQLite, audio as memory-mapped .npy files in sessions_dir.
+
+    Sessions expire ttl seconds after their last use. When the audio on disk
+    exceeds max_mb, least-recently-used sessions are evicted first.
+    """
+
+    def __init__(self, db_path: str, sessions_dir: str,
+                 ttl: float = DIARIZATION_TTL, max_mb: int = DIARIZATION_DISK_MB):
+        self.db_path = db_path
+        self.sessions_dir = sessions_dir
+        self.ttl = ttl
+        self.max_bytes = max_mb * 1024 * 1024
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None, timeout=30
+            )
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, filename TEXT NOT NULL, speakers TEXT NOT NULL, "
+                "segments TEXT NOT NULL, audio_path TEXT NOT NULL, "
+                "size INTEGER NOT NULL, whisper_key TEXT, whisper_segments TEXT, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sessions_last_used ON sessions (last_used)"
+            )
+        return self._conn
+
+    @staticmethod
+    def _remove_files(paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self, conn: sqlite3.Connection, needed: int) -> list[str]:
+        """Delete LRU rows until needed more bytes fit; return their audio paths."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM sessions").fetchone()[0]
+        excess = total + needed - self.max_bytes
+        evicted = []
+        if excess > 0:
+            for row in conn.execute(
+                "SELECT id, audio_path, size FROM sessions ORDER BY last_used"
+            ).fetchall():
+                if excess <= 0:
+                    break
+                conn.execute("DELETE FROM sessions WHERE id = ?", (row["id"],))
+                evicted.append(row["audio_path"])
+                excess -= row["size"]
+        return evicted
+
+    def create(self, session_id, audio, speakers, segments, filename):
+        os.makedirs(self.sessions_dir, exist_ok=True)
+        audio_path = os.path.join(self.sessions_dir, f"{session_id}.npy")
+        np.save(audio_path, audio)
+        size = os.path.getsize(audio_path)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                evicted = self._evict(conn, size)
+                conn.execute(
+                    "INSERT INTO sessions (id, filename, speakers, segments, audio_path, "
+                    "size, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, filename, _json.dumps(speakers), _json.dumps(segments),
+                     audio_path, size, now, now),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                self._remove_files([audio_path])
+                raise
+        self._remove_files(evicted)
+
+    def get(self, session_id):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT * FROM sessions WHERE id = ? AND last_used > ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE sessions SET last_used = ? WHERE id = ?", (time.time(), session_id)
+            )
+        try:
+            audio = np.load(row["audio_path"], mmap_mode="r")
+        except OSError:
+            return None
+        return {
+            "audio": audio,
+            "filename": row["filename"],
+            "speakers": _json.loads(row["speakers"]),
+            "segments": _json.loads(row["segments"]),
+            "whisper_key": _json.loads(row["whisper_key"]) if row["whisper_key"] else None,
+            "whisper_segments": (
+                _json.loads(row["whisper_segments"]) if row["whisper_segments"] else None
+            ),
+            "created_at": row["created_at"],
+        }
 
+    def set_whisper(self, session_id, key, segments):
+        with self._lock:
+            self._connect().execute(
+                "UPDATE sessions SET whisper_key = ?, whisper_segments = ? WHERE id = ?",
+                (_json.dumps(key), _json.dumps(segments), session_id),
+            )
+
+    def delete(self, session_id):
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT audio_path FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        if row is not None:
+            self._remove_files([row["audio_path"]])
+
+    def reap(self) -> int:
+        """Delete expired sessions and audio files no session refers to."""
+        with self._lock:
+            conn = self._connect()
+            cutoff = time.time() - self.ttl
+            expired = [
+                row["audio_path"] for row in conn.execute(
+                    "SELECT audio_path FROM sessions WHERE last_used <= ?", (cutoff,)
+                ).fetchall()
+            ]
+            conn.execute("DELETE FROM sessions WHERE last_used <= ?", (cutoff,))
+            live = {
+                row["audio_path"] for row in conn.execute("SELECT audio_path FROM sessions")
+            }
+        self._remove_files(expired)
+        if os.path.isdir(self.sessions_dir):
+            # Leftovers from a crash between np.save and the INSERT, or a lost row
+            for name in os.listdir(self.sessions_dir):
+                path = os.path.join(self.sessions_dir, name)
+                if name.endswith(".npy") and path not in live \
+                        and os.path.getmtime(path) <= cutoff:
+                    self._remove_files([path])
+        return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "sessions": count,
+            "size_mb": round(size / (1024 * 1024), 2),
+            "max_mb": self.max_bytes // (1024 * 1024),
+            "ttl": self.ttl,
+        }
 
-def _cleanup_expired_sessions():
-    now = time.time()
-    expired = [
-        sid for sid, data in _diarization_cache.items()
-        if now - data["created_at"] > DIARIZATION_TTL
-    ]
-    for sid in expired:
-        shutil.rmtree(_diarization_cache[sid].get("tmp_dir", ""), ignore_errors=True)
-        del _diarization_cache[sid]
+
+session_store: SessionStore = SQLiteSessionStore(
+    os.path.join(CACHE_DIR, "sessions.db"), DIARIZATION_DIR,
+)
+# Whisper passes started by /api/diarize in this process, by session ID
+_session_tasks: dict[str, dict] = {}
+
+
+async def _session_reaper():
+    while True:
+        await asyncio.sleep(DIARIZATION_REAP_INTERVAL)
+        try:
+            removed = await asyncio.to_thread(session_store.reap)
+            if removed:
+                await send_log(f"Expired {removed} diarization session(s)")
+        except Exception:
+            traceback.print_exc()
+
+
+def _whisper_key(model_name: str, audio_lang: str, target_lang: str, batch_size: int,
+                 word_timestamps: bool) -> list:
+    return [model_name, audio_lang, target_lang, batch_size > 0, word_timestamps]
+
+
+def _whisper_key_serves(have: list | None, want: list) -> bool:
+    """True if a Whisper pass made with `have` can answer a request for `want`.
+
+    Segments with word timings also serve a request that does not need them.
+    """
+    return (have is not None and len(have) == len(want) and have[:-1] == want[:-1]
+            and (have[-1] or not want[-1]))
+
+
+def _start_session_transcription(session_id: str, audio: np.ndarray, model_name: str,
+                                 audio_lang: str, target_lang: str,
+                                 batch_size: int, word_timestamps: bool = False) -> dict:
+    """Start the Whisper pass for a diarization session in the background.
+
+    The segments are written to the session store when done, so any worker
+    can serve the naming step.
+    """
+    key = _whisper_key(model_name, audio_lang, target_lang, batch_size, word_timestamps)
+
+    async def _run() -> list[dict]:
+        model = await load_model(model_name)
+        segments = await asyncio.to_thread(
+            _transcribe_segments_sync, model, audio, audio_lang, target_lang,
+            batch_size=batch_size, model_name=model_name, word_timestamps=word_timestamps,
+        )
+        # No-op if the session row does not exist yet; diarize_file stores it then
+        await asyncio.to_thread(session_store.set_whisper, session_id, key, segments)
+        await send_log(f"Whisper pass complete: {len(segments)} segment(s)")
+        return segments
+
+    task = asyncio.create_task(_run())
+    # Retrieve the outcome so an unused failed pass is not reported as unhandled
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    task.add_done_callback(lambda t: _session_tasks.pop(session_id, None))
+    whisper = {"key": key, "task": task}
+    _session_tasks[session_id] = whisper
+    return whisper
+
+
+def _drop_session(session_id: str):
+    whisper = _session_tasks.pop(session_id, None)
+    if whisper is not None:
+        whisper["task"].cancel()
+    session_store.delete(session_id)
 
 
 def _load_diarization_pipeline():
@@ -264,9 +2064,12 @@ def _load_diarization_pipeline():
     return _diarization_pipeline
 
 
-def _run_diarization_sync(pipeline, file_path: str):
-    """Run pyannote diarization. Returns (unique_speakers, segments)."""
-    diarization = pipeline(file_path)
+def _run_diarization_sync(pipeline, audio: np.ndarray):
+    """Run pyannote diarization on 16 kHz PCM. Returns (unique_speakers, segments)."""
+    import torch
+
+    waveform = torch.from_numpy(audio).unsqueeze(0)
+    diarization = pipeline({"waveform": waveform, "sample_rate": SAMPLE_RATE})
     segments = []
     speakers_set = set()
     for turn, _, speaker in diarization.itertracks(yield_label=True):
@@ -275,42 +2078,385 @@ def _run_diarization_sync(pipeline, file_path: str):
     return sorted(speakers_set), segments
 
 
-def _find_speaker(seg_start, seg_end, diar_segments, speaker_names):
-    """Find pyannote speaker with maximum time overlap for a Whisper segment."""
-    overlap_by_speaker = {}
-    for d_start, d_end, d_speaker in diar_segments:
-        overlap = max(0.0, min(seg_end, d_end) - max(seg_start, d_start))
-        if overlap > 0:
-            overlap_by_speaker[d_speaker] = overlap_by_speaker.get(d_speaker, 0.0) + overlap
-    if not overlap_by_speaker:
-        return "Unknown"
-    best = max(overlap_by_speaker, key=overlap_by_speaker.get)
-    return speaker_names.get(best, best)
+def _merge_turns(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sort turns and merge overlapping ones into disjoint intervals."""
+    order = np.argsort(starts, kind="stable")
+    starts, ends = starts[order], ends[order]
+    reach = np.maximum.accumulate(ends)
+    new_block = np.ones(len(starts), dtype=bool)
+    new_block[1:] = starts[1:] > reach[:-1]
+    block_starts = np.flatnonzero(new_block)
+    return starts[block_starts], np.maximum.reduceat(ends, block_starts)
+
+
+def _covered_until(t: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                   before: np.ndarray) -> np.ndarray:
+    """Time covered by disjoint sorted turns in [-inf, t], for every t."""
+    i = np.searchsorted(starts, t, side="right") - 1
+    j = np.maximum(i, 0)
+    inside = np.clip(t - starts[j], 0.0, ends[j] - starts[j])
+    return np.where(i >= 0, before[j] + inside, 0.0)
+
+
+def speaker_overlaps(starts, ends, diar_segments) -> tuple[list[str], np.ndarray]:
+    """Overlap (seconds) of each interval with each speaker's turns.
+
+    Returns (speakers in order of first appearance, matrix of shape
+    (len(starts), len(speakers))). Each speaker's turns are merged and
+    prefix-summed once; every interval is then two binary searches, so the
+    cost is O((segments + turns) log turns) per speaker.
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    speakers = list(dict.fromkeys(speaker for _, _, speaker in diar_segments))
+    overlaps = np.zeros((len(starts), len(speakers)))
+    if not len(starts) or not speakers:
+        return speakers, overlaps
+    turn_starts = np.array([t[0] for t in diar_segments], dtype=np.float64)
+    turn_ends = np.array([t[1] for t in diar_segments], dtype=np.float64)
+    index = {speaker: k for k, speaker in enumerate(speakers)}
+    labels = np.array([index[t[2]] for t in diar_segments])
+    for k in range(len(speakers)):
+        mask = labels == k
+        k_starts, k_ends = _merge_turns(turn_starts[mask], turn_ends[mask])
+        before = np.concatenate(([0.0], np.cumsum(k_ends - k_starts)[:-1]))
+        overlaps[:, k] = (
+            _covered_until(ends, k_starts, k_ends, before)
+            - _covered_until(starts, k_starts, k_ends, before)
+        )
+    return speakers, overlaps
 
 
-def _transcribe_segments_sync(model: WhisperModel, file_path: str,
-                               audio_code: str, target_code: str) -> list[dict]:
-    """Like _transcribe_file_sync but returns raw segment dicts."""
-    task = "translate" if audio_code != target_code else "transcribe"
-    segments, _info = model.transcribe(
-        file_path, task=task, language=audio_code,
-        beam_size=1, vad_filter=True,
-        vad_parameters=dict(min_silence_duration_ms=500),
+def assign_speakers(starts, ends, diar_segments) -> list[str | None]:
+    """Speaker label with the most overlap for each interval (None if none)."""
+    speakers, overlaps = speaker_overlaps(starts, ends, diar_segments)
+    if not speakers:
+        return [None] * len(starts)
+    best = overlaps.argmax(axis=1)
+    has_overlap = overlaps[np.arange(len(best)), best] > 0
+    return [speakers[b] if ok else None for b, ok in zip(best, has_overlap)]
+
+
+def _split_by_speaker(segments, diar_segments):
+    """Yield (start, end, text, label) pieces, splitting segments at speaker changes.
+
+    Segments carrying word timings are divided into runs of consecutive words
+    with the same speaker; words outside any turn stay with the previous run.
+    """
+    labels = assign_speakers(
+        [s["start"] for s in segments], [s["end"] for s in segments], diar_segments,
+    )
+    words = [(i, w) for i, s in enumerate(segments) for w in s.get("words") or ()]
+    word_labels = assign_speakers(
+        [w["start"] for _, w in words], [w["end"] for _, w in words], diar_segments,
     )
-    return [{"start": s.start, "end": s.end, "text": s.text.strip()} for s in segments]
+    words_by_segment: dict[int, list] = {}
+    for (i, word), label in zip(words, word_labels):
+        words_by_segment.setdefault(i, []).append((word, label))
+
+    for i, seg in enumerate(segments):
+        runs = []
+        for word, label in words_by_segment.get(i, ()):
+            label = label or (runs[-1][3] if runs else labels[i])
+            if runs and runs[-1][3] == label:
+                runs[-1][1] = word["end"]
+                runs[-1][2] += word["word"]
+            else:
+                runs.append([word["start"], word["end"], word["word"], label])
+        if len(runs) > 1:
+            for start, end, text, label in runs:
+                yield start, end, text.strip(), label
+        else:
+            yield seg["start"], seg["end"], seg["text"], labels[i]
 
 
-def _build_srt_with_speakers(segments, diar_segments, speaker_names):
+def _build_srt_with_speakers(segments, diar_segments, speaker_names, split_words=False):
     """Build SRT with [Speaker Name]: prefix."""
+    if split_words:
+        pieces = list(_split_by_speaker(segments, diar_segments))
+    else:
+        labels = assign_speakers(
+            [s["start"] for s in segments], [s["end"] for s in segments], diar_segments,
+        )
+        pieces = [
+            (s["start"], s["end"], s["text"], label) for s, label in zip(segments, labels)
+        ]
     srt_lines = []
-    for idx, seg in enumerate(segments, start=1):
-        start = format_timestamp(seg["start"])
-        end = format_timestamp(seg["end"])
-        speaker = _find_speaker(seg["start"], seg["end"], diar_segments, speaker_names)
-        srt_lines.append(f"{idx}\n{start} --> {end}\n[{speaker}]: {seg['text']}\n")
+    for idx, (seg_start, seg_end, text, label) in enumerate(pieces, start=1):
+        start = format_timestamp(seg_start)
+        end = format_timestamp(seg_end)
+        speaker = speaker_names.get(label, label) if label else "Unknown"
+        srt_lines.append(f"{idx}\n{start} --> {end}\n[{speaker}]: {text}\n")
     return "\n".join(srt_lines)
 
 
+# ──────────────────── Jobs ───────────────────────────
+
+JOB_STATUSES = ("queued", "running", "done", "failed", "cancelled")
+
+
+def _host_name() -> str:
+    return os.uname().nodename if hasattr(os, "uname") else "localhost"
+
+
+def _worker_name() -> str:
+    """host:pid:start time. The start time tells a restarted server that
+    reuses its PID (PID 1 in Docker) from the process that claimed a job."""
+    return f"{_host_name()}:{os.getpid()}:{int(psutil.Process().create_time())}"
+
+
+def _process_alive(pid: str, started: str) -> bool:
+    try:
+        return int(psutil.Process(int(pid)).create_time()) == int(started)
+    except (ValueError, psutil.Error):
+        return False
+
+
+class JobStore:
+    """Persistent transcription job queue backed by SQLite.
+
+    Uploaded media is kept in jobs_dir/<job_id>/ until the job ends. Any
+    process sharing the database can submit, claim and inspect jobs.
+    """
+
+    def __init__(self, db_path: str, jobs_dir: str):
+        self.db_path = db_path
+        self.jobs_dir = jobs_dir
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.db_path, check_same_thread=False, isolation_level=None, timeout=30
+            )
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, "
+                "params TEXT NOT NULL, result TEXT, error TEXT, "
+                "progress INTEGER NOT NULL DEFAULT 0, "
+                "cancel_requested INTEGER NOT NULL DEFAULT 0, worker TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)"
+            )
+        return self._conn
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    def create(self, kind: str, params: dict, job_id: str | None = None) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self._connect().execute(
+                "INSERT INTO jobs (id, kind, status, params, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, _json.dumps(params), now, now),
+            )
+        return job_id
+
+    def claim(self, worker: str) -> dict | None:
+        """Atomically move the oldest queued job to 'running'."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' "
+                    "ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, updated_at = ? "
+                        "WHERE id = ?", (worker, time.time(), row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"]) if row is not None else None
+
+    def update(self, job_id: str, **fields):
+        if fields.get("status", "queued") not in JOB_STATUSES:
+            raise ValueError(f"Unknown job status: {fields['status']}")
+        if "result" in fields:
+            fields["result"] = _json.dumps(fields["result"])
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._connect().execute(
+                f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id)
+            )
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = _json.loads(job["params"])
+        job["result"] = _json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def list(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, kind, status, progress, error, created_at, updated_at "
+                "FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def request_cancel(self, job_id: str) -> str | None:
+        """Cancel a queued job now, or flag a running one. Returns the new status."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job["status"] == "queued":
+            self.update(job_id, status="cancelled")
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+            return "cancelled"
+        if job["status"] == "running":
+            self.update(job_id, cancel_requested=1)
+        return job["status"]
+
+    def cancel_requested(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        return bool(job and job["cancel_requested"])
+
+    def heartbeat(self, job_id: str):
+        """Renew a running job's lease (its updated_at)."""
+        self.update(job_id)
+
+    def requeue_orphans(self, lease: float = JOB_LEASE_SECONDS):
+        """Re-queue 'running' jobs whose worker is gone.
+
+        A worker on this host is gone when no process with its PID and
+        start time is running; a worker on another host when its job has
+        not sent a heartbeat for `lease` seconds.
+        """
+        host = _host_name()
+        stale = time.time() - lease
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, worker, updated_at FROM jobs WHERE status = 'running'"
+            ).fetchall()
+        for row in rows:
+            worker = (row["worker"] or "").rsplit(":", 2)
+            if len(worker) == 3 and worker[0] == host:
+                orphaned = not _process_alive(worker[1], worker[2])
+            else:
+                orphaned = row["updated_at"] < stale
+            if not orphaned:
+                continue
+            with self._lock:
+                # Unless the job moved on (heartbeat, finished) since it was read
+                self._connect().execute(
+                    "UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ? "
+                    "WHERE id = ? AND status = 'running' AND updated_at = ?",
+                    (time.time(), row["id"], row["updated_at"]),
+                )
+
+
+job_store = JobStore(os.path.join(CACHE_DIR, "jobs.db"), os.path.join(CACHE_DIR, "jobs"))
+_job_wakeup = asyncio.Event()
+
+
+async def _watch_cancel(job_id: str, cancel_event: threading.Event):
+    """Propagate a cancel request (possibly from another process) to the worker thread.
+
+    Also renews the job's lease so that other hosts do not re-queue it.
+    """
+    last_heartbeat = time.monotonic()
+    while not cancel_event.is_set():
+        await asyncio.sleep(1.0)
+        if job_store.cancel_requested(job_id):
+            cancel_event.set()
+        if time.monotonic() - last_heartbeat >= JOB_LEASE_SECONDS / 4:
+            await asyncio.to_thread(job_store.heartbeat, job_id)
+            last_heartbeat = time.monotonic()
+
+
+async def run_transcription_job(job: dict):
+    """Transcribe every file of a claimed job and store the SRT results."""
+    job_id = job["id"]
+    params = job["params"]
+    token = current_job_id.set(job_id)
+    cancel_event = threading.Event()
+    watcher = asyncio.create_task(_watch_cancel(job_id, cancel_event))
+    finished = True
+    try:
+        await send_log(f"Job {job_id} started")
+        model = await load_model(params["model_name"])
+        files = params["files"]
+        results = {}
+        for index, entry in enumerate(files, start=1):
+            if cancel_event.is_set():
+                raise JobCancelled()
+            await send_log(f"Processing: {entry['filename']} ({index}/{len(files)})")
+            path = os.path.join(job_store.job_dir(job_id), entry["stored_as"])
+            batch_size = resolve_batch_size(params.get("batched", False), params.get("batch_size", 0))
+            workers = params.get("workers", 1)
+            if workers > 1 and await asyncio.to_thread(probe_duration, path) >= LONG_FILE_SECONDS:
+                srt = segments_to_srt(await transcribe_long(
+                    await decode_audio(path), params["model_name"], params["audio_lang"],
+                    params["target_lang"], workers, batch_size, cancel_event,
+                ))
+            else:
+                srt = await transcribe_file(
+                    model, path, params["audio_lang"], params["target_lang"], cancel_event,
+                    batch_size, model_name=params["model_name"],
+                )
+            results[f"{os.path.splitext(entry['filename'])[0]}.srt"] = srt
+            job_store.update(job_id, progress=int(index / len(files) * 100))
+        job_store.update(job_id, status="done", result=results, progress=100)
+        await send_log(f"Job {job_id} complete", color="green")
+    except JobCancelled:
+        job_store.update(job_id, status="cancelled")
+        await send_log(f"Job {job_id} cancelled", color="yellow")
+    except asyncio.CancelledError:
+        # Worker shut down: stop the transcription thread and hand the job,
+        # with its uploads, back to the queue for the next worker.
+        finished = False
+        cancel_event.set()
+        job_store.update(job_id, status="queued", worker=None, progress=0)
+        raise
+    except Exception as e:
+        job_store.update(job_id, status="failed", error=str(e))
+        await send_log(f"Job {job_id} failed: {e}", color="red")
+        traceback.print_exc()
+    finally:
+        watcher.cancel()
+        current_job_id.reset(token)
+        if finished:
+            shutil.rmtree(job_store.job_dir(job_id), ignore_errors=True)
+
+
+async def _job_worker():
+    """Pull queued jobs forever; woken on submit, polls for other processes' jobs."""
+    worker = _worker_name()
+    last_reap = time.monotonic()
+    while True:
+        if time.monotonic() - last_reap >= JOB_LEASE_SECONDS:
+            # Jobs of workers that died on other hosts since startup
+            await asyncio.to_thread(job_store.requeue_orphans)
+            last_reap = time.monotonic()
+        job = await asyncio.to_thread(job_store.claim, worker)
+        if job is None:
+            _job_wakeup.clear()
+            try:
+                await asyncio.wait_for(_job_wakeup.wait(), timeout=2.0)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await run_transcription_job(job)
+
+
 # ──────────────────── Endpoints ──────────────────────
 
 @app.get("/api/config")
@@ -323,11 +2469,11 @@ def get_config():
 
 
 @app.get("/api/health")
-def health_check():
+async def health_check():
     ffmpeg_ok = shutil.which("ffmpeg") is not None
     ollama_ok = False
     try:
-        r = http_requests.get("http://localhost:11434/api/tags", timeout=3)
+        r = await ollama_request("GET", f"{OLLAMA_BASE_URL}/api/tags", retries=0, timeout=3)
         ollama_ok = r.status_code == 200
     except Exception:
         pass
@@ -347,21 +2493,32 @@ async def transcribe_single(
     model_name: str = Form("medium"),
     audio_lang: str = Form("en"),
     target_lang: str = Form("fr"),
+    batched: bool = Form(WHISPER_BATCHED),
+    batch_size: int = Form(0),
+    workers: int = Form(BATCH_WORKERS),
 ):
     if shutil.which("ffmpeg") is None:
         return PlainTextResponse("FFmpeg not found in PATH", status_code=500)
 
-    tmp_dir = tempfile.mkdtemp()
+    batch_size = resolve_batch_size(batched, batch_size)
     try:
         await send_log(f"Received: {file.filename}")
-        file_path = save_upload(file, tmp_dir)
-
-        await send_log(f"Loading model {model_name}...")
-        model = await load_model(model_name)
+        await send_log(f"Decoding audio and loading model {model_name}...")
+        audio, model = await asyncio.gather(decode_upload(file), load_model(model_name))
 
         await send_log(f"Transcribing: {file.filename}")
         await send_progress(0, 1)
-        srt_content = await transcribe_file(model, file_path, audio_lang, target_lang)
+        if batch_size:
+            await send_log(f"Batched inference (batch size {batch_size})")
+        if workers > 1 and len(audio) >= LONG_FILE_SECONDS * SAMPLE_RATE:
+            srt_content = segments_to_srt(await transcribe_long(
+                audio, model_name, audio_lang, target_lang, workers, batch_size,
+            ))
+        else:
+            srt_content = await transcribe_file(
+                model, audio, audio_lang, target_lang, batch_size=batch_size,
+                model_name=model_name,
+            )
         await send_progress(1, 1)
 
         await send_log(f"Transcription complete: {file.filename}", color="green")
@@ -370,6 +2527,256 @@ async def transcribe_single(
         await send_log(f"Error: {e}", color="red")
         traceback.print_exc()
         return PlainTextResponse(str(e), status_code=500)
+
+
+@app.post("/api/transcribe-multi")
+async def transcribe_multi(
+    file: UploadFile = File(...),
+    model_name: str = Form("medium"),
+    audio_lang: str = Form("en"),
+    target_langs: str = Form("fr"),
+    batched: bool = Form(WHISPER_BATCHED),
+    batch_size: int = Form(0),
+    concurrency: int = Form(OLLAMA_CONCURRENCY),
+    ollama_batch_size: int = Form(OLLAMA_BATCH_SIZE),
+):
+    """Subtitles in several languages from one Whisper pass.
+
+    target_langs is a comma-separated list. The audio is transcribed once
+    in its own language. English comes from Whisper's translate task, run
+    alongside that pass, and every other language is translated from the
+    transcript by Ollama, all targets at once. Returns
+    {"<name>.<lang>.srt": srt}; a target that fails is logged and left out.
+    """
+    if shutil.which("ffmpeg") is None:
+        return PlainTextResponse("FFmpeg not found in PATH", status_code=500)
+    targets = list(dict.fromkeys(t.strip() for t in target_langs.split(",") if t.strip()))
+    if not targets:
+        return PlainTextResponse("No target languages", status_code=400)
+
+    batch_size = resolve_batch_size(batched, batch_size)
+    name = os.path.splitext(os.path.basename(file.filename or "upload"))[0]
+    try:
+        await send_log(f"Received: {file.filename} -> {', '.join(targets)}")
+        audio, model = await asyncio.gather(decode_upload(file), load_model(model_name))
+
+        async def _whisper(target: str, progress=None) -> list[dict]:
+            return await asyncio.to_thread(
+                _transcribe_segments_sync, model, audio, audio_lang, target, progress,
+                None, batch_size, model_name,
+            )
+
+        english = None
+        if "en" in targets and audio_lang != "en":
+            english = asyncio.create_task(_whisper("en"))
+        try:
+            await send_log(f"Transcribing: {file.filename}")
+            async with ProgressForwarder() as progress:
+                segments = await _whisper(audio_lang, progress)
+        except BaseException:
+            if english is not None:
+                english.cancel()
+            raise
+
+        blocks = [
+            (str(i), f"{format_timestamp(seg['start'])} --> {format_timestamp(seg['end'])}", seg["text"])
+            for i, seg in enumerate(segments, start=1)
+        ]
+
+        async def _target(target: str) -> str:
+            if target == audio_lang:
+                return segments_to_srt(segments)
+            if target == "en" and english is not None:
+                return segments_to_srt(await english)
+            await send_log(f"Translating to {_target_name(target)} with Ollama...")
+            translations = await translate_srt_blocks(
+                blocks, audio_lang, target, concurrency, ollama_batch_size,
+            )
+            return render_srt_blocks(blocks, translations)
+
+        outcomes = await asyncio.gather(*(_target(t) for t in targets), return_exceptions=True)
+        results = {}
+        for target, outcome in zip(targets, outcomes):
+            if isinstance(outcome, BaseException):
+                await send_log(f"Error ({target}): {outcome}", color="red")
+            else:
+                results[f"{name}.{target}.srt"] = outcome
+        await send_log(
+            f"Done: {len(results)}/{len(targets)} languages for {file.filename}",
+            color="green" if len(results) == len(targets) else "cyan",
+        )
+        return results
+    except Exception as e:
+        await send_log(f"Error: {e}", color="red")
+        traceback.print_exc()
+        return PlainTextResponse(str(e), status_code=500)
+
+
+BATCH_OUTPUTS = ("json", "ndjson", "zip")
+
+
+async def _release_source(source: UploadFile | str):
+    """Free a batch input as soon as it has been transcribed."""
+    if isinstance(source, str):
+        await asyncio.to_thread(shutil.rmtree, os.path.dirname(source), True)
+    else:
+        await source.close()
+
+
+async def _iter_batch(
+    sources: list[tuple[str, UploadFile | str]], model_name: str, audio_lang: str,
+    target_lang: str, workers: int, batch_size: int, tmp_dir: str,
+) -> AsyncIterator[tuple[str, str, str | None, Exception | None]]:
+    """Transcribe (filename, upload or spooled path) pairs, yielding (filename, srt_name, srt, error) as each finishes.
+
+    srt_name is unique within the batch (see _srt_names). Each input is
+    released right after its result, so uploads and spool files do not
+    pile up until the end of the batch.
+    """
+    total = len(sources)
+    srt_names = _srt_names([filename for filename, _ in sources])
+    nb_ok = 0
+    nb_errors = 0
+
+    if workers > 1 and total > 1:
+        # Keyed by output name: two uploads may share a filename
+        saved = {}
+        for srt_name, (filename, source) in zip(srt_names, sources):
+            if not isinstance(source, str):
+                path = save_upload(source, tempfile.mkdtemp(dir=tmp_dir))
+                await source.close()
+                source = path
+            saved[srt_name] = (filename, source)
+        await send_log(
+            f"Transcribing {total} files on {workers} worker processes "
+            f"({split_cpu_threads(workers)} threads each), longest first..."
+        )
+        await send_progress(0, total)
+        async for srt_name, srt, error in transcribe_files_parallel(
+            [(srt_name, path) for srt_name, (_, path) in saved.items()],
+            model_name, audio_lang, target_lang, workers, batch_size,
+        ):
+            filename, path = saved[srt_name]
+            await _release_source(path)
+            if error is None:
+                await send_log(f"OK : {filename}", color="green")
+                nb_ok += 1
+            else:
+                nb_errors += 1
+                await send_log(f"Error {filename}: {error}", color="red")
+            await send_progress(nb_ok + nb_errors, total)
+            yield filename, srt_name, srt, error
+    else:
+        await send_log(f"Loading model {model_name}...")
+        model = await load_model(model_name)
+
+        for index, (srt_name, (filename, source)) in enumerate(
+            zip(srt_names, sources), start=1,
+        ):
+            await send_progress(index, total)
+            await send_log(f"Processing: {filename} ({index}/{total})")
+
+            srt = error = None
+            try:
+                if isinstance(source, str):
+                    audio = await decode_audio(source)
+                else:
+                    audio = await decode_upload(source)
+                srt = await transcribe_file(
+                    model, audio, audio_lang, target_lang, batch_size=batch_size,
+                    model_name=model_name,
+                )
+                await send_log(f"OK : {filename}", color="green")
+                nb_ok += 1
+            except Exception as e:
+                error = e
+                nb_errors += 1
+                await send_log(f"Error {filename}: {e}", color="red")
+                traceback.print_exc()
+            finally:
+                await _release_source(source)
+            yield filename, srt_name, srt, error
+
+    await send_log(
+        f"Done. {nb_ok} succeeded, {nb_errors} failed out of {total}.",
+        color="cyan")
+
+
+def _srt_names(filenames: list[str]) -> list[str]:
+    """<stem>.srt for each file, numbered <stem>_2.srt, ... when a stem repeats."""
+    names = []
+    taken = set()
+    for filename in filenames:
+        stem = os.path.splitext(filename)[0]
+        name = f"{stem}.srt"
+        n = 1
+        while name in taken:
+            n += 1
+            name = f"{stem}_{n}.srt"
+        taken.add(name)
+        names.append(name)
+    return names
+
+
+async def _stream_batch_ndjson(batch: AsyncIterator[tuple[str, str, str | None, Exception | None]]):
+    """One JSON line per file, in completion order."""
+    async for filename, srt_name, srt, error in batch:
+        line = {"file": srt_name, "source": filename}
+        if error is None:
+            line["srt"] = srt
+        else:
+            line["error"] = str(error)
+        yield _json.dumps(line, ensure_ascii=False) + "\n"
+
+
+class _ZipSink:
+    """Write-only, non-seekable file for zipfile that hands back what was written."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _stream_batch_zip(batch: AsyncIterator[tuple[str, str, str | None, Exception | None]]):
+    """A ZIP archive whose members are sent as each file finishes.
+
+    Failures are listed in errors.txt at the end of the archive.
+    """
+    sink = _ZipSink()
+    errors = []
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        async for filename, srt_name, srt, error in batch:
+            if error is None:
+                archive.writestr(srt_name, srt)
+            else:
+                errors.append(f"{filename}: {error}")
+            if chunk := sink.drain():
+                yield chunk
+        if errors:
+            archive.writestr("errors.txt", "\n".join(errors) + "\n")
+    yield sink.drain()
+
+
+async def _cleanup_after(stream: AsyncIterator, tmp_dir: str):
+    try:
+        async for chunk in stream:
+            yield chunk
     finally:
         shutil.rmtree(tmp_dir, ignore_errors=True)
 
@@ -380,11 +2787,25 @@ async def transcribe_batch(
     model_name: str = Form("medium"),
     audio_lang: str = Form("en"),
     target_lang: str = Form("fr"),
+    workers: int = Form(BATCH_WORKERS),
+    batched: bool = Form(WHISPER_BATCHED),
+    batch_size: int = Form(0),
+    output: str = Form("json"),
 ):
+    """Transcribe several files.
+
+    output=json returns {"<name>.srt": srt} once every file is done;
+    output=ndjson streams one {"file", "source", "srt" | "error"} line per
+    file and output=zip streams an archive, both as soon as files finish.
+    """
     if shutil.which("ffmpeg") is None:
         return PlainTextResponse("FFmpeg not found in PATH", status_code=500)
+    if output not in BATCH_OUTPUTS:
+        return PlainTextResponse(f"Unknown output: {output}", status_code=400)
 
+    batch_size = resolve_batch_size(batched, batch_size)
     tmp_dir = tempfile.mkdtemp()
+    streaming = False
     try:
         valid_files = [
             f for f in files
@@ -394,40 +2815,209 @@ async def transcribe_batch(
             await send_log("No valid audio/video files.", color="red")
             return PlainTextResponse("No valid files", status_code=400)
 
-        await send_log(f"Loading model {model_name}...")
-        model = await load_model(model_name)
+        if output == "json":
+            results = {}
+            async for _, srt_name, srt, error in _iter_batch(
+                [(f.filename, f) for f in valid_files], model_name, audio_lang,
+                target_lang, workers, batch_size, tmp_dir,
+            ):
+                if error is None:
+                    results[srt_name] = srt
+            return results
+
+        # The response outlives the request's uploads: spool each one
+        # and release it before streaming starts.
+        sources = []
+        for f in valid_files:
+            sources.append((f.filename, save_upload(f, tempfile.mkdtemp(dir=tmp_dir))))
+            await f.close()
+        batch = _iter_batch(
+            sources, model_name, audio_lang, target_lang, workers, batch_size, tmp_dir,
+        )
+        streaming = True
+        if output == "ndjson":
+            return StreamingResponse(
+                _cleanup_after(_stream_batch_ndjson(batch), tmp_dir),
+                media_type="application/x-ndjson",
+            )
+        return StreamingResponse(
+            _cleanup_after(_stream_batch_zip(batch), tmp_dir),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="subtitles_{target_lang}.zip"'},
+        )
+    except Exception as e:
+        await send_log(f"General error: {e}", color="red")
+        traceback.print_exc()
+        return PlainTextResponse(str(e), status_code=500)
+    finally:
+        if not streaming:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
 
-        total = len(valid_files)
-        results = {}
-        nb_ok = 0
-        nb_errors = 0
 
-        for index, f in enumerate(valid_files, start=1):
-            await send_progress(index, total)
-            await send_log(f"Processing: {f.filename} ({index}/{total})")
+@app.post("/api/jobs")
+async def submit_job(
+    files: List[UploadFile] = File(...),
+    model_name: str = Form("medium"),
+    audio_lang: str = Form("en"),
+    target_lang: str = Form("fr"),
+    batched: bool = Form(WHISPER_BATCHED),
+    batch_size: int = Form(0),
+    workers: int = Form(BATCH_WORKERS),
+):
+    """Queue a transcription job and return its ID immediately."""
+    valid_files = [
+        f for f in files
+        if (f.filename or "").lower().endswith(SUPPORTED_EXTENSIONS)
+    ]
+    if not valid_files:
+        return PlainTextResponse("No valid files", status_code=400)
+
+    job_id = str(uuid.uuid4())
+    job_dir = job_store.job_dir(job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    entries = []
+    for index, f in enumerate(valid_files):
+        stored_as = f"{index:04d}_{os.path.basename(f.filename)}"
+        with open(os.path.join(job_dir, stored_as), "wb") as out:
+            shutil.copyfileobj(f.file, out)
+        entries.append({"filename": f.filename, "stored_as": stored_as})
+
+    job_store.create("transcribe", {
+        "files": entries,
+        "model_name": model_name,
+        "audio_lang": audio_lang,
+        "target_lang": target_lang,
+        "batched": batched,
+        "batch_size": batch_size,
+        "workers": workers,
+    }, job_id=job_id)
+    _job_wakeup.set()
+    await send_log(f"Job {job_id} queued ({len(entries)} file(s))")
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/api/jobs")
+def list_jobs(limit: int = 50):
+    return job_store.list(limit)
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        return PlainTextResponse("Job not found", status_code=404)
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "error": job["error"],
+        "files": [entry["filename"] for entry in job["params"]["files"]],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
 
-            file_path = save_upload(f, tmp_dir)
-            try:
-                srt = await transcribe_file(model, file_path, audio_lang, target_lang)
-                name = os.path.splitext(f.filename)[0]
-                results[f"{name}.srt"] = srt
-                await send_log(f"OK : {f.filename}", color="green")
-                nb_ok += 1
-            except Exception as e:
-                nb_errors += 1
-                await send_log(f"Error {f.filename}: {e}", color="red")
-                traceback.print_exc()
 
-        await send_log(
-            f"Done. {nb_ok} succeeded, {nb_errors} failed out of {total}.",
-            color="cyan")
-        return results
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = job_store.get(job_id)
+    if job is None:
+        return PlainTextResponse("Job not found", status_code=404)
+    if job["status"] != "done":
+        return PlainTextResponse(f"Job is {job['status']}", status_code=409)
+    return job["result"]
+
+
+@app.delete("/api/jobs/{job_id}")
+def cancel_job(job_id: str):
+    status = job_store.request_cancel(job_id)
+    if status is None:
+        return PlainTextResponse("Job not found", status_code=404)
+    return {"job_id": job_id, "status": status}
+
+
+async def _stream_srt(blocks: list[tuple[str, str, str]], source_lang: str,
+                      target_lang: str, concurrency: int, batch_size: int,
+                      filename: str) -> AsyncIterator[str]:
+    """Emit translated SRT blocks in cue order as soon as they are ready."""
+    pending = {}
+    next_idx = 0
+    try:
+        async for idx, translated in iter_srt_translations(
+            blocks, source_lang, target_lang, concurrency, batch_size
+        ):
+            pending[idx] = translated
+            while next_idx in pending:
+                numero, timestamp, _ = blocks[next_idx]
+                text = pending.pop(next_idx)
+                await send_partial(text, cue=numero)
+                separator = "\n" if next_idx > 0 else ""
+                yield f"{separator}{numero}\n{timestamp}\n{text}\n"
+                next_idx += 1
+        await send_log(f"Translation complete: {filename}", color="green")
     except Exception as e:
-        await send_log(f"General error: {e}", color="red")
+        await send_log(f"Error: {e}", color="red")
         traceback.print_exc()
-        return PlainTextResponse(str(e), status_code=500)
-    finally:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
+        yield f"{STREAM_ERROR_MARKER}{e}"
+
+
+async def _stream_text(content: str, source_lang: str, target_lang: str,
+                       max_tokens: int, overlap: int,
+                       filename: str) -> AsyncIterator[str]:
+    """Relay Ollama's token stream for a plain-text translation, chunk by chunk.
+
+    Like translate_text_chunks, a chunk that fails is kept in the source
+    language; the stream then ends with STREAM_ERROR_MARKER and a message.
+    """
+    chunks = split_text_chunks(content, max_tokens) or [(content, "")]
+    failed = 0
+    try:
+        for idx, (chunk, sep) in enumerate(chunks):
+            if not chunk.strip():
+                yield chunk + sep
+                continue
+            cached = await asyncio.to_thread(
+                translation_memory.get, chunk, source_lang, target_lang,
+            )
+            if cached is not None:
+                await send_partial(cached + sep)
+                yield cached + sep
+                continue
+
+            context = _chunk_context(chunks[idx - 1][0], overlap) if idx > 0 else ""
+            parts = []
+            try:
+                async for piece in _ollama_stream(
+                    _translation_prompt(chunk, target_lang, context)
+                ):
+                    parts.append(piece)
+                    await send_partial(piece)
+                    yield piece
+            except (httpx.HTTPError, ValueError) as e:
+                failed += 1
+                await send_log(f"  Chunk {idx + 1}/{len(chunks)} left untranslated: {e}",
+                               color="red")
+                fallback = f"\n{chunk}" if parts else chunk
+                await send_partial(fallback)
+                yield fallback
+            else:
+                translated = "".join(parts).strip()
+                if translated:
+                    await asyncio.to_thread(
+                        translation_memory.put, chunk, source_lang, target_lang, translated,
+                    )
+            if sep:
+                yield sep
+    except Exception as e:
+        await send_log(f"Error: {e}", color="red")
+        traceback.print_exc()
+        yield f"{STREAM_ERROR_MARKER}{e}"
+        return
+    if failed:
+        message = f"{failed}/{len(chunks)} chunk(s) left untranslated"
+        await send_log(f"Translation incomplete: {filename} ({message})", color="red")
+        yield f"{STREAM_ERROR_MARKER}{message}"
+        return
+    await send_log(f"Translation complete: {filename}", color="green")
 
 
 @app.post("/api/ollama/translate-srt")
@@ -435,35 +3025,28 @@ async def translate_srt(
     file: UploadFile = File(...),
     source_lang: str = Form("en"),
     target_lang: str = Form("fr"),
+    concurrency: int = Form(OLLAMA_CONCURRENCY),
+    batch_size: int = Form(OLLAMA_BATCH_SIZE),
+    stream: bool = Form(False),
 ):
     await send_log(f"SRT translation: {file.filename}")
     try:
         content = (await file.read()).decode("utf-8")
-        lines = content.splitlines()
-        output_lines = []
-        bloc = []
-
-        for line in lines:
-            if line.strip() == "":
-                if len(bloc) >= 3:
-                    numero = bloc[0]
-                    timestamp = bloc[1]
-                    texte = " ".join(bloc[2:])
-                    translated = await call_ollama(texte, source_lang, target_lang)
-                    output_lines.append(f"{numero}\n{timestamp}\n{translated}\n")
-                    await send_log(f"  Block {numero} translated")
-                bloc = []
-            else:
-                bloc.append(line)
-
-        if len(bloc) >= 3:
-            numero = bloc[0]
-            timestamp = bloc[1]
-            texte = " ".join(bloc[2:])
-            translated = await call_ollama(texte, source_lang, target_lang)
-            output_lines.append(f"{numero}\n{timestamp}\n{translated}\n")
-
-        result = "\n".join(output_lines)
+        blocks = parse_srt_blocks(content)
+        await send_log(f"  {len(blocks)} blocks, {max(1, concurrency)} in parallel")
+        await send_progress(0, len(blocks))
+
+        if stream:
+            return StreamingResponse(
+                _stream_srt(blocks, source_lang, target_lang, concurrency,
+                            batch_size, file.filename),
+                media_type="text/plain",
+            )
+
+        translations = await translate_srt_blocks(
+            blocks, source_lang, target_lang, concurrency, batch_size
+        )
+        result = render_srt_blocks(blocks, translations)
         await send_log(f"Translation complete: {file.filename}", color="green")
         return PlainTextResponse(result, media_type="text/plain")
     except Exception as e:
@@ -477,11 +3060,24 @@ async def translate_text(
     file: UploadFile = File(...),
     source_lang: str = Form("en"),
     target_lang: str = Form("fr"),
+    stream: bool = Form(False),
+    concurrency: int = Form(OLLAMA_CONCURRENCY),
+    chunk_tokens: int = Form(TEXT_CHUNK_TOKENS),
+    overlap: int = Form(0),
 ):
     await send_log(f"Text translation: {file.filename}")
     try:
         content = (await file.read()).decode("utf-8")
-        translated = await call_ollama(content, source_lang, target_lang)
+        chunk_tokens = max(1, chunk_tokens)
+        if stream:
+            return StreamingResponse(
+                _stream_text(content, source_lang, target_lang, chunk_tokens,
+                             overlap, file.filename),
+                media_type="text/plain",
+            )
+        translated = await translate_text_chunks(
+            content, source_lang, target_lang, concurrency, chunk_tokens, overlap
+        )
         await send_log(f"Translation complete: {file.filename}", color="green")
         return PlainTextResponse(translated, media_type="text/plain")
     except Exception as e:
@@ -490,51 +3086,106 @@ async def translate_text(
         return PlainTextResponse(str(e), status_code=500)
 
 
+@app.get("/api/translation-cache")
+def translation_cache_stats():
+    return translation_memory.stats()
+
+
+@app.delete("/api/translation-cache")
+def translation_cache_clear():
+    translation_memory.clear()
+    return translation_memory.stats()
+
+
+@app.get("/api/transcription-cache")
+def transcription_cache_stats():
+    return transcription_cache.stats()
+
+
+@app.delete("/api/transcription-cache")
+def transcription_cache_clear():
+    transcription_cache.clear()
+    return transcription_cache.stats()
+
+
+@app.get("/api/diarization-sessions")
+def diarization_sessions_stats():
+    return session_store.stats()
+
+
+@app.get("/api/models")
+def loaded_models():
+    return model_manager.stats()
+
+
+@app.delete("/api/models/{model_name}")
+def unload_model(model_name: str):
+    if not model_manager.evict(model_name):
+        return PlainTextResponse("Model not loaded", status_code=404)
+    return model_manager.stats()
+
+
 @app.post("/api/diarize")
 async def diarize_file(
     file: UploadFile = File(...),
+    transcribe: bool = Form(False),
+    model_name: str = Form("medium"),
+    audio_lang: str = Form("en"),
+    target_lang: str = Form("fr"),
+    batched: bool = Form(WHISPER_BATCHED),
+    batch_size: int = Form(0),
+    split_words: bool = Form(False),
 ):
-    """Phase 1: Run speaker diarization and cache results."""
+    """Phase 1: Run speaker diarization and cache results.
+
+    With transcribe=true, the Whisper pass starts as soon as the audio is
+    decoded and runs alongside pyannote; phase 2 then only merges speakers.
+    Word timings are only collected with split_words=true, which phase 2
+    needs to split segments at speaker changes.
+    """
     if not HF_TOKEN:
         return PlainTextResponse(
             "HF_TOKEN not configured. Set the HF_TOKEN environment variable.",
             status_code=500,
         )
 
-    _cleanup_expired_sessions()
-    tmp_dir = tempfile.mkdtemp()
+    session_id = str(uuid.uuid4())
+    whisper = None
     try:
         await send_log(f"Diarization: received {file.filename}")
-        file_path = save_upload(file, tmp_dir)
-        
-        # Convert to WAV for pyannote compatibility (handles m4a, etc)
-        wav_path = os.path.join(tmp_dir, "converted.wav")
+        # Decoded once to 16 kHz mono PCM (handles m4a, etc); the same buffer
+        # is reused for the Whisper pass.
+        await send_log("Decoding audio and loading pyannote diarization pipeline...")
+        pipeline_task = asyncio.create_task(asyncio.to_thread(_load_diarization_pipeline))
         try:
-            await send_log(f"Converting audio to WAV for Pyannote...")
-            cmd = ["ffmpeg", "-y", "-i", file_path, "-ac", "1", "-ar", "16000", wav_path]
-            await asyncio.to_thread(subprocess.run, cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            diarize_path = wav_path
-        except Exception as e:
-            await send_log(f"Warning: ffmpeg conversion failed, trying original file. Error: {e}", color="yellow")
-            diarize_path = file_path
-
-        await send_log("Loading pyannote diarization pipeline...")
-        pipeline = await asyncio.to_thread(_load_diarization_pipeline)
-
+            audio = await decode_upload(file)
+        except BaseException:
+            pipeline_task.cancel()
+            raise
+
+        if transcribe:
+            whisper = _start_session_transcription(
+                session_id, audio, model_name, audio_lang, target_lang,
+                resolve_batch_size(batched, batch_size), split_words,
+            )
+            await send_log(f"Whisper ({model_name}) started alongside diarization")
+
+        pipeline = await pipeline_task
         await send_log(f"Running speaker detection on {file.filename}...")
         speakers, segments = await asyncio.to_thread(
-            _run_diarization_sync, pipeline, diarize_path
+            _run_diarization_sync, pipeline, audio
         )
 
-        session_id = str(uuid.uuid4())
-        _diarization_cache[session_id] = {
-            "file_path": file_path,
-            "tmp_dir": tmp_dir,
-            "speakers": speakers,
-            "segments": segments,
-            "filename": file.filename,
-            "created_at": time.time(),
-        }
+        await asyncio.to_thread(
+            session_store.create, session_id, audio, speakers, segments, file.filename,
+        )
+        task = whisper["task"] if whisper is not None else None
+        if task is not None and task.done() and not task.cancelled() \
+                and task.exception() is None:
+            # Finished before the session row existed
+            await asyncio.to_thread(
+                session_store.set_whisper, session_id, whisper["key"], task.result(),
+            )
 
         await send_log(
             f"Diarization complete: {len(speakers)} speaker(s) detected",
@@ -544,9 +3195,11 @@ async def diarize_file(
             "session_id": session_id,
             "num_speakers": len(speakers),
             "speakers": speakers,
+            "transcribing": whisper is not None,
         }
     except Exception as e:
-        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if whisper is not None:
+            whisper["task"].cancel()
         await send_log(f"Diarization error: {e}", color="red")
         traceback.print_exc()
         return PlainTextResponse(str(e), status_code=500)
@@ -559,9 +3212,12 @@ async def transcribe_diarized(
     audio_lang: str = Form("en"),
     target_lang: str = Form("fr"),
     speaker_names: str = Form("{}"),
+    split_words: bool = Form(False),
+    batched: bool = Form(WHISPER_BATCHED),
+    batch_size: int = Form(0),
 ):
     """Phase 2: Transcribe with Whisper and merge with cached diarization."""
-    session = _diarization_cache.get(session_id)
+    session = await asyncio.to_thread(session_store.get, session_id)
     if not session:
         return PlainTextResponse(
             "Diarization session expired or not found. Please re-upload.",
@@ -573,23 +3229,35 @@ async def transcribe_diarized(
     except _json.JSONDecodeError:
         return PlainTextResponse("Invalid speaker_names JSON", status_code=400)
 
-    file_path = session["file_path"]
+    audio = session["audio"]
     diar_segments = session["segments"]
     filename = session.get("filename", "file")
 
+    batch_size = resolve_batch_size(batched, batch_size)
+    key = _whisper_key(model_name, audio_lang, target_lang, batch_size, split_words)
+    whisper = _session_tasks.get(session_id)
     try:
-        await send_log(f"Loading model {model_name}...")
-        model = await load_model(model_name)
-
-        await send_log(f"Transcribing with diarization: {filename}")
-        await send_progress(1, 1)
-
-        whisper_segments = await asyncio.to_thread(
-            _transcribe_segments_sync, model, file_path, audio_lang, target_lang,
-        )
-
-        srt_content = _build_srt_with_speakers(
-            whisper_segments, diar_segments, names_map
+        if _whisper_key_serves(session["whisper_key"], key):
+            whisper_segments = session["whisper_segments"]
+        elif whisper and _whisper_key_serves(whisper["key"], key):
+            if not whisper["task"].done():
+                await send_log(f"Waiting for the Whisper pass on {filename}...")
+            whisper_segments = await whisper["task"]
+        else:
+            await send_log(f"Loading model {model_name}...")
+            model = await load_model(model_name)
+
+            await send_log(f"Transcribing with diarization: {filename}")
+            await send_progress(1, 1)
+
+            whisper_segments = await asyncio.to_thread(
+                _transcribe_segments_sync, model, audio, audio_lang, target_lang,
+                batch_size=batch_size, model_name=model_name, word_timestamps=split_words,
+            )
+
+        srt_content = await asyncio.to_thread(
+            _build_srt_with_speakers, whisper_segments, diar_segments, names_map,
+            split_words,
         )
 
         await send_log(f"Diarized transcription complete: {filename}", color="green")
@@ -599,9 +3267,7 @@ async def transcribe_diarized(
         traceback.print_exc()
         return PlainTextResponse(str(e), status_code=500)
     finally:
-        if session_id in _diarization_cache:
-            shutil.rmtree(session.get("tmp_dir", ""), ignore_errors=True)
-            del _diarization_cache[session_id]
+        _drop_session(session_id)
 
 
 @app.get("/api/benchmark")
@@ -651,13 +3317,129 @@ async def benchmark_system():
 
 @app.websocket("/ws/logs")
 async def websocket_logs(ws: WebSocket):
+    """Log and progress events; everything until the client subscribes to IDs.
+
+    Send {"type": "subscribe", "job_id": ...} to receive only events tagged
+    with that job, diarization session or X-Job-Id request header.
+    """
     await manager.connect(ws)
     try:
         while True:
-            await ws.receive_text()
+            manager.handle_message(ws, await ws.receive_text())
+    except WebSocketDisconnect:
+        manager.disconnect(ws)
+
+
+@app.websocket("/ws/jobs/{job_id}")
+async def websocket_job(ws: WebSocket, job_id: str):
+    """Log and progress events of a single job."""
+    await manager.connect(ws, job_id=job_id)
+    try:
+        while True:
+            manager.handle_message(ws, await ws.receive_text())
     except WebSocketDisconnect:
         manager.disconnect(ws)
 
+
+@app.websocket("/ws/live")
+async def websocket_live(ws: WebSocket, model_name: str = "base", audio_lang: str = "en",
+                         target_lang: str = "", encoding: str = "pcm"):
+    """Live captions for audio streamed over the socket.
+
+    Send binary frames of 16 kHz mono s16le PCM (encoding=pcm) or of an
+    Opus stream as MediaRecorder produces it (encoding=opus), then
+    {"type": "stop"}. The server answers with {"type": "partial" | "final",
+    "start", "end", "text"} messages, and {"type": "done"} once flushed.
+    """
+    await ws.accept()
+    error = None
+    if model_name not in WHISPER_MODELS:
+        error = f"Unknown model: {model_name}"
+    elif encoding not in ("pcm", "opus"):
+        error = f"Unsupported encoding: {encoding}"
+    elif encoding == "opus" and shutil.which("ffmpeg") is None:
+        error = "FFmpeg not found in PATH"
+    if error:
+        await ws.send_json({"type": "error", "message": error})
+        await ws.close(code=1008)
+        return
+
+    await send_log(f"Live session started (model {model_name})")
+    live = LiveTranscriber(await load_model(model_name), audio_lang, target_lang or audio_lang)
+    ready = asyncio.Event()
+    stopping = asyncio.Event()
+
+    def feed(samples: np.ndarray):
+        live.feed(samples)
+        if live.pending_seconds >= LIVE_STEP_SECONDS:
+            ready.set()
+
+    async def steps():
+        # One decode at a time; audio that arrives meanwhile joins the next step
+        while True:
+            await ready.wait()
+            ready.clear()
+            final = stopping.is_set()
+            try:
+                events = await asyncio.to_thread(live.step, final)
+            except Exception as e:
+                traceback.print_exc()
+                await ws.send_json({"type": "error", "message": str(e)})
+                await ws.close(code=1011)
+                return
+            for event in events:
+                await ws.send_json(event)
+            if final:
+                return
+
+    decoder = reader = None
+    if encoding == "opus":
+        decoder = await asyncio.create_subprocess_exec(
+            *_ffmpeg_decode_cmd("pipe:0"),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        reader = asyncio.create_task(_pipe_live_decoder(decoder, feed))
+    stepper = asyncio.create_task(steps())
+    remainder = b""  # a PCM sample split across two frames
+    try:
+        while True:
+            msg = await ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(msg.get("code", 1000))
+            if msg.get("bytes"):
+                if decoder is not None:
+                    decoder.stdin.write(msg["bytes"])
+                    await decoder.stdin.drain()
+                else:
+                    samples, remainder = _whole_samples(remainder + msg["bytes"])
+                    if samples:
+                        feed(pcm_to_float(samples))
+            elif msg.get("text"):
+                try:
+                    command = _json.loads(msg["text"])
+                except ValueError:
+                    continue
+                if isinstance(command, dict) and command.get("type") == "stop":
+                    break
+        if decoder is not None:
+            decoder.stdin.close()
+            await reader
+            await decoder.wait()
+        stopping.set()
+        ready.set()
+        await stepper
+        await ws.send_json({"type": "done"})
+        await ws.close()
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # client went away (or the stepper closed the socket on error)
+    finally:
+        stepper.cancel()
+        if reader is not None:
+            reader.cancel()
+        if decoder is not None and decoder.returncode is None:
+            decoder.kill()
+        await send_log("Live session ended")
+
 # ──────────────────── Static files (production) ──────
 
 STATIC_DIR = Path(__file__).resolve().parent.parent / "frontend" / "dist"
@@ -1,5 +1,10 @@
+import os
 import sys
+import tempfile
 from pathlib import Path
 
+# Keep on-disk caches out of the source tree during tests
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="whisper-test-cache-"))
+
 # Allow imports like "from backend.main import ..."
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
@@ -1,8 +1,13 @@
 """Unit tests for the Whisper Translator API."""
 
 import os
+import asyncio
+import threading
+from contextlib import nullcontext
+import httpx
+import numpy as np
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi.testclient import TestClient
 
 # Patch WhisperModel before importing app (module loads at import time)
@@ -11,15 +16,79 @@ with patch("backend.main.WhisperModel"):
         app,
         format_timestamp,
         save_upload,
+        find_media_files,
+        subtitle_path,
+        write_srt,
         _transcribe_file_sync,
+        transcribe_file,
+        ProgressForwarder,
+        LiveTranscriber,
+        split_cpu_threads,
+        split_at_silences,
+        stitch_segments,
+        transcribe_long,
+        transcribe_files_parallel,
+        shutdown_process_pool,
+        ModelManager,
+        estimate_model_mb,
+        resolve_batch_size,
+        auto_batch_size,
+        probe_duration,
+        parse_srt_blocks,
+        translate_srt_blocks,
+        make_cue_batches,
+        parse_numbered_reply,
+        call_ollama_batch,
+        call_ollama,
+        TranslationMemory,
+        TranscriptionCache,
+        segments_to_srt,
+        decode_upload,
+        SessionStore,
+        SQLiteSessionStore,
+        speaker_overlaps,
+        assign_speakers,
+        _build_srt_with_speakers,
+        pcm_to_float,
+        ollama_request,
+        _ollama_generate,
+        _ollama_stream,
+        STREAM_ERROR_MARKER,
+        split_text_chunks,
+        estimate_tokens,
+        translate_text_chunks,
+        JobStore,
+        run_transcription_job,
+        ConnectionManager,
+        ClientChannel,
+        current_job_id,
+        send_log,
         LANG_CODES,
         SUPPORTED_EXTENSIONS,
         WHISPER_MODELS,
     )
+    from backend.watch import MediaWatcher, needs_transcription
+    from backend.cli import collect_media, main as cli_main
 
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def fresh_translation_memory(tmp_path, monkeypatch):
+    """Give every test an empty translation memory."""
+    tm = TranslationMemory(str(tmp_path / "translations.db"), max_entries=100)
+    monkeypatch.setattr("backend.main.translation_memory", tm)
+    return tm
+
+
+@pytest.fixture(autouse=True)
+def fresh_transcription_cache(tmp_path, monkeypatch):
+    """Give every test an empty transcription cache."""
+    cache = TranscriptionCache(str(tmp_path / "transcriptions.db"), max_mb=1)
+    monkeypatch.setattr("backend.main.transcription_cache", cache)
+    return cache
+
+
 # ──────────────────── format_timestamp ────────────────────
 
 class TestFormatTimestamp:
@@ -93,7 +162,7 @@ class TestConfigEndpoint:
 
 class TestHealthEndpoint:
     @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
-    @patch("backend.main.http_requests.get")
+    @patch("backend.main.ollama_request", new_callable=AsyncMock)
     def test_all_ok(self, mock_get, mock_which):
         mock_get.return_value = MagicMock(status_code=200)
         resp = client.get("/api/health")
@@ -103,7 +172,8 @@ class TestHealthEndpoint:
         assert data["ollama"] is True
 
     @patch("backend.main.shutil.which", return_value=None)
-    @patch("backend.main.http_requests.get", side_effect=ConnectionError)
+    @patch("backend.main.ollama_request", new_callable=AsyncMock,
+           side_effect=httpx.ConnectError("refused"))
     def test_all_down(self, mock_get, mock_which):
         resp = client.get("/api/health")
         data = resp.json()
@@ -125,6 +195,56 @@ class TestTranscribeEndpoint:
         assert "FFmpeg" in resp.text
 
 
+# ──────────────────── POST /api/transcribe-multi ──────────
+
+class TestTranscribeMultiEndpoint:
+    def _post(self, targets):
+        return client.post(
+            "/api/transcribe-multi",
+            files={"file": ("talk.mp4", b"fake", "video/mp4")},
+            data={"model_name": "tiny", "audio_lang": "de", "target_langs": targets},
+        )
+
+    @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_one_pass_fans_out_to_targets(self, mock_which):
+        def fake_segments(model, audio, audio_code, target_code, *args):
+            return [{"start": 0.0, "end": 1.0, "text": f"{audio_code}->{target_code}"}]
+
+        async def fake_translate(blocks, source, target, *args):
+            return [f"{target}: {text}" for _, _, text in blocks]
+
+        with patch("backend.main.decode_upload", new_callable=AsyncMock), \
+             patch("backend.main.load_model", new_callable=AsyncMock), \
+             patch("backend.main._transcribe_segments_sync", side_effect=fake_segments) as whisper, \
+             patch("backend.main.translate_srt_blocks", side_effect=fake_translate) as ollama:
+            resp = self._post("de, en,fr,es,fr")
+
+        assert resp.status_code == 200
+        data = resp.json()
+        assert list(data) == ["talk.de.srt", "talk.en.srt", "talk.fr.srt", "talk.es.srt"]
+        assert data["talk.de.srt"].endswith("de->de\n")
+        assert data["talk.en.srt"].endswith("de->en\n")
+        assert data["talk.fr.srt"] == "1\n00:00:00,000 --> 00:00:01,000\nfr: de->de\n"
+        assert sorted(c.args[3] for c in whisper.call_args_list) == ["de", "en"]
+        assert sorted(c.args[2] for c in ollama.call_args_list) == ["es", "fr"]
+
+    @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_failed_target_is_left_out(self, mock_which):
+        segments = [{"start": 0.0, "end": 1.0, "text": "Hallo"}]
+        with patch("backend.main.decode_upload", new_callable=AsyncMock), \
+             patch("backend.main.load_model", new_callable=AsyncMock), \
+             patch("backend.main._transcribe_segments_sync", return_value=segments), \
+             patch("backend.main.translate_srt_blocks", new_callable=AsyncMock,
+                   side_effect=RuntimeError("ollama down")):
+            resp = self._post("de,fr")
+        assert resp.status_code == 200
+        assert list(resp.json()) == ["talk.de.srt"]
+
+    @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_no_targets_returns_400(self, mock_which):
+        assert self._post(" , ").status_code == 400
+
+
 # ──────────────────── POST /api/transcribe-batch ──────────
 
 class TestTranscribeBatchEndpoint:
@@ -137,6 +257,257 @@ class TestTranscribeBatchEndpoint:
         )
         assert resp.status_code == 400
 
+    @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_parallel_workers_schedule_longest_first(self, mock_which):
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Single thread so submission order == execution order
+        pool = ThreadPoolExecutor(max_workers=1)
+        seen = []
+
+        def fake_sync(model, path, audio_code, target_code, **kwargs):
+            seen.append(os.path.basename(path))
+            return f"SRT {os.path.basename(path)}"
+
+        durations = {"short.mp3": 10.0, "long.mp3": 600.0, "mid.mp3": 60.0}
+        with patch("backend.main.process_pool", return_value=nullcontext(pool)), \
+             patch("backend.main._transcribe_file_sync", side_effect=fake_sync), \
+             patch("backend.main.probe_duration",
+                   side_effect=lambda p: durations[os.path.basename(p)]):
+            resp = client.post(
+                "/api/transcribe-batch",
+                files=[("files", (name, b"x", "audio/mpeg")) for name in durations],
+                data={"model_name": "tiny", "audio_lang": "en",
+                      "target_lang": "en", "workers": "2"},
+            )
+        pool.shutdown()
+
+        assert resp.status_code == 200
+        assert seen == ["long.mp3", "mid.mp3", "short.mp3"]
+        assert resp.json()["short.srt"] == "SRT short.mp3"
+        assert len(resp.json()) == 3
+
+    @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_parallel_failure_does_not_abort_batch(self, mock_which):
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=2)
+
+        def fake_sync(model, path, audio_code, target_code, **kwargs):
+            if path.endswith("bad.mp3"):
+                raise RuntimeError("decode failed")
+            return "SRT"
+
+        with patch("backend.main.process_pool", return_value=nullcontext(pool)), \
+             patch("backend.main._transcribe_file_sync", side_effect=fake_sync), \
+             patch("backend.main.probe_duration", return_value=1.0):
+            resp = client.post(
+                "/api/transcribe-batch",
+                files=[("files", ("good.mp3", b"x", "audio/mpeg")),
+                       ("files", ("bad.mp3", b"x", "audio/mpeg"))],
+                data={"model_name": "tiny", "audio_lang": "en",
+                      "target_lang": "en", "workers": "2"},
+            )
+        pool.shutdown()
+
+        assert resp.status_code == 200
+        assert resp.json() == {"good.srt": "SRT"}
+
+    @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_ndjson_streams_each_file(self, mock_which):
+        async def fake_transcribe(model, audio, *args, **kwargs):
+            if audio == "bad":
+                raise RuntimeError("decode failed")
+            return f"SRT {audio}"
+
+        async def fake_decode(path):
+            with open(path) as f:
+                return f.read()
+
+        with patch("backend.main.load_model", new_callable=AsyncMock), \
+             patch("backend.main.decode_audio", side_effect=fake_decode), \
+             patch("backend.main.transcribe_file", side_effect=fake_transcribe):
+            resp = client.post(
+                "/api/transcribe-batch",
+                files=[("files", ("a.mp3", b"good", "audio/mpeg")),
+                       ("files", ("b.mp3", b"bad", "audio/mpeg"))],
+                data={"model_name": "tiny", "workers": "1", "output": "ndjson"},
+            )
+
+        import json
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in resp.text.splitlines()]
+        assert lines == [
+            {"file": "a.srt", "source": "a.mp3", "srt": "SRT good"},
+            {"file": "b.srt", "source": "b.mp3", "error": "decode failed"},
+        ]
+
+    @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_zip_output_from_parallel_workers(self, mock_which):
+        import io
+        import zipfile
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=2)
+
+        def fake_sync(model, path, audio_code, target_code, **kwargs):
+            if path.endswith("bad.mp3"):
+                raise RuntimeError("decode failed")
+            return "SRT " + os.path.basename(path)
+
+        with patch("backend.main.process_pool", return_value=nullcontext(pool)), \
+             patch("backend.main._transcribe_file_sync", side_effect=fake_sync), \
+             patch("backend.main.probe_duration", return_value=1.0):
+            resp = client.post(
+                "/api/transcribe-batch",
+                files=[("files", (name, b"x", "audio/mpeg"))
+                       for name in ("one.mp3", "two.mp3", "bad.mp3")],
+                data={"model_name": "tiny", "workers": "2", "output": "zip",
+                      "target_lang": "es"},
+            )
+        pool.shutdown()
+
+        assert resp.status_code == 200
+        assert 'filename="subtitles_es.zip"' in resp.headers["content-disposition"]
+        archive = zipfile.ZipFile(io.BytesIO(resp.content))
+        assert sorted(archive.namelist()) == ["errors.txt", "one.srt", "two.srt"]
+        assert archive.read("one.srt") == b"SRT one.mp3"
+        assert archive.read("errors.txt") == b"bad.mp3: decode failed\n"
+
+    @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_duplicate_filenames_get_distinct_outputs(self, mock_which):
+        import io
+        import zipfile
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=2)
+
+        def fake_sync(model, path, audio_code, target_code, **kwargs):
+            with open(path) as f:
+                return "SRT " + f.read()
+
+        with patch("backend.main.process_pool", return_value=nullcontext(pool)), \
+             patch("backend.main._transcribe_file_sync", side_effect=fake_sync), \
+             patch("backend.main.probe_duration", return_value=1.0):
+            resp = client.post(
+                "/api/transcribe-batch",
+                files=[("files", ("talk.mp3", b"first", "audio/mpeg")),
+                       ("files", ("talk.mp3", b"second", "audio/mpeg")),
+                       ("files", ("talk.wav", b"third", "audio/wav"))],
+                data={"model_name": "tiny", "workers": "2", "output": "zip"},
+            )
+        pool.shutdown()
+
+        assert resp.status_code == 200
+        archive = zipfile.ZipFile(io.BytesIO(resp.content))
+        assert {name: archive.read(name) for name in archive.namelist()} == {
+            "talk.srt": b"SRT first",
+            "talk_2.srt": b"SRT second",
+            "talk_3.srt": b"SRT third",
+        }
+
+    @patch("backend.main.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_unknown_output_returns_400(self, mock_which):
+        resp = client.post(
+            "/api/transcribe-batch",
+            files={"files": ("a.mp3", b"x", "audio/mpeg")},
+            data={"output": "xml"},
+        )
+        assert resp.status_code == 400
+
+    def test_overlapping_batches_with_different_models(self):
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        created = []
+
+        def fake_pool(max_workers, **kwargs):
+            created.append(kwargs["initargs"][0])
+            return ThreadPoolExecutor(max_workers=max_workers)
+
+        def fake_transcribe(path, audio_code, target_code, batch_size=0):
+            time.sleep(0.05)
+            return f"SRT {path}"
+
+        async def batch(model_name, names, delay=0.0):
+            await asyncio.sleep(delay)
+            return [
+                (name, error) async for name, _, error in transcribe_files_parallel(
+                    [(n, n) for n in names], model_name, "en", "en", workers=2,
+                )
+            ]
+
+        async def run():
+            return await asyncio.gather(
+                batch("tiny", ["a1", "a2", "a3", "a4"]),
+                batch("base", ["b1", "b2"], delay=0.02),
+            )
+
+        with patch("backend.main.ProcessPoolExecutor", side_effect=fake_pool), \
+             patch("backend.main._pool_transcribe", side_effect=fake_transcribe), \
+             patch("backend.main.probe_duration", return_value=1.0):
+            first, second = asyncio.run(run())
+            shutdown_process_pool()
+
+        assert sorted(created) == ["base", "tiny"]
+        assert sorted(first) == [(n, None) for n in ("a1", "a2", "a3", "a4")]
+        assert sorted(second) == [("b1", None), ("b2", None)]
+
+    def test_split_cpu_threads(self):
+        with patch("backend.main.psutil.cpu_count", return_value=8):
+            assert split_cpu_threads(1) == 8
+            assert split_cpu_threads(4) == 2
+            assert split_cpu_threads(16) == 1
+
+    def test_probe_duration_falls_back_to_file_size(self, tmp_path):
+        f = tmp_path / "a.mp3"
+        f.write_bytes(b"x" * 32_000)
+        with patch("backend.main.subprocess.run", side_effect=OSError):
+            assert probe_duration(str(f)) == 2.0
+
+
+# ──────────────────── Audio ingest ────────────────────────
+
+def _upload(data: bytes, filename: str):
+    import io
+    from fastapi import UploadFile
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def _cat_decoder(source):
+    # Stand-in for ffmpeg: passes the input through unchanged
+    return ["cat"] if source == "pipe:0" else ["cat", source]
+
+
+class TestAudioIngest:
+    def test_pcm_to_float(self):
+        import numpy as np
+        pcm = np.array([0, 16384, -32768], dtype=np.int16).tobytes()
+        assert pcm_to_float(pcm).tolist() == [0.0, 0.5, -1.0]
+
+    def test_upload_is_streamed_through_decoder(self):
+        import numpy as np
+        pcm = np.arange(-4000, 4000, dtype=np.int16).tobytes() * 200
+        with patch("backend.main._ffmpeg_decode_cmd", side_effect=_cat_decoder), \
+             patch("backend.main.save_upload") as mock_save:
+            audio = asyncio.run(decode_upload(_upload(pcm, "a.mp3")))
+        mock_save.assert_not_called()
+        assert audio.dtype == np.float32
+        assert len(audio) == len(pcm) // 2
+
+    def test_mp4_is_spooled_once(self):
+        pcm = b"\x00\x40" * 10
+        with patch("backend.main._ffmpeg_decode_cmd", side_effect=_cat_decoder) as cmd:
+            audio = asyncio.run(decode_upload(_upload(pcm, "clip.mp4")))
+        assert cmd.call_args[0][0].endswith("clip.mp4")
+        assert audio.tolist() == [0.5] * 10
+
+    def test_decoder_failure_raises(self):
+        with patch("backend.main._ffmpeg_decode_cmd", return_value=["false"]):
+            with pytest.raises(RuntimeError, match="could not decode"):
+                asyncio.run(decode_upload(_upload(b"junk", "a.mp3")))
+
 
 # ──────────────────── _transcribe_file_sync ───────────────
 
@@ -161,6 +532,1513 @@ class TestTranscribeFileSync:
         assert "Bonjour" in result
         assert mock_model.transcribe.call_args[1]["task"] == "translate"
 
+    def test_batched_mode_uses_pipeline(self):
+        mock_model = MagicMock()
+        seg = MagicMock(start=0.0, end=1.0, text=" Hi ")
+        with patch("backend.main.BatchedInferencePipeline") as pipeline_cls:
+            pipeline_cls.return_value.transcribe.return_value = (iter([seg]), None)
+            result = _transcribe_file_sync(
+                mock_model, "fake.mp3", "en", "en", batch_size=4,
+            )
+        assert "Hi" in result
+        pipeline_cls.assert_called_once_with(mock_model)
+        assert pipeline_cls.return_value.transcribe.call_args[1]["batch_size"] == 4
+        mock_model.transcribe.assert_not_called()
+
+    def test_word_timestamps_are_collected(self):
+        from backend.main import _transcribe_segments_sync
+        mock_model = MagicMock()
+        word = MagicMock(start=0.0, end=0.4, word=" Hi")
+        seg = MagicMock(start=0.0, end=0.4, text=" Hi", words=[word])
+        mock_model.transcribe.return_value = (iter([seg]), None)
+
+        result = _transcribe_segments_sync(
+            mock_model, "fake.mp3", "en", "en", word_timestamps=True,
+        )
+        assert result[0]["words"] == [{"start": 0.0, "end": 0.4, "word": " Hi"}]
+        assert mock_model.transcribe.call_args[1]["word_timestamps"] is True
+
+    def test_resolve_batch_size(self):
+        assert resolve_batch_size(False, 8) == 0
+        assert resolve_batch_size(True, 8) == 8
+        assert resolve_batch_size(True, 100) == 16
+        with patch("backend.main.auto_batch_size", return_value=6):
+            assert resolve_batch_size(True, 0) == 6
+
+    def test_auto_batch_size_scales_with_free_ram(self):
+        gb = 1024**3
+        with patch("backend.main.DEVICE", "cpu"), \
+             patch("backend.main.psutil.virtual_memory") as vm:
+            vm.return_value.available = 3.5 * gb
+            assert auto_batch_size() == 3
+            vm.return_value.available = 0.2 * gb
+            assert auto_batch_size() == 1
+            vm.return_value.available = 64 * gb
+            assert auto_batch_size() == 16
+
+
+# ──────────────────── Progress forwarding ─────────────────
+
+def _segment_msg(i):
+    return {"current": float(i), "total": 100.0, "percent": i, "segment_text": f"seg {i}"}
+
+
+class TestProgressForwarder:
+    def test_all_lines_forwarded_and_progress_coalesced(self):
+        def worker(progress):
+            for i in range(1, 51):
+                progress.put_nowait(_segment_msg(i))
+            return "done"
+
+        async def run():
+            async with ProgressForwarder(interval=0.05) as progress:
+                return await asyncio.to_thread(worker, progress)
+
+        with patch("backend.main.send_log", new_callable=AsyncMock) as log, \
+             patch("backend.main.send_progress", new_callable=AsyncMock) as prog:
+            assert asyncio.run(run()) == "done"
+
+        assert [c.args[0] for c in log.await_args_list] == [
+            f"  [{format_timestamp(float(i))}] seg {i}" for i in range(1, 51)
+        ]
+        assert prog.await_count < 50
+        assert prog.await_args.args == (50.0, 100.0)
+
+    def test_flushes_when_worker_fails(self):
+        def worker(progress):
+            progress.put_nowait(_segment_msg(3))
+            raise RuntimeError("decode error")
+
+        async def run():
+            async with ProgressForwarder(interval=10) as progress:
+                await asyncio.to_thread(worker, progress)
+
+        with patch("backend.main.send_log", new_callable=AsyncMock), \
+             patch("backend.main.send_progress", new_callable=AsyncMock) as prog:
+            with pytest.raises(RuntimeError):
+                asyncio.run(run())
+        prog.assert_awaited_once_with(3.0, 100.0)
+
+    def test_transcribe_file_reports_progress(self):
+        mock_model = MagicMock()
+        segs = [MagicMock(start=i, end=i + 1.0, text=f" s{i} ") for i in range(3)]
+        mock_model.transcribe.return_value = (iter(segs), MagicMock(duration=3.0))
+        with patch("backend.main.send_log", new_callable=AsyncMock) as log, \
+             patch("backend.main.send_progress", new_callable=AsyncMock) as prog:
+            srt = asyncio.run(transcribe_file(mock_model, "fake.mp3", "en", "en"))
+        assert "s2" in srt
+        assert log.await_count == 3
+        assert prog.await_args.args == (3.0, 3.0)
+
+
+# ──────────────────── Live transcription ──────────────────
+
+def _live_model(*segments):
+    """Fake WhisperModel returning (start, end, text) segments for any audio."""
+    model = MagicMock()
+    model.transcribe.side_effect = lambda audio, **kw: (
+        iter([MagicMock(start=s, end=e, text=f" {t} ") for s, e, t in segments]), None,
+    )
+    return model
+
+
+def _speech(*spans):
+    """get_speech_timestamps stand-in with spans given in seconds."""
+    return lambda audio, options: [
+        {"start": int(a * 16000), "end": int(b * 16000)} for a, b in spans
+    ]
+
+
+class TestLiveTranscriber:
+    def test_pause_commits_final_segments(self):
+        live = LiveTranscriber(_live_model((0.0, 1.0, "hello")), "en", "en")
+        live.feed(np.zeros(2 * 16000, dtype=np.float32))
+        with patch("backend.main.get_speech_timestamps", _speech((0.0, 1.0))):
+            events = live.step()
+        assert events == [{"type": "final", "start": 0.0, "end": 1.0, "text": "hello"}]
+        assert len(live.model.transcribe.call_args.args[0]) == 16000
+        assert live.offset == 1.0
+        assert len(live.buffer) == 16000
+        assert live.prompt == "hello"
+
+    def test_ongoing_speech_is_partial(self):
+        live = LiveTranscriber(_live_model((0.0, 1.5, "hel")), "en", "en")
+        live.feed(np.zeros(2 * 16000, dtype=np.float32))
+        with patch("backend.main.get_speech_timestamps", _speech((0.5, 2.0))):
+            events = live.step()
+        assert events == [{"type": "partial", "start": 0.0, "end": 1.5, "text": "hel"}]
+        assert live.offset == 0.0
+        assert live.pending == 0
+
+    def test_long_window_commits_all_but_last_segment(self):
+        model = _live_model((0.0, 1.0, "one"), (1.0, 2.0, "two"), (2.0, 3.0, "thr"))
+        live = LiveTranscriber(model, "en", "en", window=2)
+        live.feed(np.zeros(3 * 16000, dtype=np.float32))
+        with patch("backend.main.get_speech_timestamps", _speech((0.0, 3.0))):
+            events = live.step()
+        assert [e["type"] for e in events] == ["final", "final", "partial"]
+        assert events[-1] == {"type": "partial", "start": 2.0, "end": 3.0, "text": "thr"}
+        assert live.offset == 2.0
+
+    def test_silence_is_trimmed_without_decoding(self):
+        model = _live_model()
+        live = LiveTranscriber(model, "en", "en", silence_ms=500)
+        live.feed(np.zeros(3 * 16000, dtype=np.float32))
+        with patch("backend.main.get_speech_timestamps", _speech()):
+            assert live.step() == []
+        model.transcribe.assert_not_called()
+        assert len(live.buffer) == 8000
+        assert live.offset == 2.5
+
+    def test_websocket_streams_pcm(self):
+        model = _live_model((0.0, 0.8, "hi there"))
+        pcm = np.zeros(16000, dtype=np.int16).tobytes()
+        with patch("backend.main.load_model", new_callable=AsyncMock, return_value=model), \
+             patch("backend.main.get_speech_timestamps", _speech((0.0, 0.8))), \
+             patch("backend.main.send_log", new_callable=AsyncMock):
+            with client.websocket_connect("/ws/live?model_name=tiny&audio_lang=en") as ws:
+                ws.send_bytes(pcm[:10000])
+                ws.send_bytes(pcm[10000:])
+                ws.send_json({"type": "stop"})
+                messages = []
+                while not messages or messages[-1]["type"] != "done":
+                    messages.append(ws.receive_json())
+        finals = [m for m in messages if m["type"] == "final"]
+        assert finals == [{"type": "final", "start": 0.0, "end": 0.8, "text": "hi there"}]
+
+    def test_websocket_carries_odd_byte_between_frames(self):
+        model = _live_model((0.0, 0.8, "hi there"))
+        pcm = np.full(16000, 256, dtype=np.int16).tobytes()
+        fed = []
+        with patch("backend.main.load_model", new_callable=AsyncMock, return_value=model), \
+             patch("backend.main.get_speech_timestamps", _speech((0.0, 0.8))), \
+             patch("backend.main.send_log", new_callable=AsyncMock), \
+             patch.object(LiveTranscriber, "feed", autospec=True,
+                          side_effect=lambda self, samples: fed.append(samples)):
+            with client.websocket_connect("/ws/live?model_name=tiny&audio_lang=en") as ws:
+                for start in range(0, len(pcm), 9999):
+                    ws.send_bytes(pcm[start:start + 9999])
+                ws.send_json({"type": "stop"})
+                messages = []
+                while not messages or messages[-1]["type"] != "done":
+                    messages.append(ws.receive_json())
+        assert not any(m["type"] == "error" for m in messages)
+        samples = np.concatenate(fed)
+        assert len(samples) == 16000
+        assert np.all(samples == pcm_to_float(pcm[:2]))
+
+    def test_websocket_rejects_unknown_model(self):
+        with client.websocket_connect("/ws/live?model_name=huge") as ws:
+            assert ws.receive_json() == {"type": "error", "message": "Unknown model: huge"}
+
+
+# ──────────────────── Long-file chunking ──────────────────
+
+class TestLongFileChunking:
+    def test_cuts_in_the_middle_of_pauses(self):
+        audio = np.zeros(50 * 16000, dtype=np.float32)
+        speech = [(0, 9), (11, 19), (21, 35), (37, 50)]
+        with patch("backend.main.get_speech_timestamps", _speech(*speech)):
+            chunks = split_at_silences(audio, chunk_seconds=10)
+        bounds = [0, 10, 20, 36, 50]
+        assert chunks == [(a * 16000, b * 16000) for a, b in zip(bounds, bounds[1:])]
+
+    def test_hard_cut_without_pause_overlaps(self):
+        audio = np.zeros(50 * 16000, dtype=np.float32)
+        with patch("backend.main.get_speech_timestamps", _speech((0, 50))):
+            chunks = split_at_silences(audio, chunk_seconds=10)
+        assert chunks[0] == (0, 20 * 16000)
+        assert chunks[1][0] == 19 * 16000
+        assert chunks[-1][1] == len(audio)
+
+    def test_stitch_offsets_and_dedupes_boundary(self):
+        merged = stitch_segments([
+            (0.0, [{"start": 0.0, "end": 5.0, "text": "Hello there."},
+                   {"start": 18.0, "end": 20.0, "text": "we went to"}]),
+            (19.0, [{"start": 0.0, "end": 1.0, "text": "We went to!"},
+                    {"start": 0.5, "end": 3.0, "text": "the store",
+                     "words": [{"start": 2.0, "end": 3.0, "word": "store"}]}]),
+        ])
+        assert [seg["text"] for seg in merged] == ["Hello there.", "we went to", "the store"]
+        assert merged[2]["start"] == 20.0
+        assert merged[2]["end"] == 22.0
+        assert merged[2]["words"][0]["start"] == 21.0
+
+    def test_transcribe_long_runs_chunks_in_parallel_and_stitches(self):
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(max_workers=2)
+        chunks = [(0, 16000 * 10), (16000 * 10, 16000 * 30)]
+
+        def fake_chunk(audio, audio_code, target_code, batch_size):
+            return [{"start": 1.0, "end": 2.0, "text": f"{len(audio) // 16000}s"}]
+
+        with patch("backend.main.process_pool", return_value=nullcontext(pool)), \
+             patch("backend.main.split_at_silences", return_value=chunks), \
+             patch("backend.main._pool_transcribe_segments", side_effect=fake_chunk), \
+             patch("backend.main.send_log", new_callable=AsyncMock), \
+             patch("backend.main.send_progress", new_callable=AsyncMock) as prog:
+            segments = asyncio.run(transcribe_long(
+                np.zeros(16000 * 30, dtype=np.float32), "tiny", "en", "en", workers=2,
+            ))
+        pool.shutdown()
+
+        assert segments == [
+            {"start": 1.0, "end": 2.0, "text": "10s"},
+            {"start": 11.0, "end": 12.0, "text": "20s"},
+        ]
+        assert prog.await_count == 2
+        assert prog.await_args.args == (30.0, 30.0)
+
+
+# ──────────────────── SRT translation ─────────────────────
+
+SAMPLE_SRT = (
+    "1\n00:00:00,000 --> 00:00:01,000\nHello\n\n"
+    "2\n00:00:01,000 --> 00:00:02,000\nHow are\nyou?\n\n"
+    "3\n00:00:02,000 --> 00:00:03,000\nBye\n"
+)
+
+
+class TestParseSrtBlocks:
+    def test_blocks_and_multiline_text(self):
+        blocks = parse_srt_blocks(SAMPLE_SRT)
+        assert len(blocks) == 3
+        assert blocks[1] == ("2", "00:00:01,000 --> 00:00:02,000", "How are you?")
+
+    def test_last_block_without_trailing_blank_line(self):
+        blocks = parse_srt_blocks(SAMPLE_SRT.rstrip("\n"))
+        assert blocks[-1][2] == "Bye"
+
+    def test_incomplete_block_skipped(self):
+        assert parse_srt_blocks("1\n00:00:00,000 --> 00:00:01,000\n\n") == []
+
+
+class TestTranslateSrtBlocks:
+    def test_keeps_order_and_bounds_concurrency(self):
+        in_flight = 0
+        peak = 0
+
+        async def fake_ollama(text, source_lang="en", target_lang="fr"):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Later cues finish first to exercise reordering
+            await asyncio.sleep(0.01 * (10 - int(text)))
+            in_flight -= 1
+            return f"T{text}"
+
+        blocks = [(str(i), "ts", str(i)) for i in range(10)]
+        with patch("backend.main.call_ollama", side_effect=fake_ollama):
+            result = asyncio.run(translate_srt_blocks(blocks, concurrency=3))
+        assert result == [f"T{i}" for i in range(10)]
+        assert peak == 3
+
+    @patch("backend.main.call_ollama")
+    def test_endpoint_reassembles_srt(self, mock_ollama):
+        async def fake_ollama(text, source_lang="en", target_lang="fr"):
+            return text.upper()
+        mock_ollama.side_effect = fake_ollama
+
+        resp = client.post(
+            "/api/ollama/translate-srt",
+            files={"file": ("sub.srt", SAMPLE_SRT.encode(), "text/plain")},
+            data={"source_lang": "en", "target_lang": "fr",
+                  "concurrency": "2", "batch_size": "1"},
+        )
+        assert resp.status_code == 200
+        assert parse_srt_blocks(resp.text) == [
+            ("1", "00:00:00,000 --> 00:00:01,000", "HELLO"),
+            ("2", "00:00:01,000 --> 00:00:02,000", "HOW ARE YOU?"),
+            ("3", "00:00:02,000 --> 00:00:03,000", "BYE"),
+        ]
+
+
+class TestCueBatching:
+    def test_batches_respect_cue_limit(self):
+        batches = make_cue_batches(["a"] * 7, max_cues=3, max_tokens=1000)
+        assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+
+    def test_batches_respect_token_budget(self):
+        texts = ["x" * 40, "x" * 40, "x" * 40]  # ~10 tokens each
+        assert make_cue_batches(texts, max_cues=10, max_tokens=25) == [[0, 1], [2]]
+
+    def test_oversized_cue_gets_own_batch(self):
+        assert make_cue_batches(["x" * 400, "y"], max_cues=10, max_tokens=10) == [[0], [1]]
+
+    def test_parse_numbered_reply(self):
+        reply = "1. Bonjour\n2) Comment\nca va ?\n3. Au revoir"
+        assert parse_numbered_reply(reply, 3) == ["Bonjour", "Comment ca va ?", "Au revoir"]
+
+    def test_parse_numbered_reply_wrong_count(self):
+        assert parse_numbered_reply("1. Bonjour\n2. Salut", 3) is None
+        assert parse_numbered_reply("Voici la traduction :\n1. Bonjour", 1) is None
+
+    def test_batch_uses_single_prompt(self):
+        async def fake_generate(prompt):
+            assert "1. Hello" in prompt and "2. Bye" in prompt
+            return "1. Bonjour\n2. Au revoir"
+
+        with patch("backend.main._ollama_generate", side_effect=fake_generate) as gen:
+            result = asyncio.run(call_ollama_batch(["Hello", "Bye"]))
+        assert result == ["Bonjour", "Au revoir"]
+        assert gen.call_count == 1
+
+    def test_batch_falls_back_per_cue_on_mismatch(self):
+        async def fake_generate(prompt):
+            if "1. Hello" in prompt:
+                return "1. Bonjour et au revoir"
+            return "Traduit"
+
+        with patch("backend.main._ollama_generate", side_effect=fake_generate) as gen:
+            result = asyncio.run(call_ollama_batch(["Hello", "Bye"]))
+        assert result == ["Traduit", "Traduit"]
+        assert gen.call_count == 3
+
+
+# ──────────────────── Translation memory ──────────────────
+
+class TestTranslationMemory:
+    def test_miss_then_hit(self, tmp_path):
+        tm = TranslationMemory(str(tmp_path / "tm.db"), max_entries=10)
+        assert tm.get("Hello", "en", "fr", "mistral") is None
+        tm.put("Hello", "en", "fr", "Bonjour", "mistral")
+        assert tm.get("Hello", "en", "fr", "mistral") == "Bonjour"
+        assert tm.get("Hello", "en", "es", "mistral") is None
+        assert tm.get("Hello", "en", "fr", "llama3") is None
+        stats = tm.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 3
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "tm.db")
+        TranslationMemory(path, max_entries=10).put("[Music]", "en", "fr", "[Musique]", "m")
+        assert TranslationMemory(path, max_entries=10).get("[Music]", "en", "fr", "m") == "[Musique]"
+
+    def test_lru_eviction(self, tmp_path):
+        tm = TranslationMemory(str(tmp_path / "tm.db"), max_entries=2)
+        tm.put("a", "en", "fr", "A", "m")
+        tm.put("b", "en", "fr", "B", "m")
+        tm.get("a", "en", "fr", "m")  # "b" is now least recently used
+        tm.put("c", "en", "fr", "C", "m")
+        assert tm.stats()["entries"] == 2
+        assert tm.get("b", "en", "fr", "m") is None
+        assert tm.get("a", "en", "fr", "m") == "A"
+
+    def test_batch_lookup_and_store(self, tmp_path):
+        tm = TranslationMemory(str(tmp_path / "tm.db"), max_entries=10)
+        tm.put_many([("a", "A"), ("b", "B")], "en", "fr", "m")
+        assert tm.get_many(["b", "x", "a", "b"], "en", "fr", "m") == ["B", None, "A", "B"]
+        assert (tm.stats()["hits"], tm.stats()["misses"]) == (3, 1)
+        assert tm._connect().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_lookups_run_off_the_event_loop(self, fresh_translation_memory):
+        fresh_translation_memory.put("Hello", "en", "fr", "Bonjour")
+        threads = []
+        get_many = fresh_translation_memory.get_many
+
+        def recording_get_many(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return get_many(*args, **kwargs)
+
+        with patch.object(fresh_translation_memory, "get_many", recording_get_many):
+            result = asyncio.run(call_ollama_batch(["Hello", "Hello"]))
+        assert result == ["Bonjour", "Bonjour"]
+        assert threads and threading.main_thread() not in threads
+
+    def test_disabled(self, tmp_path):
+        tm = TranslationMemory(str(tmp_path / "tm.db"), max_entries=0)
+        tm.put("a", "en", "fr", "A", "m")
+        assert tm.get("a", "en", "fr", "m") is None
+
+    def test_call_ollama_uses_cache(self):
+        async def fake_generate(prompt):
+            return "Bonjour"
+
+        with patch("backend.main._ollama_generate", side_effect=fake_generate) as gen:
+            assert asyncio.run(call_ollama("Hello")) == "Bonjour"
+            assert asyncio.run(call_ollama("Hello")) == "Bonjour"
+        assert gen.call_count == 1
+
+    def test_failed_translation_not_cached(self):
+        async def fake_generate(prompt):
+            return None
+
+        with patch("backend.main._ollama_generate", side_effect=fake_generate) as gen:
+            assert asyncio.run(call_ollama("Hello")) == "Hello"
+            assert asyncio.run(call_ollama("Hello")) == "Hello"
+        assert gen.call_count == 2
+
+    def test_batch_only_sends_uncached_cues(self, fresh_translation_memory):
+        fresh_translation_memory.put("Hello", "en", "fr", "Bonjour")
+
+        async def fake_generate(prompt):
+            assert "Hello" not in prompt
+            return "1. Merci\n2. Au revoir"
+
+        with patch("backend.main._ollama_generate", side_effect=fake_generate):
+            result = asyncio.run(call_ollama_batch(["Thanks", "Hello", "Bye"]))
+        assert result == ["Merci", "Bonjour", "Au revoir"]
+        assert fresh_translation_memory.get("Bye", "en", "fr") == "Au revoir"
+
+    def test_stats_endpoint(self, fresh_translation_memory):
+        fresh_translation_memory.put("Hello", "en", "fr", "Bonjour")
+        fresh_translation_memory.get("Hello", "en", "fr")
+        data = client.get("/api/translation-cache").json()
+        assert data["entries"] == 1
+        assert data["hits"] == 1
+
+        data = client.delete("/api/translation-cache").json()
+        assert data["entries"] == 0
+
+
+# ──────────────────── Transcription cache ─────────────────
+
+SEGMENTS = [
+    {"start": 0.0, "end": 1.5, "text": "Hello"},
+    {"start": 1.5, "end": 3.0, "text": "World"},
+]
+
+
+class TestTranscriptionCache:
+    def test_roundtrip_and_stats(self, tmp_path):
+        cache = TranscriptionCache(str(tmp_path / "t.db"), max_mb=1)
+        key = cache.make_key("abc", "tiny", {"task": "transcribe"})
+        assert cache.get(key) is None
+        cache.put(key, SEGMENTS)
+        assert cache.get(key) == SEGMENTS
+        stats = cache.stats()
+        assert stats["entries"] == 1
+        assert stats["hits"] == 1 and stats["misses"] == 1
+
+    def test_key_depends_on_model_and_options(self):
+        base = TranscriptionCache.make_key("abc", "tiny", {"task": "transcribe"})
+        assert base != TranscriptionCache.make_key("abc", "small", {"task": "transcribe"})
+        assert base != TranscriptionCache.make_key("abc", "tiny", {"task": "translate"})
+        assert base != TranscriptionCache.make_key("abd", "tiny", {"task": "transcribe"})
+
+    def test_evicts_lru_over_size_budget(self, tmp_path):
+        cache = TranscriptionCache(str(tmp_path / "t.db"), max_mb=1)
+        big = [{"start": 0.0, "end": 1.0, "text": "x" * 400_000}]
+        cache.put("a", big)
+        cache.put("b", big)
+        cache.get("a")  # b becomes least recently used
+        cache.put("c", big)
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_disabled_cache(self, tmp_path):
+        cache = TranscriptionCache(str(tmp_path / "t.db"), max_mb=0)
+        cache.put("a", SEGMENTS)
+        assert cache.get("a") is None
+        assert cache.stats()["enabled"] is False
+
+    def test_second_pass_served_from_cache(self, tmp_path):
+        audio = tmp_path / "a.mp3"
+        audio.write_bytes(b"audio bytes")
+        mock_model = MagicMock()
+        seg = MagicMock(start=0.0, end=1.5, text=" Hello ")
+        mock_model.transcribe.return_value = (iter([seg]), None)
+
+        first = _transcribe_file_sync(mock_model, str(audio), "en", "en", model_name="tiny")
+        second = _transcribe_file_sync(mock_model, str(audio), "en", "en", model_name="tiny")
+        assert first == second
+        assert mock_model.transcribe.call_count == 1
+
+        # A different task is a different entry
+        mock_model.transcribe.return_value = (iter([seg]), None)
+        _transcribe_file_sync(mock_model, str(audio), "en", "fr", model_name="tiny")
+        assert mock_model.transcribe.call_count == 2
+
+    def test_segments_to_srt(self):
+        srt = segments_to_srt(SEGMENTS)
+        assert srt == (
+            "1\n00:00:00,000 --> 00:00:01,500\nHello\n\n"
+            "2\n00:00:01,500 --> 00:00:03,000\nWorld\n"
+        )
+
+    def test_endpoint_stats_and_purge(self, fresh_transcription_cache):
+        fresh_transcription_cache.put("k", SEGMENTS)
+        assert client.get("/api/transcription-cache").json()["entries"] == 1
+        assert client.delete("/api/transcription-cache").json()["entries"] == 0
+
+
+# ──────────────────── Ollama HTTP client ──────────────────
+
+def _run_with_transport(handler, coro_factory):
+    """Run a coroutine against a shared Ollama client backed by a mock transport."""
+    async def _main():
+        mock_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        with patch("backend.main._ollama_client", mock_client), \
+                patch("backend.main.OLLAMA_RETRY_BACKOFF", 0):
+            try:
+                return await coro_factory()
+            finally:
+                await mock_client.aclose()
+    return asyncio.run(_main())
+
+
+class TestOllamaClient:
+    def test_retries_5xx_then_succeeds(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) < 3:
+                return httpx.Response(503)
+            return httpx.Response(200, json={"response": " Bonjour "})
+
+        result = _run_with_transport(handler, lambda: _ollama_generate("Hello"))
+        assert result == "Bonjour"
+        assert len(calls) == 3
+
+    def test_gives_up_after_max_retries(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(500)
+
+        result = _run_with_transport(handler, lambda: _ollama_generate("Hello"))
+        assert result is None
+        assert len(calls) == 4  # initial try + OLLAMA_MAX_RETRIES
+
+    def test_client_errors_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(404)
+
+        resp = _run_with_transport(
+            handler, lambda: ollama_request("GET", "http://ollama/api/tags")
+        )
+        assert resp.status_code == 404
+        assert len(calls) == 1
+
+    def test_connection_errors_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise httpx.ConnectError("refused")
+            return httpx.Response(200, json={"models": []})
+
+        resp = _run_with_transport(
+            handler, lambda: ollama_request("GET", "http://ollama/api/tags")
+        )
+        assert resp.status_code == 200
+        assert len(calls) == 2
+
+
+# ──────────────────── Text chunking ───────────────────────
+
+LONG_TEXT = (
+    "First paragraph. It has two sentences.\n\n"
+    "Second paragraph is a little longer. It has three sentences. Really!\n\n"
+    "Third."
+)
+
+
+class TestTextChunking:
+    def test_small_text_single_chunk(self):
+        assert split_text_chunks("Hello world.", max_tokens=100) == [("Hello world.", "")]
+
+    @pytest.mark.parametrize("text", [
+        LONG_TEXT,
+        "\n\nHello world.\n\nSecond para.",
+        "  \n" + LONG_TEXT + "\n\n",
+    ])
+    @pytest.mark.parametrize("max_tokens", [1000, 20, 8, 5, 3])
+    def test_chunks_rebuild_original_layout(self, text, max_tokens):
+        chunks = split_text_chunks(text, max_tokens=max_tokens)
+        assert "".join(chunk + sep for chunk, sep in chunks) == text
+
+    def test_leading_blank_lines_kept_out_of_translation(self):
+        async def fake_ollama(text, source_lang="en", target_lang="fr", context=""):
+            assert text.strip()
+            return text.upper()
+
+        with patch("backend.main.call_ollama", side_effect=fake_ollama):
+            result = asyncio.run(translate_text_chunks(
+                "\n\nHello world.\n\nSecond para.", max_tokens=5,
+            ))
+        assert result == "\n\nHELLO WORLD.\n\nSECOND PARA."
+
+    def test_prefers_paragraph_boundaries(self):
+        chunks = split_text_chunks(LONG_TEXT, max_tokens=20)
+        assert chunks[0] == ("First paragraph. It has two sentences.", "\n\n")
+
+    @pytest.mark.parametrize("text", [
+        "A sentence made of many extraordinarily long words " * 20,
+        "\u4e00" * 500 + "\u3002",
+    ])
+    def test_oversized_sentence_split_under_token_budget(self, text):
+        chunks = split_text_chunks(text, max_tokens=5)
+        assert "".join(chunk + sep for chunk, sep in chunks) == text
+        assert all(estimate_tokens(chunk) <= 5 for chunk, _ in chunks)
+
+    def test_long_paragraph_split_on_sentences(self):
+        chunks = split_text_chunks(LONG_TEXT, max_tokens=10)
+        assert ("Second paragraph is a little longer.", " ") in chunks
+
+    def test_chunks_translated_concurrently_in_order(self):
+        contexts = {}
+
+        async def fake_ollama(text, source_lang="en", target_lang="fr", context=""):
+            contexts[text] = context
+            await asyncio.sleep(0.01 if text.startswith("First") else 0)
+            return f"<{text}>"
+
+        with patch("backend.main.call_ollama", side_effect=fake_ollama):
+            result = asyncio.run(translate_text_chunks(LONG_TEXT, max_tokens=20, overlap=1))
+        assert result == (
+            "<First paragraph. It has two sentences.>\n\n"
+            "<Second paragraph is a little longer. It has three sentences. Really!"
+            "\n\nThird.>"
+        )
+        assert contexts["First paragraph. It has two sentences."] == ""
+        second = next(text for text in contexts if text.startswith("Second"))
+        assert contexts[second] == "It has two sentences."
+
+
+# ──────────────────── Streaming ───────────────────────────
+
+class TestStreaming:
+    def test_ollama_stream_yields_fragments(self):
+        body = (
+            '{"response": "Bon", "done": false}\n'
+            '{"response": "jour", "done": false}\n'
+            '{"response": "", "done": true}\n'
+        )
+
+        def handler(request):
+            assert b'"stream":true' in request.content.replace(b" ", b"")
+            return httpx.Response(200, content=body.encode())
+
+        async def collect():
+            return [piece async for piece in _ollama_stream("Hello")]
+
+        assert _run_with_transport(handler, collect) == ["Bon", "jour"]
+
+    def test_ollama_stream_retries_5xx(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(503)
+            return httpx.Response(200, content=b'{"response": "Salut", "done": true}\n')
+
+        async def collect():
+            return [piece async for piece in _ollama_stream("Hi")]
+
+        assert _run_with_transport(handler, collect) == ["Salut"]
+        assert len(calls) == 2
+
+    def test_failed_stream_chunk_kept_in_source_language(self, fresh_translation_memory):
+        async def fake_stream(prompt):
+            if "Second" in prompt:
+                raise httpx.ConnectError("refused")
+            yield "<ok>"
+
+        with patch("backend.main._ollama_stream", side_effect=fake_stream):
+            resp = client.post(
+                "/api/ollama/translate-text",
+                files={"file": ("doc.txt", LONG_TEXT.encode(), "text/plain")},
+                data={"stream": "true", "chunk_tokens": "20"},
+            )
+        assert resp.status_code == 200
+        text, error = resp.text.split(STREAM_ERROR_MARKER)
+        assert text == "<ok>\n\n" + LONG_TEXT.split("\n\n", 1)[1]
+        assert error == "1/2 chunk(s) left untranslated"
+
+    @patch("backend.main.call_ollama")
+    def test_streamed_srt_matches_buffered_output(self, mock_ollama):
+        async def fake_ollama(text, source_lang="en", target_lang="fr"):
+            await asyncio.sleep(0.01 if text == "Hello" else 0)
+            return text.upper()
+        mock_ollama.side_effect = fake_ollama
+
+        def post(stream):
+            return client.post(
+                "/api/ollama/translate-srt",
+                files={"file": ("sub.srt", SAMPLE_SRT.encode(), "text/plain")},
+                data={"batch_size": "1", "stream": stream},
+            )
+
+        streamed = post("true")
+        assert streamed.status_code == 200
+        assert streamed.text == post("false").text
+
+    def test_streamed_text_is_cached(self, fresh_translation_memory):
+        async def fake_stream(prompt):
+            for piece in ["Bon", "jour", " !"]:
+                yield piece
+
+        with patch("backend.main._ollama_stream", side_effect=fake_stream):
+            resp = client.post(
+                "/api/ollama/translate-text",
+                files={"file": ("doc.txt", b"Hello!", "text/plain")},
+                data={"stream": "true"},
+            )
+        assert resp.text == "Bonjour !"
+        assert fresh_translation_memory.get("Hello!", "en", "fr") == "Bonjour !"
+
+
+# ──────────────────── Jobs ────────────────────────────────
+
+@pytest.fixture
+def job_store(tmp_path, monkeypatch):
+    store = JobStore(str(tmp_path / "jobs.db"), str(tmp_path / "jobs"))
+    monkeypatch.setattr("backend.main.job_store", store)
+    return store
+
+
+def _submit(*names):
+    return client.post(
+        "/api/jobs",
+        files=[("files", (name, b"fake audio", "audio/mpeg")) for name in names],
+        data={"model_name": "tiny", "audio_lang": "en", "target_lang": "fr"},
+    )
+
+
+def _expire_lease(store, job_id):
+    store._connect().execute("UPDATE jobs SET updated_at = 0 WHERE id = ?", (job_id,))
+
+
+class TestJobs:
+    def test_submit_returns_job_id(self, job_store):
+        resp = _submit("a.mp3", "b.wav", "notes.txt")
+        assert resp.status_code == 200
+        job_id = resp.json()["job_id"]
+        status = client.get(f"/api/jobs/{job_id}").json()
+        assert status["status"] == "queued"
+        assert status["files"] == ["a.mp3", "b.wav"]
+        assert len(os.listdir(job_store.job_dir(job_id))) == 2
+
+    def test_submit_without_media_returns_400(self, job_store):
+        assert _submit("notes.txt").status_code == 400
+
+    def test_unknown_job_returns_404(self, job_store):
+        assert client.get("/api/jobs/nope").status_code == 404
+        assert client.get("/api/jobs/nope/result").status_code == 404
+        assert client.delete("/api/jobs/nope").status_code == 404
+
+    @patch("backend.main.load_model", new_callable=AsyncMock)
+    @patch("backend.main.transcribe_file", new_callable=AsyncMock)
+    def test_worker_runs_job_and_stores_result(self, mock_transcribe, mock_load, job_store):
+        mock_transcribe.return_value = "1\n00:00:00,000 --> 00:00:01,000\nHi\n"
+        job_id = _submit("a.mp3", "b.mp3").json()["job_id"]
+        assert client.get(f"/api/jobs/{job_id}/result").status_code == 409
+
+        job = job_store.claim("test:1")
+        assert job["id"] == job_id
+        assert job_store.claim("test:1") is None
+        asyncio.run(run_transcription_job(job))
+
+        status = client.get(f"/api/jobs/{job_id}").json()
+        assert status["status"] == "done"
+        assert status["progress"] == 100
+        result = client.get(f"/api/jobs/{job_id}/result").json()
+        assert set(result) == {"a.srt", "b.srt"}
+        assert not os.path.exists(job_store.job_dir(job_id))
+
+    @patch("backend.main.load_model", new_callable=AsyncMock, side_effect=RuntimeError("boom"))
+    def test_failed_job_records_error(self, mock_load, job_store):
+        job_id = _submit("a.mp3").json()["job_id"]
+        asyncio.run(run_transcription_job(job_store.claim("test:1")))
+        status = client.get(f"/api/jobs/{job_id}").json()
+        assert status["status"] == "failed"
+        assert status["error"] == "boom"
+
+    @patch("backend.main.load_model", new_callable=AsyncMock)
+    def test_shutdown_requeues_running_job_and_keeps_files(self, mock_load, job_store):
+        job_id = _submit("a.mp3").json()["job_id"]
+        started = asyncio.Event()
+
+        async def never_done(*args, **kwargs):
+            started.set()
+            await asyncio.sleep(3600)
+
+        async def run():
+            task = asyncio.create_task(run_transcription_job(job_store.claim("test:1")))
+            await started.wait()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        with patch("backend.main.transcribe_file", side_effect=never_done):
+            asyncio.run(run())
+        job = job_store.get(job_id)
+        assert job["status"] == "queued"
+        assert job["worker"] is None
+        assert os.listdir(job_store.job_dir(job_id)) != []
+
+    def test_cancel_queued_job(self, job_store):
+        job_id = _submit("a.mp3").json()["job_id"]
+        assert client.delete(f"/api/jobs/{job_id}").json()["status"] == "cancelled"
+        assert job_store.claim("test:1") is None
+
+    def test_cancel_running_job_sets_flag(self, job_store):
+        job_id = _submit("a.mp3").json()["job_id"]
+        job_store.claim("test:1")
+        assert client.delete(f"/api/jobs/{job_id}").json()["status"] == "running"
+        assert job_store.cancel_requested(job_id)
+
+    def test_orphaned_running_jobs_requeued(self, job_store):
+        from backend.main import _worker_name
+
+        host, pid, started = _worker_name().rsplit(":", 2)
+        ids = [job_store.create("transcribe", {"files": []}) for _ in range(5)]
+        job_store.claim(f"{host}:999999999:{started}")  # dead process on this host
+        job_store.claim(_worker_name())  # this very process
+        job_store.claim(f"{host}:{pid}:{int(started) - 60}")  # restarted, same PID
+        job_store.claim("elsewhere:1:1")  # other host, fresh lease
+        job_store.claim("elsewhere:2:1")  # other host, expired lease
+        _expire_lease(job_store, ids[4])
+        job_store.requeue_orphans(lease=60)
+        assert [job_store.get(i)["status"] for i in ids] == [
+            "queued", "running", "queued", "running", "queued",
+        ]
+
+    def test_unknown_status_rejected(self, job_store):
+        job_id = job_store.create("transcribe", {"files": []})
+        with pytest.raises(ValueError):
+            job_store.update(job_id, status="finished")
+        assert job_store.get(job_id)["status"] == "queued"
+
+    def test_heartbeat_renews_lease(self, job_store):
+        job_id = job_store.create("transcribe", {"files": []})
+        job_store.claim("elsewhere:1")
+        _expire_lease(job_store, job_id)
+        job_store.heartbeat(job_id)
+        job_store.requeue_orphans(lease=60)
+        assert job_store.get(job_id)["status"] == "running"
+
+    def test_job_survives_new_store_instance(self, job_store, tmp_path):
+        job_id = job_store.create("transcribe", {"files": []})
+        reopened = JobStore(str(tmp_path / "jobs.db"), str(tmp_path / "jobs"))
+        assert reopened.get(job_id)["status"] == "queued"
+
+    def test_events_scoped_to_job(self):
+        mgr = ConnectionManager()
+        everything, mine, other = (
+            ClientChannel(AsyncMock()), ClientChannel(AsyncMock(), {"job-1"}),
+            ClientChannel(AsyncMock(), {"job-2"}),
+        )
+        for channel in (everything, mine, other):
+            mgr.channels[channel.ws] = channel
+
+        async def emit():
+            token = current_job_id.set("job-1")
+            try:
+                await send_log("hello")
+            finally:
+                current_job_id.reset(token)
+
+        with patch("backend.main.manager", mgr):
+            asyncio.run(emit())
+        assert everything.pending[0]["job_id"] == "job-1"
+        assert len(mine.pending) == 1
+        assert len(other.pending) == 0
+
+
+# ──────────────────── WebSocket channels ──────────────────
+
+class TestClientChannel:
+    def test_progress_is_coalesced_per_job(self):
+        channel = ClientChannel(AsyncMock())
+        for i in range(100):
+            channel.push({"type": "progress", "job_id": "a", "current": i})
+        channel.push({"type": "progress", "job_id": "b", "current": 7})
+        assert len(channel.pending) == 0
+        assert channel.progress["a"]["current"] == 99
+        assert channel.progress["b"]["current"] == 7
+
+    def test_full_queue_drops_oldest_and_reports_it(self):
+        ws = AsyncMock()
+        channel = ClientChannel(ws, max_pending=3)
+        for i in range(5):
+            channel.push({"type": "log", "message": str(i)})
+
+        async def drain():
+            task = asyncio.create_task(channel.run())
+            await asyncio.sleep(0.01)
+            task.cancel()
+
+        asyncio.run(drain())
+        sent = [c.args[0]["message"] for c in ws.send_json.await_args_list]
+        assert "2 log line(s) skipped" in sent[0]
+        assert sent[1:] == ["2", "3", "4"]
+
+    def test_subscribe_messages(self):
+        mgr = ConnectionManager()
+        channel = ClientChannel(AsyncMock())
+        mgr.channels[channel.ws] = channel
+        assert channel.wants("anything")
+
+        mgr.handle_message(channel.ws, '{"type": "subscribe", "job_id": "mine"}')
+        assert channel.wants("mine")
+        assert not channel.wants("theirs")
+        assert not channel.wants(None)
+
+        mgr.handle_message(channel.ws, "not json")
+        mgr.handle_message(channel.ws, '{"type": "unsubscribe", "job_id": "mine"}')
+        assert not channel.wants("mine")
+
+    def test_slow_client_does_not_block_others(self):
+        mgr = ConnectionManager()
+        stuck_ws, fast_ws = AsyncMock(), AsyncMock()
+
+        async def hang(message):
+            await asyncio.sleep(3600)
+
+        stuck_ws.send_json.side_effect = hang
+
+        async def run():
+            await mgr.connect(stuck_ws)
+            await mgr.connect(fast_ws)
+            for i in range(10):
+                await mgr.broadcast({"type": "log", "message": str(i)})
+            await asyncio.sleep(0.05)
+            for ws in (stuck_ws, fast_ws):
+                mgr.disconnect(ws)
+
+        asyncio.run(run())
+        assert fast_ws.send_json.await_count == 10
+        assert stuck_ws.send_json.await_count == 1
+
+    def test_request_header_tags_events(self, tmp_path, monkeypatch):
+        # Private queue so no other test's worker picks the job up
+        monkeypatch.setattr(
+            "backend.main.job_store",
+            JobStore(str(tmp_path / "jobs.db"), str(tmp_path / "jobs")),
+        )
+        with patch("backend.main.manager.broadcast", new_callable=AsyncMock) as bcast:
+            resp = client.post(
+                "/api/jobs",
+                files={"files": ("a.mp3", b"x", "audio/mpeg")},
+                headers={"X-Job-Id": "tab-1"},
+            )
+        assert resp.status_code == 200
+        assert bcast.await_args.args[0]["job_id"] == "tab-1"
+
+
+# ──────────────────── Diarization sessions ────────────────
+
+class TestDiarizationSessions:
+    @pytest.fixture
+    def store(self, tmp_path, monkeypatch):
+        store = SQLiteSessionStore(
+            str(tmp_path / "sessions.db"), str(tmp_path / "audio"), ttl=60, max_mb=1,
+        )
+        monkeypatch.setattr("backend.main.session_store", store)
+        return store
+
+    def test_roundtrip_memory_maps_audio(self, store):
+        import numpy as np
+        audio = np.linspace(-1, 1, 16000, dtype=np.float32)
+        store.create("s1", audio, ["SPEAKER_00"], [(0.0, 1.0, "SPEAKER_00")], "a.wav")
+        session = store.get("s1")
+        assert isinstance(session["audio"], np.memmap)
+        assert np.array_equal(session["audio"], audio)
+        assert session["segments"] == [[0.0, 1.0, "SPEAKER_00"]]
+        assert session["whisper_key"] is None
+
+    def test_visible_from_another_store_instance(self, store):
+        import numpy as np
+        store.create("s1", np.zeros(10, dtype=np.float32), [], [], "a.wav")
+        other = SQLiteSessionStore(store.db_path, store.sessions_dir)
+        assert other.get("s1")["filename"] == "a.wav"
+
+    def test_whisper_segments_are_persisted(self, store):
+        import numpy as np
+        store.create("s1", np.zeros(10, dtype=np.float32), [], [], "a.wav")
+        store.set_whisper("s1", ["tiny", "en", "en", False, False], [{"start": 0, "end": 1, "text": "Hi"}])
+        session = store.get("s1")
+        assert session["whisper_key"] == ["tiny", "en", "en", False, False]
+        assert session["whisper_segments"][0]["text"] == "Hi"
+
+    def test_reap_removes_expired_sessions_and_files(self, store):
+        import time
+        import numpy as np
+        store.create("s1", np.zeros(10, dtype=np.float32), [], [], "a.wav")
+        store.ttl = 0
+        time.sleep(0.01)
+        assert store.get("s1") is None
+        assert store.reap() == 1
+        assert os.listdir(store.sessions_dir) == []
+
+    def test_disk_quota_evicts_least_recently_used(self, store):
+        import numpy as np
+        chunk = np.zeros(100_000, dtype=np.float32)  # ~400 KB each, quota 1 MB
+        store.create("a", chunk, [], [], "a.wav")
+        store.create("b", chunk, [], [], "b.wav")
+        store.get("a")  # b becomes least recently used
+        store.create("c", chunk, [], [], "c.wav")
+        assert store.get("b") is None
+        assert store.get("a") is not None and store.get("c") is not None
+        assert sorted(os.listdir(store.sessions_dir)) == ["a.npy", "c.npy"]
+
+    def test_transcribe_diarized_reuses_session_audio(self, store):
+        import numpy as np
+        store.create(
+            "s1", np.zeros(32000, dtype=np.float32), ["SPEAKER_00"],
+            [(0.0, 2.0, "SPEAKER_00")], "talk.wav",
+        )
+        seen = {}
+
+        def fake_segments(model, audio, *args, **kwargs):
+            seen["audio"] = audio
+            return [{"start": 0.0, "end": 1.0, "text": "Hi"}]
+
+        with patch("backend.main.load_model", new_callable=AsyncMock), \
+             patch("backend.main._transcribe_segments_sync", side_effect=fake_segments):
+            resp = client.post("/api/transcribe-diarized", data={
+                "session_id": "s1", "speaker_names": '{"SPEAKER_00": "Ann"}',
+            })
+
+        assert resp.status_code == 200
+        assert "[Ann]: Hi" in resp.text
+        assert isinstance(seen["audio"], np.memmap)
+        assert store.get("s1") is None
+        assert os.listdir(store.sessions_dir) == []
+
+    def test_stored_whisper_pass_skips_transcription(self, store):
+        import numpy as np
+        store.create(
+            "s1", np.zeros(10, dtype=np.float32), ["SPEAKER_00"],
+            [(0.0, 2.0, "SPEAKER_00")], "talk.wav",
+        )
+        store.set_whisper("s1", ["tiny", "en", "en", False, False],
+                          [{"start": 0.0, "end": 1.0, "text": "Hi"}])
+        with patch("backend.main._transcribe_segments_sync") as mock_sync:
+            resp = client.post("/api/transcribe-diarized", data={
+                "session_id": "s1", "model_name": "tiny",
+                "audio_lang": "en", "target_lang": "en",
+            })
+        assert resp.status_code == 200
+        assert "[SPEAKER_00]: Hi" in resp.text
+        mock_sync.assert_not_called()
+
+    def test_combined_mode_runs_whisper_alongside_diarization(self, store, monkeypatch):
+        import threading
+        import numpy as np
+        monkeypatch.setattr("backend.main.HF_TOKEN", "hf_test")
+        whisper_started = threading.Event()
+        calls = {"whisper": 0}
+
+        def fake_segments(model, audio, *args, **kwargs):
+            calls["whisper"] += 1
+            calls["word_timestamps"] = kwargs["word_timestamps"]
+            whisper_started.set()
+            return [{"start": 0.0, "end": 1.0, "text": "Hi"}]
+
+        def fake_diarization(pipeline, audio):
+            # Only completes if Whisper is running at the same time
+            assert whisper_started.wait(timeout=5)
+            return ["SPEAKER_00"], [(0.0, 2.0, "SPEAKER_00")]
+
+        with patch("backend.main.decode_upload", new_callable=AsyncMock,
+                   return_value=np.zeros(16000, dtype=np.float32)), \
+             patch("backend.main._load_diarization_pipeline"), \
+             patch("backend.main._run_diarization_sync", side_effect=fake_diarization), \
+             patch("backend.main.load_model", new_callable=AsyncMock), \
+             patch("backend.main._transcribe_segments_sync", side_effect=fake_segments), \
+             TestClient(app) as tc:
+            resp = tc.post(
+                "/api/diarize",
+                files={"file": ("talk.wav", b"x", "audio/wav")},
+                data={"transcribe": "true", "model_name": "tiny",
+                      "audio_lang": "en", "target_lang": "en"},
+            )
+            assert resp.status_code == 200
+            assert resp.json()["transcribing"] is True
+
+            resp = tc.post("/api/transcribe-diarized", data={
+                "session_id": resp.json()["session_id"], "model_name": "tiny",
+                "audio_lang": "en", "target_lang": "en",
+                "speaker_names": '{"SPEAKER_00": "Ann"}',
+            })
+
+        assert resp.status_code == 200
+        assert "[Ann]: Hi" in resp.text
+        assert calls == {"whisper": 1, "word_timestamps": False}
+
+    def test_word_timestamps_only_when_splitting_words(self, store):
+        import numpy as np
+        store.create(
+            "s1", np.zeros(10, dtype=np.float32), ["SPEAKER_00"],
+            [(0.0, 2.0, "SPEAKER_00")], "talk.wav",
+        )
+        store.set_whisper("s1", ["tiny", "en", "en", False, False],
+                          [{"start": 0.0, "end": 1.0, "text": "Hi"}])
+        with patch("backend.main.load_model", new_callable=AsyncMock), \
+             patch("backend.main._transcribe_segments_sync",
+                   return_value=[{"start": 0.0, "end": 1.0, "text": "Hi"}]) as mock_sync:
+            resp = client.post("/api/transcribe-diarized", data={
+                "session_id": "s1", "model_name": "tiny",
+                "audio_lang": "en", "target_lang": "en", "split_words": "true",
+            })
+        assert resp.status_code == 200
+        # The stored pass has no word timings, so it cannot be reused here
+        assert mock_sync.call_args.kwargs["word_timestamps"] is True
+
+    def test_word_timed_pass_serves_plain_merge(self, store):
+        import numpy as np
+        store.create(
+            "s1", np.zeros(10, dtype=np.float32), ["SPEAKER_00"],
+            [(0.0, 2.0, "SPEAKER_00")], "talk.wav",
+        )
+        store.set_whisper("s1", ["tiny", "en", "en", False, True],
+                          [{"start": 0.0, "end": 1.0, "text": "Hi"}])
+        with patch("backend.main._transcribe_segments_sync") as mock_sync:
+            resp = client.post("/api/transcribe-diarized", data={
+                "session_id": "s1", "model_name": "tiny",
+                "audio_lang": "en", "target_lang": "en",
+            })
+        assert resp.status_code == 200
+        mock_sync.assert_not_called()
+
+    def test_stats_endpoint(self, store):
+        import numpy as np
+        store.create("s1", np.zeros(1024, dtype=np.float32), [], [], "a.wav")
+        resp = client.get("/api/diarization-sessions")
+        assert resp.status_code == 200
+        assert resp.json() == {"sessions": 1, "size_mb": 0.0, "max_mb": 1, "ttl": 60}
+
+    def test_store_interface_is_abstract(self):
+        with pytest.raises(TypeError):
+            SessionStore()
+
+    def test_unknown_session_returns_404(self):
+        resp = client.post("/api/transcribe-diarized", data={"session_id": "nope"})
+        assert resp.status_code == 404
+
+
+# ──────────────────── Speaker assignment ──────────────────
+
+DIAR = [
+    (0.0, 5.0, "SPEAKER_00"),
+    (5.0, 9.0, "SPEAKER_01"),
+    (9.0, 12.0, "SPEAKER_00"),
+]
+
+
+def _brute_force_overlap(start, end, diar):
+    totals = {}
+    for d_start, d_end, speaker in diar:
+        overlap = max(0.0, min(end, d_end) - max(start, d_start))
+        totals[speaker] = totals.get(speaker, 0.0) + overlap
+    return totals
+
+
+class TestSpeakerAssignment:
+    def test_matches_brute_force_overlap(self):
+        import random
+        import numpy as np
+        rng = random.Random(0)
+        diar, t = [], 0.0
+        for _ in range(200):
+            length = rng.uniform(0.2, 5.0)
+            diar.append((t, t + length, f"SPEAKER_0{rng.randrange(4)}"))
+            t += length + rng.uniform(0.0, 0.5)
+        starts = [rng.uniform(0, t) for _ in range(300)]
+        ends = [s + rng.uniform(0.1, 8.0) for s in starts]
+
+        speakers, overlaps = speaker_overlaps(starts, ends, diar)
+        for row, (start, end) in enumerate(zip(starts, ends)):
+            expected = _brute_force_overlap(start, end, diar)
+            for k, speaker in enumerate(speakers):
+                assert np.isclose(overlaps[row, k], expected.get(speaker, 0.0))
+
+    def test_overlapping_turns_of_one_speaker_are_not_double_counted(self):
+        _, overlaps = speaker_overlaps([0.0], [10.0], [
+            (0.0, 4.0, "A"), (2.0, 6.0, "A"),
+        ])
+        assert overlaps[0, 0] == 6.0
+
+    def test_assign_speakers_marks_gaps_as_none(self):
+        labels = assign_speakers([1.0, 6.0, 20.0], [2.0, 8.0, 21.0], DIAR)
+        assert labels == ["SPEAKER_00", "SPEAKER_01", None]
+
+    def test_build_srt_uses_names_and_unknown(self):
+        segments = [
+            {"start": 1.0, "end": 2.0, "text": "Hi"},
+            {"start": 20.0, "end": 21.0, "text": "Hm"},
+        ]
+        srt = _build_srt_with_speakers(segments, DIAR, {"SPEAKER_00": "Ann"})
+        assert "[Ann]: Hi" in srt
+        assert "[Unknown]: Hm" in srt
+
+    def test_word_level_split_at_speaker_change(self):
+        segments = [{
+            "start": 3.0, "end": 7.0, "text": "Yes indeed. No way",
+            "words": [
+                {"start": 3.0, "end": 3.5, "word": " Yes"},
+                {"start": 3.6, "end": 4.5, "word": " indeed."},
+                {"start": 5.2, "end": 5.8, "word": " No"},
+                {"start": 6.0, "end": 7.0, "word": " way"},
+            ],
+        }]
+        names = {"SPEAKER_00": "Ann", "SPEAKER_01": "Bob"}
+        srt = _build_srt_with_speakers(segments, DIAR, names, split_words=True)
+        assert srt == (
+            "1\n00:00:03,000 --> 00:00:04,500\n[Ann]: Yes indeed.\n\n"
+            "2\n00:00:05,200 --> 00:00:07,000\n[Bob]: No way\n"
+        )
+
+    def test_word_split_keeps_single_speaker_segment_intact(self):
+        segments = [{
+            "start": 0.5, "end": 2.0, "text": "Hello there",
+            "words": [
+                {"start": 0.5, "end": 1.0, "word": " Hello"},
+                {"start": 1.1, "end": 2.0, "word": " there"},
+            ],
+        }]
+        srt = _build_srt_with_speakers(segments, DIAR, {}, split_words=True)
+        assert srt == "1\n00:00:00,500 --> 00:00:02,000\n[SPEAKER_00]: Hello there\n"
+
+    def test_empty_inputs(self):
+        assert _build_srt_with_speakers([], DIAR, {}) == ""
+        assert assign_speakers([1.0], [2.0], []) == [None]
+
+
+# ──────────────────── Model manager ───────────────────────
+
+class TestModelManager:
+    def test_estimate_scales_with_compute_type(self):
+        assert estimate_model_mb("medium", "float16") == 1550
+        assert estimate_model_mb("medium", "int8") == 775
+        assert estimate_model_mb("unknown-model", "float16") == 1550
+
+    def test_reuses_loaded_model(self):
+        manager = ModelManager(budget_mb=10_000)
+        with patch("backend.main.WhisperModel") as model_cls, \
+             patch("backend.main.send_log", new_callable=AsyncMock):
+            first = asyncio.run(manager.get("tiny"))
+            second = asyncio.run(manager.get("tiny"))
+        assert first is second
+        assert model_cls.call_count == 1
+
+    def test_concurrent_requests_share_one_load(self):
+        manager = ModelManager(budget_mb=10_000)
+
+        async def _run():
+            return await asyncio.gather(*(manager.get("small") for _ in range(5)))
+
+        with patch("backend.main.WhisperModel") as model_cls, \
+             patch("backend.main.send_log", new_callable=AsyncMock):
+            models = asyncio.run(_run())
+        assert model_cls.call_count == 1
+        assert all(m is models[0] for m in models)
+
+    def test_evicts_least_recently_used_over_budget(self):
+        manager = ModelManager(budget_mb=200)
+        with patch("backend.main.WhisperModel"), \
+             patch("backend.main.send_log", new_callable=AsyncMock), \
+             patch("backend.main.estimate_model_mb", return_value=100):
+            asyncio.run(manager.get("tiny"))
+            asyncio.run(manager.get("base"))
+            asyncio.run(manager.get("tiny"))  # base becomes LRU
+            asyncio.run(manager.get("small"))
+        assert list(manager.models) == ["tiny", "small"]
+        assert manager.used_mb == 200
+
+    def test_failed_load_is_not_cached(self):
+        manager = ModelManager(budget_mb=10_000)
+        with patch("backend.main.WhisperModel", side_effect=RuntimeError("no")), \
+             patch("backend.main.send_log", new_callable=AsyncMock):
+            with pytest.raises(RuntimeError):
+                asyncio.run(manager.get("tiny"))
+        assert manager.models == {}
+        assert manager.stats()["loading"] == []
+
+    def test_models_endpoint_reports_and_unloads(self, monkeypatch):
+        manager = ModelManager(budget_mb=10_000)
+        monkeypatch.setattr("backend.main.model_manager", manager)
+        with patch("backend.main.WhisperModel"), \
+             patch("backend.main.send_log", new_callable=AsyncMock):
+            asyncio.run(manager.get("tiny"))
+
+        data = client.get("/api/models").json()
+        assert data["budget_mb"] == 10_000
+        assert [m["name"] for m in data["models"]] == ["tiny"]
+
+        assert client.delete("/api/models/tiny").json()["models"] == []
+        assert client.delete("/api/models/tiny").status_code == 404
+
+
+# ──────────────────── Watch mode ──────────────────────────
+
+class TestWatchMode:
+    def test_media_layout_matches_desktop_batch(self, tmp_path):
+        (tmp_path / "a").mkdir()
+        (tmp_path / "a" / "talk.MP4").write_bytes(b"x")
+        (tmp_path / "notes.txt").write_text("x")
+        files = find_media_files(str(tmp_path))
+        assert files == [str(tmp_path / "a" / "talk.MP4")]
+        assert subtitle_path(files[0], "fr") == str(tmp_path / "a" / "subtitle_fr" / "talk.srt")
+
+    def test_needs_transcription_compares_mtimes(self, tmp_path):
+        media = tmp_path / "a.mp3"
+        media.write_bytes(b"x")
+        assert needs_transcription(str(media), "fr")
+        write_srt(subtitle_path(str(media), "fr"), "SRT")
+        os.utime(media, (1, 1))
+        assert not needs_transcription(str(media), "fr")
+        os.utime(media, None)
+        os.utime(subtitle_path(str(media), "fr"), (1, 1))
+        assert needs_transcription(str(media), "fr")
+
+    def test_growing_file_is_queued_once_it_settles(self, tmp_path):
+        media = tmp_path / "a.mp3"
+        media.write_bytes(b"x")
+
+        async def run():
+            watcher = MediaWatcher(str(tmp_path), "tiny", "en", "fr", settle=0.05)
+            watcher.notice(str(media))
+            watcher.notice(str(media))
+            await asyncio.sleep(0.03)
+            with open(media, "ab") as f:
+                f.write(b"more")
+            await asyncio.sleep(0.06)
+            assert watcher.queue.empty()  # changed since the first look
+            await asyncio.sleep(0.1)
+            return watcher
+
+        watcher = asyncio.run(run())
+        assert watcher.queue.qsize() == 1
+        assert not watcher._settling
+
+    def test_file_overwritten_during_transcription_is_redone(self, tmp_path):
+        media = tmp_path / "a.mp3"
+        media.write_bytes(b"old")
+        seen = []
+
+        async def fake_transcribe(model, path, *args, **kwargs):
+            with open(path, "rb") as f:
+                seen.append(f.read())
+            if len(seen) == 1:
+                media.write_bytes(b"new")  # overwritten mid-run
+                watcher.notice(str(media))
+                await asyncio.sleep(0.1)  # settles before this run ends
+            return "SRT"
+
+        async def run():
+            nonlocal watcher
+            watcher = MediaWatcher(str(tmp_path), "tiny", "en", "fr", settle=0.02)
+            worker = asyncio.create_task(watcher._worker())
+            watcher.notice(str(media))
+            await asyncio.sleep(0.05)
+            await watcher.queue.join()
+            worker.cancel()
+
+        watcher = None
+        with patch("backend.watch.load_model", new_callable=AsyncMock), \
+             patch("backend.watch.transcribe_file", side_effect=fake_transcribe), \
+             patch("backend.watch.send_log", new_callable=AsyncMock):
+            asyncio.run(run())
+        assert seen == [b"old", b"new"]
+        assert watcher.done == 2
+
+    def test_worker_writes_srt_next_to_media(self, tmp_path):
+        media = tmp_path / "a.mp3"
+        media.write_bytes(b"x")
+
+        async def run():
+            watcher = MediaWatcher(str(tmp_path), "tiny", "en", "fr")
+            await watcher._transcribe(str(media))
+            return watcher
+
+        with patch("backend.watch.load_model", new_callable=AsyncMock), \
+             patch("backend.watch.transcribe_file", new_callable=AsyncMock,
+                   return_value="1\n00:00:00,000 --> 00:00:01,000\nSalut\n"), \
+             patch("backend.watch.send_log", new_callable=AsyncMock):
+            watcher = asyncio.run(run())
+        assert watcher.done == 1
+        assert (tmp_path / "subtitle_fr" / "a.srt").read_text(encoding="utf-8").endswith("Salut\n")
+        assert not (tmp_path / "subtitle_fr" / "a.srt.part").exists()
+
+    def test_sinks_receive_events(self):
+        seen = []
+        with patch("backend.main.manager.sinks", [seen.append]):
+            asyncio.run(send_log("hello"))
+        assert seen == [{"type": "log", "message": "hello", "color": None}]
+
+
+# ──────────────────── CLI ─────────────────────────────────
+
+class TestCli:
+    @pytest.fixture
+    def archive(self, tmp_path):
+        (tmp_path / "day1").mkdir()
+        for name in ("day1/a.mp3", "day1/b.wav", "c.mp4"):
+            (tmp_path / name).write_bytes(b"x")
+        (tmp_path / "readme.txt").write_text("x")
+        return tmp_path
+
+    def test_collect_media_expands_folders(self, archive):
+        files, problems = collect_media([str(archive), str(archive / "c.mp4")])
+        assert [os.path.relpath(f, archive) for f in files] == [
+            "c.mp4", os.path.join("day1", "a.mp3"), os.path.join("day1", "b.wav"),
+        ]
+        assert problems == []
+
+    def test_bad_paths_are_reported_as_usage_errors(self, archive, capsys):
+        transcribe = AsyncMock(return_value="SRT")
+        with patch("backend.cli.transcribe_file", transcribe):
+            code = cli_main([str(archive / "c.mp4"), str(archive / "readme.txt"),
+                             str(archive / "missing.mp3"), "--workers", "1"])
+        assert code == 2
+        transcribe.assert_not_awaited()
+        assert capsys.readouterr().err.splitlines() == [
+            f"Not a supported media file: {archive / 'readme.txt'}",
+            f"No such file or directory: {archive / 'missing.mp3'}",
+        ]
+
+    def test_transcribes_in_place_with_json_events(self, archive, capsys):
+        async def fake_transcribe(model, path, *args, **kwargs):
+            if path.endswith("b.wav"):
+                raise RuntimeError("corrupt")
+            return "SRT " + os.path.basename(path)
+
+        with patch("backend.cli.load_model", new_callable=AsyncMock), \
+             patch("backend.cli.transcribe_file", side_effect=fake_transcribe):
+            code = cli_main([str(archive), "--model", "tiny", "--json", "--workers", "1"])
+
+        import json
+        events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        files = {os.path.basename(e["path"]): e for e in events if e["type"] == "file"}
+        assert code == 1
+        assert files["b.wav"]["status"] == "failed"
+        assert files["b.wav"]["error"] == "corrupt"
+        assert files["a.mp3"]["output"] == str(archive / "day1" / "subtitle_fr" / "a.srt")
+        assert (archive / "day1" / "subtitle_fr" / "a.srt").read_text(encoding="utf-8") == "SRT a.mp3"
+        assert events[-1] == {"type": "summary", "done": 2, "failed": 1, "skipped": 0}
+        assert any(e["type"] == "log" for e in events)
+
+    def test_skip_existing(self, archive, capsys):
+        for media in collect_media([str(archive)])[0]:
+            write_srt(subtitle_path(media, "fr"), "old")
+        for media in ("day1/a.mp3", "day1/b.wav"):
+            os.utime(archive / media, (1, 1))
+        os.utime(archive / "subtitle_fr" / "c.srt", (1, 1))  # older than c.mp4
+        transcribe = AsyncMock(return_value="new")
+        with patch("backend.cli.load_model", new_callable=AsyncMock), \
+             patch("backend.cli.transcribe_file", transcribe):
+            code = cli_main([str(archive), "--skip-existing", "--workers", "1"])
+        assert code == 0
+        assert transcribe.await_count == 1
+        assert (archive / "subtitle_fr" / "c.srt").read_text(encoding="utf-8") == "new"
+        assert "1 ok, 0 failed, 2 skipped" in capsys.readouterr().out
+
+    def test_no_media_is_a_usage_error(self, tmp_path):
+        assert cli_main([str(tmp_path)]) == 2
+
 
 # ──────────────────── Constants ───────────────────────────
 
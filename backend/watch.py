@@ -0,0 +1,213 @@
+"""Watch a folder and transcribe media as it arrives.
+
+    python -m backend.watch /srv/ingest --target-lang fr --workers 2
+
+A new or modified file is transcribed once it has stopped changing for
+--settle seconds, and its SRT is written to subtitle_<lang>/ next to it,
+the same layout as the desktop batch. Files whose SRT is already newer
+than the media are skipped, so a restarted watcher only picks up what is
+missing.
+"""
+
+import os
+import asyncio
+import argparse
+
+from watchfiles import Change, awatch
+
+from backend.main import (
+    BATCH_WORKERS,
+    SUPPORTED_EXTENSIONS,
+    WHISPER_BATCHED,
+    WHISPER_MODELS,
+    _pool_transcribe,
+    find_media_files,
+    load_model,
+    manager,
+    process_pool,
+    resolve_batch_size,
+    send_log,
+    shutdown_process_pool,
+    subtitle_path,
+    transcribe_file,
+    write_srt,
+)
+
+WATCH_SETTLE_SECONDS = float(os.environ.get("WATCH_SETTLE_SECONDS", "5"))
+
+
+def is_media(path: str) -> bool:
+    return path.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def _media_filter(change: Change, path: str) -> bool:
+    return change != Change.deleted and is_media(path)
+
+
+def _stat(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def needs_transcription(path: str, target_lang: str) -> bool:
+    """True unless the file's SRT exists and is newer than the media."""
+    try:
+        media_mtime = os.path.getmtime(path)
+    except OSError:
+        return False
+    try:
+        return os.path.getmtime(subtitle_path(path, target_lang)) < media_mtime
+    except OSError:
+        return True
+
+
+class MediaWatcher:
+    """Debounce file events and feed settled media to a bounded set of workers."""
+
+    def __init__(self, root: str, model_name: str, audio_lang: str, target_lang: str,
+                 workers: int = 1, batch_size: int = 0,
+                 settle: float = WATCH_SETTLE_SECONDS):
+        self.root = root
+        self.model_name = model_name
+        self.audio_lang = audio_lang
+        self.target_lang = target_lang
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.settle = settle
+        self.queue: asyncio.Queue[str] = asyncio.Queue()
+        self.done = 0
+        self.failed = 0
+        self._settling: dict[str, asyncio.TimerHandle] = {}
+        self._queued: set[str] = set()  # waiting in the queue
+        self._running: set[str] = set()
+        self._dirty: set[str] = set()  # changed while being transcribed
+
+    def notice(self, path: str):
+        """(Re)start the settle timer of a created or modified file."""
+        if not is_media(path):
+            return
+        handle = self._settling.pop(path, None)
+        if handle is not None:
+            handle.cancel()
+        self._arm(path, _stat(path))
+
+    def _arm(self, path: str, seen: tuple[int, int] | None):
+        self._settling[path] = asyncio.get_running_loop().call_later(
+            self.settle, self._settled, path, seen,
+        )
+
+    def _settled(self, path: str, seen: tuple[int, int] | None):
+        del self._settling[path]
+        current = _stat(path)
+        if current is None:
+            return  # deleted or moved away meanwhile
+        if current != seen:
+            self._arm(path, current)  # still being written
+            return
+        if path in self._running:
+            # The run in progress may have read the old content; its SRT
+            # will be newer than the media, so re-queue without checking.
+            self._dirty.add(path)
+        elif path not in self._queued and needs_transcription(path, self.target_lang):
+            self._enqueue(path)
+
+    def _enqueue(self, path: str):
+        self._queued.add(path)
+        self.queue.put_nowait(path)
+
+    async def _transcribe(self, path: str):
+        name = os.path.basename(path)
+        await send_log(f"Processing: {name}")
+        try:
+            if self.workers > 1:
+                with process_pool(self.model_name, self.workers) as pool:
+                    srt = await asyncio.get_running_loop().run_in_executor(
+                        pool, _pool_transcribe,
+                        path, self.audio_lang, self.target_lang, self.batch_size,
+                    )
+            else:
+                model = await load_model(self.model_name)
+                srt = await transcribe_file(
+                    model, path, self.audio_lang, self.target_lang,
+                    batch_size=self.batch_size, model_name=self.model_name,
+                )
+            output = subtitle_path(path, self.target_lang)
+            await asyncio.to_thread(write_srt, output, srt)
+            self.done += 1
+            await send_log(f"SRT saved: {output}", color="green")
+        except Exception as e:
+            self.failed += 1
+            await send_log(f"Error for {name}: {e}", color="red")
+
+    async def _worker(self):
+        while True:
+            path = await self.queue.get()
+            self._queued.discard(path)
+            self._running.add(path)
+            try:
+                await self._transcribe(path)
+            finally:
+                self._running.discard(path)
+                if path in self._dirty:
+                    self._dirty.discard(path)
+                    if path not in self._queued and _stat(path) is not None:
+                        self._enqueue(path)
+                self.queue.task_done()
+
+    async def run(self, stop_event: asyncio.Event | None = None):
+        """Pick up existing media, then follow file events until stop_event is set."""
+        for path in await asyncio.to_thread(find_media_files, self.root):
+            self.notice(path)
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        await send_log(f"Watching {self.root} ({self.workers} worker(s))")
+        try:
+            async for changes in awatch(self.root, watch_filter=_media_filter,
+                                        stop_event=stop_event):
+                for _, path in changes:
+                    self.notice(path)
+        finally:
+            for handle in self._settling.values():
+                handle.cancel()
+            for worker in workers:
+                worker.cancel()
+
+
+def _print_log(message: dict):
+    if message.get("type") == "log":
+        print(message["message"], flush=True)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", help="folder to watch (recursively)")
+    parser.add_argument("--model", default="medium", choices=WHISPER_MODELS)
+    parser.add_argument("--audio-lang", default="en")
+    parser.add_argument("--target-lang", default="fr")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS,
+                        help="files transcribed at once (processes when > 1)")
+    parser.add_argument("--batched", action="store_true", default=WHISPER_BATCHED)
+    parser.add_argument("--batch-size", type=int, default=0)
+    parser.add_argument("--settle", type=float, default=WATCH_SETTLE_SECONDS,
+                        help="seconds a file must stay unchanged before it is transcribed")
+    args = parser.parse_args(argv)
+    if not os.path.isdir(args.root):
+        parser.error(f"not a directory: {args.root}")
+
+    manager.sinks.append(_print_log)
+    watcher = MediaWatcher(
+        os.path.abspath(args.root), args.model, args.audio_lang, args.target_lang,
+        args.workers, resolve_batch_size(args.batched, args.batch_size), args.settle,
+    )
+    try:
+        asyncio.run(watcher.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@ import TranscriptionPanel from "./components/TranscriptionPanel";
 import OllamaPanel from "./components/OllamaPanel";
 import LogConsole from "./components/LogConsole";
 import BenchmarkModal from "./components/BenchmarkModal";
+import { CLIENT_ID } from "./constants";
 
 export default function App() {
   const [activeTab, setActiveTab] = useState("transcription");
@@ -33,6 +34,10 @@ export default function App() {
       const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
       const ws = new WebSocket(`${protocol}//${window.location.host}/ws/logs`);
 
+      ws.onopen = () => {
+        ws.send(JSON.stringify({ type: "subscribe", job_id: CLIENT_ID }));
+      };
+
       ws.onmessage = (event) => {
         const data = JSON.parse(event.data);
         if (data.type === "log") {
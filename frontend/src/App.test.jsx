@@ -2,13 +2,17 @@
 import userEvent from "@testing-library/user-event";
 import { describe, it, expect, vi, beforeEach, afterEach } from "vitest";
 import App from "./App";
+import { CLIENT_ID } from "./constants";
 
 // Mock WebSocket
 class MockWebSocket {
   constructor() {
+    this.onopen = null;
     this.onmessage = null;
     this.onclose = null;
+    this.send = vi.fn();
     this.close = vi.fn();
+    MockWebSocket.last = this;
   }
 }
 
@@ -81,4 +85,12 @@ describe("App", () => {
     expect(screen.getByText("Console")).toBeInTheDocument();
     expect(screen.getByText("Waiting...")).toBeInTheDocument();
   });
+
+  it("subscribes to its own events when the socket opens", () => {
+    render(<App />);
+    MockWebSocket.last.onopen();
+    expect(MockWebSocket.last.send).toHaveBeenCalledWith(
+      JSON.stringify({ type: "subscribe", job_id: CLIENT_ID })
+    );
+  });
 });
@@ -1,5 +1,33 @@
 import { useState, useRef, useCallback } from "react";
-import { LANGUAGES, LANG_KEYS } from "../constants";
+import { LANGUAGES, LANG_KEYS, JOB_HEADERS } from "../constants";
+
+// The backend ends a stream that hit an error with a NUL byte and a message.
+const STREAM_ERROR_MARKER = "\u0000";
+
+function splitStreamError(text) {
+  const at = text.indexOf(STREAM_ERROR_MARKER);
+  return at < 0 ? [text, null] : [text.slice(0, at), text.slice(at + 1)];
+}
+
+async function readStream(resp, onText) {
+  if (!resp.body?.getReader) {
+    const text = await resp.text();
+    onText(text);
+    return text;
+  }
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let text = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    text += decoder.decode(value, { stream: true });
+    onText(text);
+  }
+  text += decoder.decode();
+  onText(text);
+  return text;
+}
 
 export default function OllamaPanel({ addLog }) {
   const [subTab, setSubTab] = useState("srt");
@@ -51,6 +79,7 @@ export default function OllamaPanel({ addLog }) {
     formData.append("file", file);
     formData.append("source_lang", LANGUAGES[sourceLang]);
     formData.append("target_lang", LANGUAGES[targetLang]);
+    formData.append("stream", "true");
 
     const url =
       subTab === "srt"
@@ -58,11 +87,12 @@ export default function OllamaPanel({ addLog }) {
         : "/api/ollama/translate-text";
 
     try {
-      const resp = await fetch(url, { method: "POST", body: formData });
+      const resp = await fetch(url, { method: "POST", body: formData, headers: JOB_HEADERS });
       if (!resp.ok) throw new Error(await resp.text());
-      const text = await resp.text();
-      setResult(text);
-      addLog("Ollama translation complete", "green");
+      const text = await readStream(resp, (t) => setResult(splitStreamError(t)[0]));
+      const [, error] = splitStreamError(text);
+      if (error) addLog(`Ollama translation incomplete: ${error}`, "red");
+      else addLog("Ollama translation complete", "green");
     } catch (err) {
       addLog(`Ollama error: ${err.message}`, "red");
     } finally {
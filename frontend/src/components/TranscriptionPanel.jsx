@@ -1,5 +1,5 @@
 import { useState, useRef, useCallback } from "react";
-import { LANGUAGES, LANG_KEYS } from "../constants";
+import { LANGUAGES, LANG_KEYS, JOB_HEADERS } from "../constants";
 import ProgressBar from "./ProgressBar";
 
 const MODELS = ["tiny", "base", "small", "medium", "large", "large-v2"];
@@ -7,6 +7,27 @@ const ACCEPT = ".mp4,.mp3,.wav,.m4a,.flac,.ogg,.webm";
 const ACCEPT_EXTS = ACCEPT.split(",");
 const hintStyle = { fontSize: "0.8rem", marginTop: 4 };
 
+// Calls onLine for each complete line of a streamed (NDJSON) response
+async function readLines(resp, onLine) {
+  if (!resp.body?.getReader) {
+    (await resp.text()).split("\n").filter(Boolean).forEach(onLine);
+    return;
+  }
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.filter(Boolean).forEach(onLine);
+  }
+  buffer += decoder.decode();
+  if (buffer) onLine(buffer);
+}
+
 export default function TranscriptionPanel({ addLog, setProgress, progress }) {
   const [files, setFiles] = useState([]);
   const [model, setModel] = useState("medium");
@@ -58,9 +79,15 @@ export default function TranscriptionPanel({ addLog, setProgress, progress }) {
     setDiarResult(null);
     setSpeakerNames({});
     try {
+      const audioCode = LANGUAGES[audioLang];
       const fd = new FormData();
       fd.append("file", files[0].file);
-      const resp = await fetch("/api/diarize", { method: "POST", body: fd });
+      // Start the Whisper pass alongside diarization; naming speakers reuses it
+      fd.append("transcribe", "true");
+      fd.append("model_name", model);
+      fd.append("audio_lang", audioCode);
+      fd.append("target_lang", transcribeOnly ? audioCode : LANGUAGES[targetLang]);
+      const resp = await fetch("/api/diarize", { method: "POST", body: fd, headers: JOB_HEADERS });
       if (!resp.ok) throw new Error(await resp.text());
       const data = await resp.json();
       setDiarResult(data);
@@ -94,7 +121,7 @@ export default function TranscriptionPanel({ addLog, setProgress, progress }) {
         fd.append("audio_lang", audioCode);
         fd.append("target_lang", targetCode);
         fd.append("speaker_names", JSON.stringify(speakerNames));
-        const resp = await fetch("/api/transcribe-diarized", { method: "POST", body: fd });
+        const resp = await fetch("/api/transcribe-diarized", { method: "POST", body: fd, headers: JOB_HEADERS });
         if (!resp.ok) throw new Error(await resp.text());
         const srt = await resp.text();
         const name = rawFiles[0].name.replace(/\.[^.]+$/, ".srt");
@@ -111,7 +138,7 @@ export default function TranscriptionPanel({ addLog, setProgress, progress }) {
           singleForm.append("model_name", model);
           singleForm.append("audio_lang", audioCode);
           singleForm.append("target_lang", targetCode);
-          const resp = await fetch(url, { method: "POST", body: singleForm });
+          const resp = await fetch(url, { method: "POST", body: singleForm, headers: JOB_HEADERS });
           if (!resp.ok) throw new Error(await resp.text());
           const srt = await resp.text();
           const name = rawFiles[0].name.replace(/\.[^.]+$/, ".srt");
@@ -122,10 +149,20 @@ export default function TranscriptionPanel({ addLog, setProgress, progress }) {
           formData.append("model_name", model);
           formData.append("audio_lang", audioCode);
           formData.append("target_lang", targetCode);
-          const resp = await fetch(url, { method: "POST", body: formData });
+          formData.append("output", "ndjson");
+          const resp = await fetch(url, { method: "POST", body: formData, headers: JOB_HEADERS });
           if (!resp.ok) throw new Error(await resp.text());
-          const data = await resp.json();
-          setResults(data);
+          const data = {};
+          await readLines(resp, (line) => {
+            const item = JSON.parse(line);
+            if (item.error) {
+              addLog(`Error ${item.source}: ${item.error}`, "red");
+              return;
+            }
+            data[item.file] = item.srt;
+            setResults({ ...data });
+          });
+          setResults({ ...data });
         }
       }
 
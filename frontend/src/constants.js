@@ -9,3 +9,16 @@ export const LANGUAGES = {
 };
 
 export const LANG_KEYS = Object.keys(LANGUAGES);
+
+// crypto.randomUUID only exists in secure contexts (HTTPS or localhost);
+// the UI is also opened over plain HTTP by LAN IP.
+export function makeClientId() {
+  return (
+    globalThis.crypto?.randomUUID?.() ??
+    Math.random().toString(36).slice(2) + Date.now().toString(36)
+  );
+}
+
+// Tags this tab's requests (X-Job-Id) so /ws/logs only sends it its own events
+export const CLIENT_ID = makeClientId();
+export const JOB_HEADERS = { "X-Job-Id": CLIENT_ID };
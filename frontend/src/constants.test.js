@@ -0,0 +1,22 @@
+import { describe, it, expect, vi, afterEach } from "vitest";
+
+describe("constants", () => {
+  afterEach(() => {
+    vi.unstubAllGlobals();
+    vi.resetModules();
+  });
+
+  it("uses crypto.randomUUID when available", async () => {
+    vi.stubGlobal("crypto", { randomUUID: () => "uuid-1" });
+    const { CLIENT_ID, JOB_HEADERS } = await import("./constants");
+    expect(CLIENT_ID).toBe("uuid-1");
+    expect(JOB_HEADERS).toEqual({ "X-Job-Id": "uuid-1" });
+  });
+
+  it("falls back outside secure contexts", async () => {
+    vi.stubGlobal("crypto", { randomUUID: undefined });
+    const { CLIENT_ID, makeClientId } = await import("./constants");
+    expect(CLIENT_ID).toMatch(/^[a-z0-9]{8,}$/);
+    expect(makeClientId()).not.toBe(makeClientId());
+  });
+});
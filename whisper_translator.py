@@ -1,9 +1,13 @@
 import os
+import re
 import json
 import queue
 import shutil
 import threading
 import traceback
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
@@ -11,6 +15,25 @@ import requests
 from faster_whisper import WhisperModel
 
 
+# ──────────────────── Batch worker processes ──────────────────
+# Module-level so they can be pickled into spawned worker processes.
+
+_worker_model = None
+
+
+def _worker_init(model_name, cpu_threads):
+    global _worker_model
+    _worker_model = WhisperModel(model_name, device="cpu", compute_type="int8",
+                                 cpu_threads=cpu_threads, num_workers=1)
+
+
+def _worker_transcribe(file_path, output_path, audio_code, target_code):
+    WhisperTranslatorApp._transcribe_to_srt(_worker_model, file_path,
+                                            output_path, audio_code,
+                                            target_code)
+    return output_path
+
+
 class WhisperTranslatorApp:
     """Tkinter application for audio/video transcription and translation."""
 
@@ -40,6 +63,14 @@ class WhisperTranslatorApp:
 
     OLLAMA_URL = "http://localhost:11434/api/generate"
     OLLAMA_MODEL = "mistral"
+    OLLAMA_BATCH_SIZE = 10
+    OLLAMA_BATCH_TOKENS = 1500
+    OLLAMA_CONCURRENCY = 4
+    TEXT_CHUNK_TOKENS = 1000
+    TEXT_CHUNK_OVERLAP = 0  # sentences of the previous chunk sent as context
+    BATCH_WORKERS = 1  # processes for batch transcription, each with its own model
+    MAX_LOADED_MODELS = 1  # Whisper models kept in memory between runs
+    MANIFEST_NAME = ".whisper_manifest_{}.json"  # per target language
 
     # Dark theme colors
     BG_DARK = "#1e1e1e"
@@ -59,11 +90,15 @@ class WhisperTranslatorApp:
         self.root.configure(bg=self.BG_DARK)
 
         self._msg_queue = queue.Queue()
+        self._models = OrderedDict()
+        self._models_lock = threading.Lock()
 
         self.dossier_var = tk.StringVar()
         self.model_var = tk.StringVar(value="medium")
         self.language_var = tk.StringVar(value="Francais")
         self.audio_lang_var = tk.StringVar(value="Anglais")
+        self.workers_var = tk.IntVar(value=self.BATCH_WORKERS)
+        self.incremental_var = tk.BooleanVar(value=True)
         self.progress_var = tk.DoubleVar()
 
         style = ttk.Style()
@@ -100,6 +135,16 @@ class WhisperTranslatorApp:
                      fg="white").grid(row=0, column=i * 2, padx=5)
             ttk.Combobox(frame_choix, textvariable=var, values=vals,
                          width=15).grid(row=0, column=i * 2 + 1, padx=5)
+        tk.Label(frame_choix, text="Processus :", bg=self.BG_DARK,
+                 fg="white").grid(row=0, column=6, padx=5)
+        tk.Spinbox(frame_choix, textvariable=self.workers_var, from_=1,
+                   to=os.cpu_count() or 1, width=4).grid(row=0, column=7,
+                                                         padx=5)
+
+        tk.Checkbutton(self.root, text="Ignorer les fichiers deja traites",
+                       variable=self.incremental_var, bg=self.BG_DARK,
+                       fg="white", selectcolor=self.BG_WIDGET,
+                       activebackground=self.BG_DARK).pack()
 
         tk.Button(self.root, text="Lancer la traduction batch",
                   command=self._on_batch_transcribe, bg=self.ACCENT_BLUE,
@@ -197,14 +242,12 @@ class WhisperTranslatorApp:
                     results.append((os.path.join(dirpath, fname), dirpath, fname))
         return results
 
-    def _call_ollama(self, text, source_lang="en", target_lang="fr"):
+    def _target_name(self, target_lang):
         target_names = {v: k for k, v in self.LANG_CODES.items()}
-        target_name = target_names.get(target_lang, target_lang)
+        return target_names.get(target_lang, target_lang)
 
-        prompt = (
-            f"Traduis en {target_name} ce texte de sous-titre "
-            f"sans modifier le style ni le decoupage :\n\n\"{text}\""
-        )
+    def _ollama_generate(self, prompt):
+        """Send a prompt to Ollama. Returns None if the request failed."""
         payload = {
             "model": self.OLLAMA_MODEL,
             "prompt": prompt,
@@ -214,15 +257,174 @@ class WhisperTranslatorApp:
             response = requests.post(self.OLLAMA_URL, json=payload, timeout=120)
             response.raise_for_status()
             data = response.json()
-            return data.get("response", text).strip()
+            result = data.get("response")
+            return result.strip() if result is not None else None
         except requests.RequestException as e:
             self._log_message(f"Erreur Ollama : {e}", color="orange")
-            return text
+            return None
+
+    def _call_ollama(self, text, source_lang="en", target_lang="fr",
+                     context=""):
+        prompt = (
+            f"Traduis en {self._target_name(target_lang)} ce texte de sous-titre "
+            f"sans modifier le style ni le decoupage :\n\n\"{text}\""
+        )
+        if context:
+            prompt = (f"Contexte precedent, a ne pas traduire :\n"
+                      f"\"{context}\"\n\n{prompt}")
+        translated = self._ollama_generate(prompt)
+        return translated if translated is not None else text
+
+    def _call_ollama_batch(self, texts, source_lang="en", target_lang="fr"):
+        """Translate several cues with one numbered prompt, falling back to
+        one call per cue if the reply does not contain len(texts) lines."""
+        if len(texts) == 1:
+            return [self._call_ollama(texts[0], source_lang, target_lang)]
+
+        numbered = "\n".join(f"{i}. {t}" for i, t in enumerate(texts, start=1))
+        prompt = (
+            f"Traduis en {self._target_name(target_lang)} ces {len(texts)} "
+            f"lignes de sous-titre numerotees sans modifier le style ni le "
+            f"decoupage. Reponds uniquement avec les {len(texts)} lignes "
+            f"traduites, chacune precedee de son numero :\n\n{numbered}"
+        )
+        reply = self._ollama_generate(prompt)
+        translations = self._parse_numbered_reply(reply or "", len(texts))
+        if translations is None:
+            self._log_message(
+                f"Reponse incomplete pour {len(texts)} blocs, "
+                f"traduction bloc par bloc", color="orange")
+            return [self._call_ollama(t, source_lang, target_lang)
+                    for t in texts]
+        return translations
+
+    @staticmethod
+    def _parse_srt_blocks(content):
+        """Split SRT content into (numero, timestamp, texte) blocks."""
+        blocks = []
+        bloc = []
+        for line in content.splitlines() + [""]:
+            if line.strip() == "":
+                if len(bloc) >= 3:
+                    blocks.append((bloc[0], bloc[1], " ".join(bloc[2:])))
+                bloc = []
+            else:
+                bloc.append(line)
+        return blocks
+
+    @classmethod
+    def _make_cue_batches(cls, texts):
+        """Group consecutive cues under OLLAMA_BATCH_SIZE and a token budget
+        (~4 characters per token)."""
+        batches = []
+        current = []
+        current_tokens = 0
+        for text in texts:
+            tokens = max(1, len(text) // 4)
+            if current and (len(current) >= cls.OLLAMA_BATCH_SIZE
+                            or current_tokens + tokens > cls.OLLAMA_BATCH_TOKENS):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _split_keep_separators(text, pattern):
+        parts = re.split(pattern, text)
+        return [(parts[i], parts[i + 1] if i + 1 < len(parts) else "")
+                for i in range(0, len(parts), 2)]
+
+    @staticmethod
+    def _split_words(sentence, max_tokens):
+        """Cut an oversized sentence into (piece, separator) pairs of at most
+        ~max_tokens; a word too long on its own is cut every max_tokens * 4
+        characters."""
+        def tokens(text):
+            return max(1, len(text) // 4)
+
+        width = max_tokens * 4
+        pieces = []
+        group = []
+        for word in sentence.split(" "):
+            while tokens(word) > max_tokens:
+                if group:
+                    pieces.append((" ".join(group), " "))
+                    group = []
+                pieces.append((word[:width], ""))
+                word = word[width:]
+            if group and tokens(" ".join(group + [word])) > max_tokens:
+                pieces.append((" ".join(group), " "))
+                group = []
+            group.append(word)
+        pieces.append((" ".join(group), ""))
+        return pieces
+
+    @classmethod
+    def _split_text_chunks(cls, text):
+        """Split a document into (chunk, separator) pairs of at most
+        ~TEXT_CHUNK_TOKENS, on paragraphs, then sentences, then words."""
+        max_tokens = cls.TEXT_CHUNK_TOKENS
+        units = []
+        for para, para_sep in cls._split_keep_separators(
+                text, r"(\n\s*\n)"):
+            if max(1, len(para) // 4) <= max_tokens:
+                units.append((para, para_sep))
+                continue
+            sentences = cls._split_keep_separators(
+                para, r"(?<=[.!?\u3002\uff01\uff1f])(\s+)")
+            for i, (sentence, sentence_sep) in enumerate(sentences):
+                sep = sentence_sep if i < len(sentences) - 1 else para_sep
+                if max(1, len(sentence) // 4) <= max_tokens:
+                    units.append((sentence, sep))
+                    continue
+                pieces = cls._split_words(sentence, max_tokens)
+                pieces[-1] = (pieces[-1][0], sep)
+                units.extend(pieces)
+
+        chunks = []
+        current, current_sep = "", ""
+        for piece, sep in units:
+            if not piece.strip():
+                current_sep += piece + sep
+                continue
+            if not current and current_sep:
+                chunks.append(("", current_sep))  # leading blank lines
+            candidate = f"{current}{current_sep}{piece}" if current else piece
+            if current and max(1, len(candidate) // 4) > max_tokens:
+                chunks.append((current, current_sep))
+                candidate = piece
+            current = candidate
+            current_sep = sep
+        if current or current_sep:
+            chunks.append((current, current_sep))
+        return chunks
+
+    @staticmethod
+    def _parse_numbered_reply(reply, expected):
+        items = []
+        for line in reply.splitlines():
+            if not line.strip():
+                continue
+            match = re.match(r"^\s*(\d+)\s*[.):]\s*(.*)$", line)
+            if match and int(match.group(1)) == len(items) + 1:
+                items.append(match.group(2).strip())
+            elif items:
+                items[-1] = f"{items[-1]} {line.strip()}"
+            else:
+                return None
+        if len(items) != expected or not all(items):
+            return None
+        return items
 
     # ──────────────────── Whisper transcription ────────────────
 
-    def _transcribe_to_srt(self, model, file_path, output_path, audio_code,
-                            target_code):
+    @classmethod
+    def _transcribe_to_srt(cls, model, file_path, output_path, audio_code,
+                           target_code):
         task = "translate" if audio_code != target_code else "transcribe"
         segments, _info = model.transcribe(
             file_path,
@@ -231,12 +433,102 @@ class WhisperTranslatorApp:
             **({"initial_prompt": "Traduis tout en francais."}
                if target_code == "fr" and task == "translate" else {}),
         )
-        with open(output_path, "w", encoding="utf-8") as f:
+        # Written aside then renamed, so a crash never leaves a truncated SRT
+        part_path = output_path + ".part"
+        with open(part_path, "w", encoding="utf-8") as f:
             for idx, segment in enumerate(segments, start=1):
-                start = self._format_timestamp(segment.start)
-                end = self._format_timestamp(segment.end)
+                start = cls._format_timestamp(segment.start)
+                end = cls._format_timestamp(segment.end)
                 text = segment.text.strip()
                 f.write(f"{idx}\n{start} --> {end}\n{text}\n\n")
+        os.replace(part_path, output_path)
+
+    @staticmethod
+    def _split_cpu_threads(workers):
+        return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+    def _transcribe_parallel(self, jobs, selected_model, audio_code,
+                             target_code, workers, on_done=None):
+        """Transcribe (filepath, output_path) pairs across worker processes.
+
+        Largest files are submitted first so a long file does not end up
+        running alone at the end of the batch. on_done(filepath, output_path)
+        is called for each file as soon as it succeeds.
+        """
+        jobs = sorted(jobs, key=lambda j: os.path.getsize(j[0]), reverse=True)
+        cpu_threads = self._split_cpu_threads(workers)
+        self._log_message(
+            f"{workers} processus ({cpu_threads} threads chacun), "
+            f"fichiers les plus longs en premier.\n")
+        nb_ok = 0
+        nb_errors = 0
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_worker_init,
+                initargs=(selected_model, cpu_threads)) as pool:
+            futures = {
+                pool.submit(_worker_transcribe, filepath, output_path,
+                            audio_code, target_code): filepath
+                for filepath, output_path in jobs
+            }
+            for future in as_completed(futures):
+                filename = os.path.basename(futures[future])
+                try:
+                    output_path = future.result()
+                    self._log_message(f"SRT sauvegarde : {output_path}",
+                                      color="green")
+                    nb_ok += 1
+                    if on_done is not None:
+                        on_done(futures[future], output_path)
+                except Exception as e:
+                    nb_errors += 1
+                    self._log_message(f"Erreur pour {filename} : {e}",
+                                      color="red")
+                self._update_progress(nb_ok + nb_errors, len(jobs))
+        return nb_ok, nb_errors
+
+    def _get_model(self, model_name):
+        """Return a cached model, loading it (and evicting the oldest) if needed."""
+        with self._models_lock:
+            if model_name in self._models:
+                self._models.move_to_end(model_name)
+                return self._models[model_name]
+            while len(self._models) >= self.MAX_LOADED_MODELS:
+                self._models.popitem(last=False)
+            self._log_message(f"Chargement du modele {model_name}...")
+            model = WhisperModel(model_name, device="cpu", compute_type="int8")
+            self._models[model_name] = model
+            return model
+
+    # ──────────────────── Batch manifest ───────────────────────
+
+    @staticmethod
+    def _load_manifest(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_manifest(path, manifest):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _manifest_entry(filepath, output_path, model_name, audio_code):
+        """What a finished file is recorded as; any change means redo it."""
+        stat = os.stat(filepath)
+        return {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "model": model_name,
+            "audio_lang": audio_code,
+            "output": output_path,
+        }
 
     # ──────────────────── Button handlers ──────────────────────
 
@@ -301,8 +593,6 @@ class WhisperTranslatorApp:
             self._log_message(f"Dossier selectionne : {dossier}")
             self._log_message("Recherche des fichiers audio/video...\n")
 
-            model = WhisperModel(selected_model, device="cpu",
-                                  compute_type="int8")
             media_files = self._find_media_files(dossier)
             total = len(media_files)
 
@@ -311,36 +601,79 @@ class WhisperTranslatorApp:
                                   color="red")
                 return
 
-            nb_ok = 0
-            nb_errors = 0
-
-            for index, (filepath, parent, filename) in enumerate(media_files,
-                                                                  start=1):
-                self._update_progress(index, total)
+            workers = max(1, self.workers_var.get())
+            manifest_path = os.path.join(
+                dossier, self.MANIFEST_NAME.format(target_code))
+            manifest = self._load_manifest(manifest_path)
+            incremental = self.incremental_var.get()
+            manifest_lock = threading.Lock()
+
+            def checkpoint(filepath, output_path):
+                # Recorded as each file completes, so an interrupted run
+                # resumes where it stopped
+                key = os.path.relpath(filepath, dossier)
+                entry = self._manifest_entry(
+                    filepath, os.path.relpath(output_path, dossier),
+                    selected_model, audio_code)
+                with manifest_lock:
+                    manifest[key] = entry
+                    self._save_manifest(manifest_path, manifest)
+
+            jobs = []
+            nb_skipped = 0
+            for filepath, parent, filename in media_files:
                 name_no_ext = os.path.splitext(filename)[0]
                 output_dir = os.path.join(parent, f"subtitle_{target_code}")
-                os.makedirs(output_dir, exist_ok=True)
                 output_path = os.path.join(output_dir, name_no_ext + ".srt")
+                if incremental and os.path.exists(output_path):
+                    done = manifest.get(os.path.relpath(filepath, dossier))
+                    if done == self._manifest_entry(
+                            filepath, os.path.relpath(output_path, dossier),
+                            selected_model, audio_code):
+                        nb_skipped += 1
+                        continue
+                os.makedirs(output_dir, exist_ok=True)
+                jobs.append((filepath, output_path))
 
-                self._log_message("-" * 60)
+            if nb_skipped:
                 self._log_message(
-                    f"Traitement : {filename} ({index}/{total})")
+                    f"{nb_skipped} fichier(s) inchange(s) ignore(s), "
+                    f"{len(jobs)} a traiter.\n")
+            total = len(jobs)
+            nb_ok = 0
+            nb_errors = 0
 
-                try:
-                    self._transcribe_to_srt(model, filepath, output_path,
-                                             audio_code, target_code)
-                    self._log_message(f"SRT sauvegarde : {output_path}",
-                                      color="green")
-                    nb_ok += 1
-                except Exception as e:
-                    nb_errors += 1
-                    self._log_message(f"Erreur pour {filename} : {e}",
-                                      color="red")
-                    traceback.print_exc()
+            if workers > 1 and total > 1:
+                nb_ok, nb_errors = self._transcribe_parallel(
+                    jobs, selected_model, audio_code, target_code, workers,
+                    on_done=checkpoint)
+            elif jobs:
+                model = self._get_model(selected_model)
+                for index, (filepath, output_path) in enumerate(jobs,
+                                                                start=1):
+                    self._update_progress(index, total)
+                    filename = os.path.basename(filepath)
+
+                    self._log_message("-" * 60)
+                    self._log_message(
+                        f"Traitement : {filename} ({index}/{total})")
+
+                    try:
+                        self._transcribe_to_srt(model, filepath, output_path,
+                                                audio_code, target_code)
+                        self._log_message(f"SRT sauvegarde : {output_path}",
+                                          color="green")
+                        nb_ok += 1
+                        checkpoint(filepath, output_path)
+                    except Exception as e:
+                        nb_errors += 1
+                        self._log_message(f"Erreur pour {filename} : {e}",
+                                          color="red")
+                        traceback.print_exc()
 
             self._log_message(
                 f"\nTermine. {nb_ok} reussites, {nb_errors} echecs "
-                f"sur {total}.", color="cyan")
+                f"sur {total}, {nb_skipped} ignore(s).", color="cyan")
 
             log_content_q = queue.Queue()
             self._msg_queue.put(
@@ -367,8 +700,7 @@ class WhisperTranslatorApp:
 
             self._log_message(f"Test de : {filepath}")
 
-            model = WhisperModel(selected_model, device="cpu",
-                                  compute_type="int8")
+            model = self._get_model(selected_model)
             task = "translate" if audio_code != target_code else "transcribe"
 
             segments, _info = model.transcribe(
@@ -416,31 +748,19 @@ class WhisperTranslatorApp:
                 f"Traduction Ollama : {srt_name} ({i}/{len(srt_files)})")
 
             try:
-                lines = open(input_path, encoding="utf-8").read().splitlines()
+                content = open(input_path, encoding="utf-8").read()
+                blocks = self._parse_srt_blocks(content)
+                batches = self._make_cue_batches([b[2] for b in blocks])
+                translations = []
                 with open(output_path, "w", encoding="utf-8") as f_out:
-                    bloc = []
-                    for line in lines:
-                        if line.strip() == "":
-                            if len(bloc) >= 3:
-                                numero = bloc[0]
-                                timestamp = bloc[1]
-                                texte = " ".join(bloc[2:])
-                                translated = self._call_ollama(
-                                    texte, source_code, target_code)
-                                f_out.write(
-                                    f"{numero}\n{timestamp}\n"
-                                    f"{translated}\n\n")
-                            bloc = []
-                        else:
-                            bloc.append(line)
-                    if len(bloc) >= 3:
-                        numero = bloc[0]
-                        timestamp = bloc[1]
-                        texte = " ".join(bloc[2:])
-                        translated = self._call_ollama(
-                            texte, source_code, target_code)
-                        f_out.write(
-                            f"{numero}\n{timestamp}\n{translated}\n\n")
+                    for batch in batches:
+                        translated = self._call_ollama_batch(
+                            batch, source_code, target_code)
+                        start = len(translations)
+                        translations.extend(translated)
+                        for (numero, timestamp, _), texte in zip(
+                                blocks[start:], translated):
+                            f_out.write(f"{numero}\n{timestamp}\n{texte}\n\n")
 
                 self._log_message(
                     f"Fichier traduit : {output_path}", color="green")
@@ -456,7 +776,29 @@ class WhisperTranslatorApp:
         self._log_message(f"Traduction du fichier : {filepath}")
         try:
             text = open(filepath, encoding="utf-8").read()
-            translated = self._call_ollama(text, source_code, target_code)
+            chunks = self._split_text_chunks(text) or [(text, "")]
+            total = len(chunks)
+            self._log_message(f"{total} morceau(x) a traduire")
+
+            def _translate_chunk(idx):
+                if not chunks[idx][0].strip():
+                    return chunks[idx][0]
+                context = ""
+                if idx > 0 and self.TEXT_CHUNK_OVERLAP > 0:
+                    previous = [p for p, _ in self._split_keep_separators(
+                        chunks[idx - 1][0],
+                        r"(?<=[.!?\u3002\uff01\uff1f])(\s+)") if p.strip()]
+                    context = " ".join(previous[-self.TEXT_CHUNK_OVERLAP:])
+                result = self._call_ollama(chunks[idx][0], source_code,
+                                           target_code, context=context)
+                self._log_message(f"Morceau {idx + 1}/{total} traduit")
+                return result
+
+            with ThreadPoolExecutor(
+                    max_workers=self.OLLAMA_CONCURRENCY) as pool:
+                translations = list(pool.map(_translate_chunk, range(total)))
+            translated = "".join(
+                t + sep for t, (_, sep) in zip(translations, chunks))
 
             output_path = (os.path.splitext(filepath)[0]
                            + f"_{target_code}.txt")